@@ -0,0 +1,14 @@
+"""
+Benchmark suite of empymod.
+
+The benchmarks follow the conventions of airspeed velocity (asv): Classes
+with ``params``, ``param_names``, and ``setup``, and methods ``time_*``
+(runtime) and ``peakmem_*`` (peak memory). Run them either with asv, using
+``asv.conf.json`` in the root of the repository, or with the local runner
+without further dependencies::
+
+    python -m benchmarks.run -o new.json --compare old.json
+
+See ``python -m benchmarks.run --help`` and the developer documentation.
+
+"""
@@ -0,0 +1,30 @@
+"""Benchmarks of the wavenumber-domain kernel."""
+import numpy as np
+
+from empymod import kernel
+
+from benchmarks.common import get_hankel_inputs
+
+
+class Wavenumber:
+    """Benchmark ``kernel.wavenumber`` (the numba-compiled kernel)."""
+
+    params = [[2, 5, 20], [1, 10, 100], [201, 2010]]
+    param_names = ['nlayer', 'nfreq', 'nlambda']
+
+    def setup(self, nlayer, nfreq, nlambda):
+        inp = get_hankel_inputs(nlayer, nfreq, 1)[0]
+        zsrc, zrec, lsrc, lrec, _, _, depth, ab, etaH, etaV, zetaH, zetaV = (
+                inp[:12])
+        lambd = np.logspace(-6, 0, nlambda)[None, :]
+        self.inp = (zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                    lambd, ab, False, False, False)
+
+        # Compile (and load the cache) outside of the timing.
+        kernel.wavenumber(*self.inp)
+
+    def time_wavenumber(self, nlayer, nfreq, nlambda):
+        kernel.wavenumber(*self.inp)
+
+    def peakmem_wavenumber(self, nlayer, nfreq, nlambda):
+        kernel.wavenumber(*self.inp)
@@ -0,0 +1,131 @@
+"""Benchmarks of the modelling routines."""
+import numpy as np
+
+import empymod
+
+from benchmarks.common import get_model
+
+
+def get_receivers(noff):
+    """Return `noff` receivers on a line at 150 m depth."""
+    return [np.linspace(100, 10000, noff), np.zeros(noff), 150]
+
+
+class Dipole:
+    """Benchmark ``model.dipole`` in the frequency domain."""
+
+    params = [[1, 10, 100], [10, 100], [3, 10]]
+    param_names = ['nfreq', 'noff', 'nlayer']
+
+    def setup(self, nfreq, noff, nlayer):
+        depth, res = get_model(nlayer)
+        self.inp = {'src': [0, 0, 50], 'rec': get_receivers(noff),
+                    'depth': depth, 'res': res,
+                    'freqtime': np.logspace(-2, 2, nfreq), 'verb': 0}
+        empymod.dipole(**{**self.inp, 'freqtime': 1})  # Compile the kernel
+
+    def time_dipole(self, nfreq, noff, nlayer):
+        empymod.dipole(**self.inp)
+
+    def peakmem_dipole(self, nfreq, noff, nlayer):
+        empymod.dipole(**self.inp)
+
+
+class DipoleTime:
+    """Benchmark ``model.dipole`` in the time domain."""
+
+    params = [[10, 100], [10, 50], ['dlf', 'fftlog']]
+    param_names = ['ntime', 'noff', 'ft']
+
+    def setup(self, ntime, noff, ft):
+        depth, res = get_model(5)
+        self.inp = {'src': [0, 0, 50], 'rec': get_receivers(noff),
+                    'depth': depth, 'res': res,
+                    'freqtime': np.logspace(-3, 1, ntime), 'signal': 0,
+                    'ft': ft, 'verb': 0}
+        empymod.dipole(**{**self.inp, 'freqtime': 1, 'signal': None})
+
+    def time_dipole(self, ntime, noff, ft):
+        empymod.dipole(**self.inp)
+
+    def peakmem_dipole(self, ntime, noff, ft):
+        empymod.dipole(**self.inp)
+
+
+class DipoleDLF:
+    """Benchmark ``model.dipole`` with the standard, lagged, splined DLF."""
+
+    params = [[0, -1, 10], [10, 100]]
+    param_names = ['pts_per_dec', 'noff']
+
+    def setup(self, pts_per_dec, noff):
+        depth, res = get_model(5)
+        self.inp = {'src': [0, 0, 50], 'rec': get_receivers(noff),
+                    'depth': depth, 'res': res,
+                    'freqtime': np.logspace(-2, 2, 20), 'verb': 0,
+                    'htarg': {'pts_per_dec': pts_per_dec}}
+        empymod.dipole(**{**self.inp, 'freqtime': 1})
+
+    def time_dipole(self, pts_per_dec, noff):
+        empymod.dipole(**self.inp)
+
+
+class Bipole:
+    """Benchmark ``model.bipole`` with finite-length sources."""
+
+    params = [[1, 5], [10, 100]]
+    param_names = ['srcpts', 'noff']
+
+    def setup(self, srcpts, noff):
+        depth, res = get_model(5)
+        self.inp = {'src': [-50, 50, 0, 0, 50, 50], 'srcpts': srcpts,
+                    'rec': [*get_receivers(noff), 0, 0], 'depth': depth,
+                    'res': res, 'freqtime': np.logspace(-2, 2, 20),
+                    'verb': 0}
+        empymod.bipole(**{**self.inp, 'freqtime': 1})
+
+    def time_bipole(self, srcpts, noff):
+        empymod.bipole(**self.inp)
+
+    def peakmem_bipole(self, srcpts, noff):
+        empymod.bipole(**self.inp)
+
+
+class Loop:
+    """Benchmark ``model.loop`` (magnetic source, dB/dt receivers)."""
+
+    params = [[10, 50], ['frequency', 'time']]
+    param_names = ['noff', 'domain']
+
+    def setup(self, noff, domain):
+        depth, res = get_model(5)
+        signal = None if domain == 'frequency' else 0
+        self.inp = {'src': [0, 0, 50, 0, 90], 'rec': [
+                    *get_receivers(noff), 0, 90], 'depth': depth, 'res': res,
+                    'freqtime': np.logspace(-2, 2, 20), 'signal': signal,
+                    'verb': 0}
+        empymod.loop(**{**self.inp, 'freqtime': 1})
+
+    def time_loop(self, noff, domain):
+        empymod.loop(**self.inp)
+
+    def peakmem_loop(self, noff, domain):
+        empymod.loop(**self.inp)
+
+
+class Analytical:
+    """Benchmark the analytical solutions ``model.analytical``."""
+
+    params = [['fs', 'dfs', 'dhs', 'dsplit', 'dtetm'], [10, 100]]
+    param_names = ['solution', 'noff']
+
+    def setup(self, solution, noff):
+        self.inp = {'src': [0, 0, 50], 'rec': get_receivers(noff),
+                    'res': 10, 'freqtime': np.logspace(-2, 2, 20),
+                    'solution': solution, 'verb': 0}
+
+    def time_analytical(self, solution, noff):
+        empymod.analytical(**self.inp)
+
+    def peakmem_analytical(self, solution, noff):
+        empymod.analytical(**self.inp)
@@ -0,0 +1,89 @@
+"""
+Benchmarks of the kernel and the DLF in single versus double precision.
+
+The wavenumber-domain kernel and the standard Hankel DLF are computed with
+complex64 instead of complex128 parameters (and float32 geometry,
+wavenumbers, and filter coefficients), as a mixed-precision mode would do.
+The runtime is tracked as usual; ``track_error_p50`` and ``track_error_max``
+track the median and the maximum relative error with respect to double
+precision.
+
+Single precision is only about 1.2-1.3 times faster. The median error is a
+few 1e-5, but the DLF sums terms much larger than the result for some
+offsets and frequencies (cancellation), where the error is well above 1e-4.
+A mode with a guaranteed accuracy requires an error estimate and a
+recomputation in double precision, which was slower than double precision
+throughout. Therefore empymod computes in double precision only; these
+benchmarks document the trade-off.
+
+"""
+import copy
+
+import numpy as np
+
+from empymod import kernel, transform, utils
+
+# Models: name => (depth, res, zsrc, zrec, offsets, frequencies); a shallow
+# marine CSEM and a land CSEM survey.
+MODELS = {
+    'marine': ([0, 300, 1000, 1100], [2e14, 0.3, 1, 100, 1], 250, 300,
+               np.linspace(500, 10000, 40), np.logspace(-2, 1, 10)),
+    'land': ([0, 50, 100], [2e14, 50, 10, 200], 0.1, 0.1,
+             np.linspace(50, 1000, 40), np.logspace(0, 4, 10)),
+}
+
+
+class Precision:
+    """Benchmark the kernel and the standard DLF with a given dtype."""
+
+    params = [['complex128', 'complex64'], list(MODELS)]
+    param_names = ['dtype', 'model']
+
+    def setup(self, dtype, model):
+        self.inp = _get_inputs(model, np.dtype(dtype))
+        self.ref = _kernel_dlf(*_get_inputs(model, np.dtype(complex)))
+        _kernel_dlf(*self.inp)  # Compile the kernel, create the DLF plan
+
+    def time_kernel_dlf(self, dtype, model):
+        _kernel_dlf(*self.inp)
+
+    def track_error_p50(self, dtype, model):
+        return float(np.median(self._error()))
+
+    def track_error_max(self, dtype, model):
+        return float(np.max(self._error()))
+
+    def _error(self):
+        """Return the relative error with respect to double precision."""
+        return abs(_kernel_dlf(*self.inp) - self.ref)/abs(self.ref)
+
+
+def _get_inputs(model, dtype):
+    """Return the inputs of `_kernel_dlf` for `model` in `dtype`."""
+    depth, res, zsrc, zrec, off, freq = MODELS[model]
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = utils.check_model(
+            depth, res, None, None, None, None, None, False, 0)
+    _, etaH, etaV, zetaH, zetaV = utils.check_frequency(
+            freq, res, aniso, epermH, epermV, mpermH, mpermV, 0)
+    lsrc, zsrc = utils.get_layer_nr(np.array([[0], [0], [zsrc]]), depth)
+    lrec, zrec = utils.get_layer_nr(np.array([[0], [0], [zrec]]), depth)
+    ang_fact = kernel.angle_factor(np.zeros(off.size), 11, False, False)
+    htarg = utils.check_hankel('dlf', {'dlf': 'key_201_2009'}, 0)[1]
+    plan = transform.get_dlf_plan(htarg['dlf'], off, 0)
+
+    # Cast the parameters, geometry, wavenumbers, and filter coefficients.
+    rtype = np.zeros(1, dtype=dtype).real.dtype.type
+    filt = copy.copy(htarg['dlf'])
+    filt.j0, filt.j1 = filt.j0.astype(rtype), filt.j1.astype(rtype)
+    eta_zeta = [v.astype(dtype) for v in [etaH, etaV, zetaH, zetaV]]
+    return (rtype(zsrc), rtype(zrec), lsrc, lrec, depth.astype(rtype),
+            *eta_zeta, plan.points.astype(rtype), off, ang_fact, filt, plan)
+
+
+def _kernel_dlf(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                lambd, off, ang_fact, filt, plan):
+    """Return the response of the kernel and the standard DLF, ab=11."""
+    PJ = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH,
+                           zetaV, lambd, 11, False, False, False)
+    return transform.dlf(PJ, plan.points, off, filt, 0, ang_fact=ang_fact,
+                         ab=11, plan=plan)
@@ -0,0 +1,89 @@
+"""Benchmarks of the Hankel and Fourier transforms."""
+import numpy as np
+
+from empymod import model, transform, utils
+
+from benchmarks.common import get_hankel_inputs
+
+# Hankel transforms: name => (ht, htarg)
+HANKEL = {
+    'dlf': ('dlf', {'dlf': 'key_201_2009', 'pts_per_dec': 0}),
+    'dlf-lagged': ('dlf', {'dlf': 'key_201_2009', 'pts_per_dec': -1}),
+    'dlf-splined': ('dlf', {'dlf': 'key_201_2009', 'pts_per_dec': 10}),
+    'qwe': ('qwe', {}),
+    'quad': ('quad', {}),
+}
+
+# Fourier transforms: name => (ft, ftarg)
+FOURIER = {
+    'dlf': ('dlf', {'dlf': 'key_201_2012', 'pts_per_dec': 0}),
+    'dlf-lagged': ('dlf', {'dlf': 'key_201_2012', 'pts_per_dec': -1}),
+    'dlf-splined': ('dlf', {'dlf': 'key_201_2012', 'pts_per_dec': 10}),
+    'qwe': ('qwe', {}),
+    'fftlog': ('fftlog', {}),
+    'fft': ('fft', {}),
+}
+
+
+class Hankel:
+    """Benchmark the Hankel transforms ``transform.hankel_*``."""
+
+    params = [list(HANKEL), [1, 10], [10, 100], [3, 10]]
+    param_names = ['method', 'nfreq', 'noff', 'nlayer']
+
+    def setup(self, method, nfreq, noff, nlayer):
+        if method == 'quad' and nfreq*noff > 10:
+            raise NotImplementedError("Too slow")  # Skipped
+        ht, htarg = HANKEL[method]
+        self.calc = getattr(transform, 'hankel_'+ht)
+        self.inputs = get_hankel_inputs(nlayer, nfreq, noff, ht, htarg)
+        self.calc(*self.inputs[0])  # Compile the kernel, create DLF plans
+
+    def time_hankel(self, method, nfreq, noff, nlayer):
+        for inp in self.inputs:
+            self.calc(*inp)
+
+    def peakmem_hankel(self, method, nfreq, noff, nlayer):
+        for inp in self.inputs:
+            self.calc(*inp)
+
+
+class HankelFilter:
+    """Benchmark the standard DLF with different filters."""
+
+    params = [['key_101_2009', 'key_201_2009', 'key_401_2009',
+               'kong_241_2007', 'wer_201_2018', 'anderson_801_1982'],
+              [10, 100]]
+    param_names = ['filter', 'noff']
+
+    def setup(self, filt, noff):
+        htarg = {'dlf': filt, 'pts_per_dec': 0}
+        self.inp = get_hankel_inputs(5, 10, noff, 'dlf', htarg)[0]
+        transform.hankel_dlf(*self.inp)
+
+    def time_hankel_dlf(self, filt, noff):
+        transform.hankel_dlf(*self.inp)
+
+
+class Fourier:
+    """Benchmark the Fourier transforms ``transform.fourier_*``."""
+
+    params = [list(FOURIER), [10, 100]]
+    param_names = ['method', 'ntime']
+
+    def setup(self, method, ntime):
+        ft, ftarg = FOURIER[method]
+        time = np.logspace(-3, 1, ntime)
+        time, freq, ft, ftarg = utils.check_time(time, 0, ft, ftarg, 0)
+        self.calc = getattr(transform, 'fourier_'+ft)
+
+        # Frequency-domain response of a step-off source, as in `model.tem`
+        fEM = model.analytical([0, 0, 0], [1000, 0, 0], 10, freq.ravel(),
+                               verb=0)
+        self.inp = (fEM/(2j*np.pi*freq.ravel()), time, freq, ftarg)
+
+    def time_fourier(self, method, ntime):
+        self.calc(*self.inp)
+
+    def peakmem_fourier(self, method, ntime):
+        self.calc(*self.inp)
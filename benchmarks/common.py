@@ -0,0 +1,62 @@
+"""
+Inputs of the kernel and the transforms for the benchmarks.
+
+The inputs are created with the same checks as the modelling routines carry
+out, for a layered model below air with a source and receivers at depth.
+
+"""
+import numpy as np
+
+from empymod import kernel, utils
+
+
+def get_model(nlayer):
+    """Return depth and resistivities of a model with `nlayer` layers."""
+    depth = np.r_[0, 100*np.arange(1, nlayer-1)]
+    res = np.r_[2e14, 1 + 10*(np.arange(nlayer-1) % 4)]
+    return depth, res
+
+
+def get_hankel_inputs(nlayer, nfreq, noff, ht='dlf', htarg=None, ab=11):
+    """Return the arguments of the Hankel transforms ``transform.hankel_*``.
+
+    As in ``model.fem``, the transforms which are carried out frequency by
+    frequency (QWE, QUAD, lagged and splined DLF) get one set of arguments
+    per frequency.
+
+    Parameters
+    ----------
+    nlayer, nfreq, noff : int
+        Number of layers (including air), frequencies, and offsets.
+
+    ht, htarg : str, dict
+        Hankel transform and its arguments, as in ``model.dipole``.
+
+    ab : int
+        Source-receiver configuration.
+
+    Returns
+    -------
+    inputs : list of tuple
+        Positional arguments of the Hankel transform for each call.
+
+    """
+    depth, res = get_model(nlayer)
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = utils.check_model(
+            depth, res, None, None, None, None, None, False, 0)
+    freq = np.logspace(-2, 2, nfreq)
+    _, etaH, etaV, zetaH, zetaV = utils.check_frequency(
+            freq, res, aniso, epermH, epermV, mpermH, mpermV, 0)
+    ht, htarg = utils.check_hankel(ht, {} if htarg is None else htarg, 0)
+    loop_freq, _ = utils.check_loop(None, ht, htarg, 0)
+    ab_calc, msrc, mrec = utils.check_ab(ab, 0)
+
+    off = np.logspace(2, 4, noff)
+    ang_fact = kernel.angle_factor(np.zeros(noff), ab_calc, msrc, mrec)
+    lsrc, zsrc = utils.get_layer_nr(np.array([[0], [0], [50]]), depth)
+    lrec, zrec = utils.get_layer_nr(np.array([[0], [0], [150]]), depth)
+
+    freqs = [slice(i, i+1) for i in range(nfreq)] if loop_freq else [...]
+    return [(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab_calc, etaH[i],
+             etaV[i], zetaH[i], zetaV[i], False, htarg, msrc, mrec)
+            for i in freqs]
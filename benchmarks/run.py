@@ -0,0 +1,201 @@
+"""
+Local runner of the benchmark suite, without further dependencies.
+
+It runs all (or the selected) benchmarks, stores the results as JSON, and
+compares them to the results of a baseline, e.g., of the main branch::
+
+    git switch main
+    python -m benchmarks.run -o main.json
+    git switch my-branch
+    python -m benchmarks.run -o branch.json --compare main.json
+
+Runtimes are the minimum over several repeats of the mean over a number of
+calls chosen such that a repeat takes at least ``--min-time``; peak memory is
+the peak of the memory allocated during one call, measured with
+``tracemalloc`` (includes NumPy arrays); tracked values (``track_*``, e.g.,
+errors) are the return value of one call. Comparisons are flagged if the
+ratio exceeds ``--factor``; the exit code is 1 if any benchmark got slower.
+
+"""
+import os
+import re
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import itertools
+import importlib
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import empymod
+
+MODULES = ['bench_kernel', 'bench_transform', 'bench_model',
+           'bench_precision']
+
+
+def discover(pattern=None):
+    """Yield (name, class, method, params) of all benchmarks.
+
+    The name is ``module.Class.method(param1, param2, ...)``.
+
+    """
+    regex = re.compile(pattern) if pattern else None
+    for modname in MODULES:
+        module = importlib.import_module('benchmarks.'+modname)
+        for clsname, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            params = getattr(cls, 'params', [[]])
+            for method in sorted(dir(cls)):
+                if not method.startswith(('time_', 'peakmem_', 'track_')):
+                    continue
+                for par in itertools.product(*params):
+                    name = f"{modname}.{clsname}.{method}"
+                    name += '('+', '.join(repr(p) for p in par)+')'
+                    if regex is None or regex.search(name):
+                        yield name, cls, method, par
+
+
+def run(cls, method, par, repeat=5, min_time=0.1):
+    """Return the result of one benchmark, or None if it is skipped."""
+    bench = cls()
+    try:
+        if hasattr(bench, 'setup'):
+            bench.setup(*par)
+    except NotImplementedError:
+        return None
+    func = getattr(bench, method)
+
+    if method.startswith('track_'):
+        return func(*par)
+
+    if method.startswith('peakmem_'):
+        tracemalloc.start()
+        try:
+            func(*par)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # Number of calls per repeat
+    number = 1
+    while True:
+        tic = time.perf_counter()
+        for _ in range(number):
+            func(*par)
+        duration = time.perf_counter() - tic
+        if duration >= min_time or number >= 1000:
+            break
+        number *= 10 if duration < min_time/10 else 2
+
+    times = [duration/number]
+    for _ in range(repeat-1):
+        tic = time.perf_counter()
+        for _ in range(number):
+            func(*par)
+        times.append((time.perf_counter() - tic)/number)
+    return min(times)
+
+
+def compare(results, baseline, factor=1.1):
+    """Print comparison of `results` to `baseline`; return True if slower."""
+    slower = False
+    print(f"\n{'':7} {'before':>10} {'after':>10} {'ratio':>7}  benchmark")
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None or new is None:
+            continue
+        ratio = new/old if old else (1.0 if new == old else np.inf)
+        if ratio > factor:
+            flag = '+ worse'
+            slower |= name.split('.')[2].startswith('time_')
+        elif ratio < 1/factor:
+            flag = '- better'
+        else:
+            flag = ''
+        print(f"{flag:7} {_fmt(name, old):>10} {_fmt(name, new):>10} "
+              f"{ratio:>7.2f}  {name}")
+    return slower
+
+
+def main(args=None):
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(
+            prog='python -m benchmarks.run',
+            description="Run the empymod benchmarks.")
+    parser.add_argument(
+            '-b', '--bench', default=None,
+            help="regular expression selecting benchmarks by name")
+    parser.add_argument(
+            '-o', '--output', default=None, help="store results as JSON")
+    parser.add_argument(
+            '-c', '--compare', default=None,
+            help="compare with the results of a baseline (JSON)")
+    parser.add_argument(
+            '-f', '--factor', type=float, default=1.1,
+            help="ratio flagging a change (default: 1.1)")
+    parser.add_argument(
+            '-r', '--repeat', type=int, default=5,
+            help="number of repeats of timings (default: 5)")
+    parser.add_argument(
+            '--min-time', type=float, default=0.1,
+            help="minimum duration (s) of a repeat (default: 0.1)")
+    parser.add_argument(
+            '-l', '--list', action='store_true',
+            help="list the benchmarks without running them")
+    args = parser.parse_args(args)
+
+    benchmarks = list(discover(args.bench))
+    if args.list:
+        for name, *_ in benchmarks:
+            print(name)
+        return 0
+
+    results = {}
+    for name, cls, method, par in benchmarks:
+        results[name] = run(cls, method, par, args.repeat, args.min_time)
+        value = 'skipped' if results[name] is None else _fmt(
+                name, results[name])
+        print(f"{value:>10}  {name}", flush=True)
+
+    if args.output:
+        meta = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'empymod': empymod.__version__,
+            'numpy': np.__version__,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        }
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.factor):
+            return 1
+
+    return 0
+
+
+def _fmt(name, value):
+    """Format a runtime (s), memory (bytes), or tracked value for printing."""
+    if name.split('.')[2].startswith('track_'):
+        return f"{value:.2e}"
+    elif name.split('.')[2].startswith('peakmem_'):
+        return f"{value/2**20:.2f}M"
+    elif value < 1e-3:
+        return f"{value*1e6:.1f}us"
+    elif value < 1:
+        return f"{value*1e3:.2f}ms"
+    return f"{value:.2f}s"
+
+
+if __name__ == '__main__':
+    sys.exit(main())
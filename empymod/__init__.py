@@ -21,20 +21,25 @@ from empymod import utils
 from empymod import kernel
 from empymod import filters
 from empymod import scripts
+from empymod import profiling
+from empymod import tracing
+from empymod import planning
 from empymod import transform
 
 # Import most important functions
 from empymod.filters import DigitalFilter
 from empymod.model import bipole, dipole, loop, ip_and_q
+from empymod.planning import plan
 from empymod.utils import EMArray, set_minimum, get_minimum, Report
 
 # For top-namespace
 from empymod.scripts import fdesign, tmtemod
-from empymod.model import analytical, gpr, dipole_k, fem, tem
+from empymod.model import analytical, gpr, dipole_k, mt, dc, fem, tem
 
 __all__ = ['model', 'utils', 'filters', 'transform', 'kernel', 'scripts', 'io',
-           'bipole', 'dipole', 'loop', 'ip_and_q', 'EMArray', 'set_minimum',
-           'get_minimum', 'DigitalFilter', 'Report']
+           'profiling', 'tracing', 'planning', 'bipole', 'dipole', 'loop',
+           'ip_and_q', 'plan', 'EMArray', 'set_minimum', 'get_minimum',
+           'DigitalFilter', 'Report']
 
 # Version defined in utils, so we can easier use it within the package itself.
 __version__ = utils.__version__
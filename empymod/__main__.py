@@ -18,11 +18,34 @@ Entry point for the command-line interface (CLI).
 # the License.
 
 
+import os
 import sys
+import json
+import time
+import inspect
 import argparse
+import threading
+from io import StringIO
+from contextlib import redirect_stdout
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from empymod import io, model, utils
 
+# Routines which can be called from the CLI
+ROUTINES = ['bipole', 'dipole', 'loop', 'analytical']
+
+# Keyword arguments (``**kwargs``) of the routines accepted by ``serve``; not
+# included is, e.g., ``outfile``, which would write to the server's disk.
+_SERVE_KWARGS = {
+    'bipole': ['ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'waveform',
+               'lowpass', 'gates'],
+    'dipole': ['ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop'],
+    'loop': ['ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'waveform',
+             'lowpass', 'gates', 'loop_radius', 'loop_vertices'],
+    'analytical': [],
+}
+
 
 def main(args=None):
     """Parsing command line inputs of CLI interface."""
@@ -41,8 +64,9 @@ def main(args=None):
         "routine",
         nargs="?",
         type=str,
-        choices=['bipole', 'dipole', 'loop', 'analytical'],
-        help=("name of the modelling routine")
+        choices=ROUTINES+['batch', 'serve'],
+        help=("name of the modelling routine; 'batch' runs many inputs; "
+              "'serve' starts a local modelling server")
     )
 
     # arg: Input file name
@@ -50,7 +74,8 @@ def main(args=None):
         "input",
         nargs="?",
         type=str,
-        help="input file name"
+        help=("input file name; for 'batch' a directory of input files or "
+              "a JSON-lines manifest (.jsonl)")
     )
 
     # arg: Output file name
@@ -59,7 +84,53 @@ def main(args=None):
         nargs="?",
         default=None,
         type=str,
-        help="output file name; prints to STDOUT if not provided"
+        help=("output file name; prints to STDOUT if not provided; for "
+              "'batch' the (required) output directory")
+    )
+
+    # arg: Batch: number of worker processes
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help=("batch: number of worker processes; serve: number of "
+              "concurrent computations; default: number of CPUs")
+    )
+
+    # arg: Batch: default routine
+    parser.add_argument(
+        "--routine",
+        dest='batch_routine',
+        default='bipole',
+        type=str,
+        choices=ROUTINES,
+        help=("batch: routine for inputs which do not define one; "
+              "default: bipole")
+    )
+
+    # arg: Batch: output format
+    parser.add_argument(
+        "--format",
+        default='npy',
+        type=str,
+        choices=['txt', 'json', 'npy', 'npz'],
+        help="batch: format of the output files; default: npy"
+    )
+
+    # arg: Serve: host
+    parser.add_argument(
+        "--host",
+        default='127.0.0.1',
+        type=str,
+        help="serve: host name or IP address; default: 127.0.0.1"
+    )
+
+    # arg: Serve: port
+    parser.add_argument(
+        "--port",
+        default=8000,
+        type=int,
+        help="serve: port (0 for any free port); default: 8000"
     )
 
     # arg: Report
@@ -89,11 +160,25 @@ def main(args=None):
     elif args_dict.pop('report'):
         print(utils.Report())
 
+    # Start a modelling server.
+    elif args_dict['routine'] == 'serve':
+        try:
+            serve(args_dict)
+        except OSError as e:
+            return e
+
     # Info if not at list routine and input provided.
     elif len(sys.argv) < 3:
         print(f"{parser.description}\n=> Type `empymod --help` for "
               f"more info (empymod v{utils.__version__}).")
 
+    # Run a batch of jobs.
+    elif args_dict['routine'] == 'batch':
+        try:
+            return batch(args_dict)
+        except (TypeError, ValueError, OSError) as e:
+            return e
+
     # Actually compute.
     else:
         try:
@@ -119,5 +204,334 @@ def run(args_dict):
         print(out)
 
 
+def batch(args_dict):
+    """Run a batch of jobs with a pool of worker processes.
+
+    The input is either a directory, in which case every ``*.json`` file is a
+    job (input file of ``io.load_input``), or a JSON-lines manifest
+    (``.jsonl``), where each line is a job of the form::
+
+        {"id": "name", "routine": "bipole", "input": "inp.json",
+         "output": "name.npy"}
+
+    Only ``input`` is required; it is either the file name of an input file
+    (relative to the manifest) or a dict with the inputs themselves. The
+    ``routine`` defaults to ``args_dict['batch_routine']``, the ``id`` to the
+    name of the input file (or ``job{line number}``), and the ``output`` to
+    ``{id}.{args_dict['format']}`` in the output directory. In a directory,
+    the JSON sidecars of ``.npy`` outputs (``*.npy.json``) are not jobs, so
+    the output directory can be the input directory, or be run again.
+
+    The workers load and compile the kernels once at start-up and then run
+    their share of the jobs. A failing job does not stop the others; the
+    status of each job (ok/error, runtime, error message, and the captured
+    printed output) is written to ``status.jsonl`` in the output directory.
+    If the pool of workers breaks (e.g., a worker process is killed), the
+    jobs without result are recorded as failed with the error of the pool.
+
+    Returns None if all jobs succeeded, else an error message.
+
+    """
+    if not args_dict['output']:
+        raise ValueError("Batch requires an output directory.")
+
+    # Collect jobs, create output directory.
+    jobs = _get_jobs(args_dict)
+    os.makedirs(args_dict['output'], exist_ok=True)
+
+    # Number of workers and jobs per submission to the workers.
+    workers = args_dict['workers']
+    if workers is None:
+        workers = os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    chunksize = max(1, len(jobs)//(4*workers))
+
+    # Run jobs (in this process if only one worker) and store status.
+    t0 = time.perf_counter()
+    sname = os.path.join(args_dict['output'], 'status.jsonl')
+    with open(sname, "w", encoding="utf-8") as f:
+
+        if workers == 1:
+            _init_worker()
+            results = map(_run_job, jobs)
+        else:
+            results = _pool_map(jobs, workers, chunksize)
+        nfailed = _write_status(f, jobs, results)
+
+    runtime = time.perf_counter() - t0
+    print(f"empymod batch :: {len(jobs)} job(s) on {workers} worker(s); "
+          f"{nfailed} failed; runtime = {runtime:.3f} s :: {sname}")
+
+    if nfailed:
+        return f"{nfailed} of {len(jobs)} job(s) failed; see {sname}."
+
+
+def _get_jobs(args_dict):
+    """Return list of jobs from an input directory or manifest."""
+    iname = os.path.abspath(args_dict['input'])
+    ext = args_dict['format']
+    jobs = []
+
+    # Directory: each JSON file is a job, except the meta-information
+    # sidecars of `.npy` outputs (``{fname}.npy.json``).
+    if os.path.isdir(iname):
+        for fname in sorted(os.listdir(iname)):
+            if fname.endswith('.json') and not fname.endswith('.npy.json'):
+                jobs.append({'id': fname[:-5], 'input': os.path.join(
+                    iname, fname)})
+
+    # JSON-lines manifest: each line is a job.
+    elif iname.endswith('.jsonl'):
+        with open(iname, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(
+                        f"Invalid JSON in line {i+1} of {iname}: {e}"
+                    ) from e
+                if not isinstance(job, dict) or 'input' not in job:
+                    raise ValueError(
+                        f"Line {i+1} of {iname} must be a JSON object with "
+                        "key 'input'."
+                    )
+                inp = job['input']
+                if isinstance(inp, str):
+                    inp = os.path.join(os.path.dirname(iname), inp)
+                    name = os.path.basename(inp).rsplit('.', 1)[0]
+                else:
+                    name = f"job{i+1}"
+                jobs.append({**job, 'id': str(job.get('id', name)),
+                             'input': inp})
+
+    elif not os.path.exists(iname):
+        raise FileNotFoundError(f"No such file or directory: '{iname}'")
+
+    else:
+        raise ValueError("Batch input must be a directory or a JSON-lines "
+                         f"manifest (.jsonl); provided: {iname}.")
+
+    # Ensure there are jobs and that they have unique names.
+    ids = [job['id'] for job in jobs]
+    if not ids:
+        raise ValueError(f"No jobs found in {iname}.")
+    if len(set(ids)) != len(ids):
+        duplicate = sorted(i for i in set(ids) if ids.count(i) > 1)
+        raise ValueError(f"Job ids must be unique; duplicate: {duplicate}.")
+
+    # Complete routines and output file names.
+    odir = os.path.abspath(args_dict['output'])
+    for job in jobs:
+        job.setdefault('routine', args_dict['batch_routine'])
+        job['output'] = os.path.join(
+                odir, job.get('output', f"{job['id']}.{ext}"))
+
+    return jobs
+
+
+def _pool_map(jobs, workers, chunksize):
+    """Yield the status of the jobs run by a pool of worker processes.
+
+    The pool is only started with the first request, so that a failure when
+    submitting the jobs is raised by ``next`` too (see ``_write_status``).
+
+    """
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        yield from pool.map(_run_job, jobs, chunksize=chunksize)
+
+
+def _write_status(f, jobs, results):
+    """Write the status of each job to `f`, return the number of failures.
+
+    If the pool of workers breaks, `results` raises a ``BrokenExecutor``; the
+    remaining jobs are then recorded as failed with its error message.
+
+    """
+    nfailed = 0
+    error = None
+    for job in jobs:
+
+        if error is None:
+            try:
+                status = next(results)
+            except BrokenExecutor as e:
+                error = f"{type(e).__name__}: {e}"
+
+        if error is not None:
+            status = {'id': job['id'], 'routine': job['routine'],
+                      'output': job['output'], 'status': 'error',
+                      'error': error, 'time': 0.0, 'log': ''}
+
+        nfailed += status['status'] != 'ok'
+        f.write(json.dumps(status) + "\n")
+        f.flush()
+
+    return nfailed
+
+
+def _init_worker():
+    """Load and compile the kernels of a worker with a small model."""
+    model.dipole([0, 0, 100], [1000, 0, 200], [0, 150], [2e14, 1, 10], 1,
+                 verb=0)
+
+
+def _run_job(job):
+    """Run a single batch job, return its status."""
+    status = {'id': job['id'], 'routine': job['routine'],
+              'output': job['output'], 'status': 'ok', 'error': None}
+    log = StringIO()
+    tic = time.perf_counter()
+    try:
+        with redirect_stdout(log):
+
+            if job['routine'] not in ROUTINES:
+                raise ValueError(f"Unknown routine '{job['routine']}'; "
+                                 f"possible: {ROUTINES}.")
+
+            # Load input, run empymod, enforce ``squeeze=False``.
+            inp = job['input']
+            if isinstance(inp, str):
+                inp = io.load_input(inp)
+            fct = getattr(model, job['routine'])
+            out = fct(**{'verb': 1, **inp, 'squeeze': False})
+
+            # Store result.
+            info = f"Generated with <empymod.{job['routine']}()> by batch "
+            info += f"job <{job['id']}>."
+            io.save_data(job['output'], out, info=info)
+
+    except Exception as e:
+        status['status'] = 'error'
+        status['error'] = f"{type(e).__name__}: {e}"
+
+    status['time'] = time.perf_counter() - tic
+    status['log'] = log.getvalue()
+    return status
+
+
+def serve(args_dict):
+    """Run a local HTTP server for modelling requests until interrupted.
+
+    The server computes the response for each ``POST /<routine>`` request,
+    where the body is a JSON object of the input parameters (as stored by
+    ``io.save_input``), for example::
+
+        curl -d @myrun.json http://127.0.0.1:8000/bipole
+
+    The reply is a JSON object with the meta information and the data in the
+    format of ``io.save_data`` for ``.json``, plus the status, runtime, and
+    error message if the request failed. ``GET /health`` returns the status
+    and version of the server.
+
+    Only the documented parameters of the routine are accepted, without
+    ``outfile``; other parameters are rejected (400). The server enforces
+    ``verb=0`` and ``squeeze=False``.
+
+    The kernels are compiled at start-up; the filters and DLF plans are
+    cached and shared by all requests. Requests are handled in threads, of
+    which at most ``args_dict['workers']`` compute at the same time (the
+    numba kernels release the GIL); further requests wait.
+
+    """
+    server = _get_server(
+            args_dict['host'], args_dict['port'], args_dict['workers'])
+    host, port = server.server_address[:2]
+    print(f"empymod serve :: http://{host}:{port} with "
+          f"{server.workers} worker(s); stop with Ctrl+C.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _get_server(host, port, workers=None):
+    """Return a warmed-up modelling server, see ``serve``."""
+    if workers is None:
+        workers = os.cpu_count()
+
+    # Compile kernels and load the default filters.
+    _init_worker()
+
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.workers = max(1, workers)
+    server.slots = threading.BoundedSemaphore(server.workers)
+    return server
+
+
+def _serve_parameters(fct, routine):
+    """Return the parameters of `fct` accepted by ``serve``."""
+    names = [p.name for p in inspect.signature(fct).parameters.values()
+             if p.kind != p.VAR_KEYWORD]
+    return set(names + _SERVE_KWARGS[routine] + ['verb', 'squeeze'])
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Handle the requests of ``serve``."""
+
+    def do_GET(self):
+        """Return status of the server."""
+        if self.path.rstrip('/') in ['', '/health']:
+            self._reply(200, {'status': 'ok',
+                              'version': f"empymod v{utils.__version__}",
+                              'routines': ROUTINES})
+        else:
+            self._reply(404, {'status': 'error',
+                              'error': f"Unknown path '{self.path}'."})
+
+    def do_POST(self):
+        """Compute the response of a modelling routine."""
+        routine = self.path.strip('/')
+        if routine not in ROUTINES:
+            msg = f"Unknown routine '{routine}'; possible: {ROUTINES}."
+            self._reply(404, {'status': 'error', 'error': msg})
+            return
+
+        tic = time.perf_counter()
+        try:
+
+            # Get the input parameters.
+            length = int(self.headers.get('Content-Length', 0))
+            inp = json.loads(self.rfile.read(length))
+            if not isinstance(inp, dict):
+                raise TypeError("Input must be a JSON object.")
+
+            # Only the documented parameters of the routine are accepted.
+            fct = getattr(model, routine)
+            unknown = set(inp) - _serve_parameters(fct, routine)
+            if unknown:
+                raise ValueError(f"Unsupported parameter(s) for '{routine}': "
+                                 f"{sorted(unknown)}.")
+
+            # Run empymod (in one of the slots); enforce ``verb=0`` (no
+            # printing to the server's output) and ``squeeze=False``.
+            with self.server.slots:
+                out = fct(**{**inp, 'verb': 0, 'squeeze': False})
+
+        except Exception as e:
+            code = 400 if isinstance(e, (TypeError, ValueError)) else 500
+            self._reply(code, {'status': 'error',
+                               'error': f"{type(e).__name__}: {e}",
+                               'time': time.perf_counter() - tic})
+            return
+
+        info = f"Generated with <empymod.{routine}()> by empymod serve."
+        self._reply(200, {'status': 'ok',
+                          **io._meta(out.shape, out.dtype, info),
+                          'time': time.perf_counter() - tic, 'data': out})
+
+    def _reply(self, code, content):
+        """Send `content` as JSON."""
+        body = json.dumps(content, cls=io._ComplexNumPyEncoder).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
 if __name__ == "__main__":
     sys.exit(main())
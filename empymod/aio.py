@@ -0,0 +1,318 @@
+"""
+Asynchronous modelling routines for asyncio applications.
+
+The coroutines :func:`abipole`, :func:`adipole`, and :func:`aloop` take the
+same parameters as their synchronous counterparts in :mod:`empymod.model`.
+The computation runs in a managed pool of worker threads (the numba kernels
+release the GIL), so the event loop is never blocked. The pool can be
+configured with :func:`configure`.
+
+- **Backpressure**: At most `max_pending` computations are submitted to the
+  pool at any time; further requests wait (without blocking the event loop)
+  until a computation finishes.
+- **Cancellation**: Cancelling an awaiting request removes it; a computation
+  which has not yet started is dropped if all its requests are cancelled.
+  Running computations cannot be interrupted, their result is discarded.
+- **Coalescing**: Concurrent requests to the same routine, which are
+  identical except for their receivers (same sources, model, frequencies or
+  times, and transforms), are merged into one call with all receivers, as
+  the kernel computes all offsets of a receiver depth at once. This is only
+  done for transforms where the result of an offset does not depend on the
+  other offsets (standard DLF and QWE, and QUAD; not the lagged or splined
+  DLF and QWE, nor ``dlf='auto'`` or adaptive Fourier transforms).
+
+Import it explicitly, ``from empymod import aio``, as it is not imported by
+``import empymod`` (to not slow down the import of empymod).
+
+"""
+# Copyright 2016 The emsig community.
+#
+# This file is part of empymod.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License.  You may obtain a copy
+# of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+import os
+import asyncio
+import inspect
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from empymod import model
+from empymod.utils import EMArray
+
+__all__ = ['abipole', 'adipole', 'aloop', 'configure']
+
+
+def __dir__():
+    return __all__
+
+
+# Settings of the pool, see `configure`
+_POOL = {'executor': None, 'managed': True, 'max_workers': None,
+         'max_pending': None, 'coalesce': True}
+
+# State per event loop: backpressure semaphore and collecting groups
+_LOOPS = weakref.WeakKeyDictionary()
+
+# Maximum size (receivers times frequencies/times) of coalesced requests;
+# beyond it, merging does not reduce the runtime per receiver any further
+_COALESCE_SIZE = 256
+
+
+async def abipole(*args, **kwargs):
+    """Asynchronous :func:`empymod.model.bipole`; see :mod:`empymod.aio`."""
+    return await _submit('bipole', args, kwargs)
+
+
+async def adipole(*args, **kwargs):
+    """Asynchronous :func:`empymod.model.dipole`; see :mod:`empymod.aio`."""
+    return await _submit('dipole', args, kwargs)
+
+
+async def aloop(*args, **kwargs):
+    """Asynchronous :func:`empymod.model.loop`; see :mod:`empymod.aio`."""
+    return await _submit('loop', args, kwargs)
+
+
+def configure(max_workers=None, max_pending=None, coalesce=True,
+              executor=None):
+    """Configure the pool of the asynchronous modelling routines.
+
+    Requests which are already submitted are finished by the old pool.
+
+
+    Parameters
+    ----------
+    max_workers : int, default: None
+        Number of worker threads; default is the number of CPUs.
+
+    max_pending : int, default: None
+        Maximum number of computations submitted to the pool at any time;
+        default is twice the number of workers.
+
+    coalesce : bool, default: True
+        If True, concurrent requests differing only in their receivers are
+        merged into one computation.
+
+    executor : concurrent.futures.Executor, default: None
+        User-provided executor (e.g., a ``ProcessPoolExecutor``), used instead
+        of the managed thread pool; it is not shut down by empymod.
+
+    """
+    old = _POOL['executor'] if _POOL['managed'] else None
+
+    if max_workers is None:
+        max_workers = getattr(executor, '_max_workers', os.cpu_count())
+    if max_pending is None:
+        max_pending = 2*max_workers
+
+    _POOL.update({'executor': executor, 'managed': executor is None,
+                  'max_workers': max_workers, 'max_pending': max_pending,
+                  'coalesce': coalesce})
+    _LOOPS.clear()  # Semaphores are re-created with the new `max_pending`
+
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+def _get_executor():
+    """Return the executor, create the managed thread pool if required."""
+    if _POOL['executor'] is None:
+        if _POOL['max_workers'] is None:
+            configure()
+        _POOL['executor'] = ThreadPoolExecutor(
+                _POOL['max_workers'], thread_name_prefix='empymod')
+    return _POOL['executor']
+
+
+def _get_state(loop):
+    """Return backpressure semaphore and collecting groups of `loop`."""
+    if loop not in _LOOPS:
+        if _POOL['max_pending'] is None:
+            configure()
+        _LOOPS[loop] = {'slots': asyncio.Semaphore(_POOL['max_pending']),
+                        'groups': {}}
+    return _LOOPS[loop]
+
+
+async def _submit(routine, args, kwargs):
+    """Submit a request; coalesce it with others if possible."""
+    loop = asyncio.get_running_loop()
+    state = _get_state(loop)
+
+    # Collect all parameters by name.
+    bound = inspect.signature(getattr(model, routine)).bind(*args, **kwargs)
+    inp = dict(bound.arguments)
+    inp.update(inp.pop('kwargs', {}))
+
+    # Add the request to a group; a new group is dispatched at the next
+    # iteration of the event loop, so that concurrent requests can join it.
+    key = _coalesce_key(routine, inp) if _POOL['coalesce'] else None
+    size = _size(inp) if key is not None else 0
+    group = state['groups'].get(key) if key is not None else None
+    if group is None or group['size'] + size > _COALESCE_SIZE:
+        group = {'routine': routine, 'requests': [], 'size': 0}
+        if key is not None:
+            state['groups'][key] = group
+        loop.call_soon(_dispatch, loop, state, key, group)
+
+    future = loop.create_future()
+    group['requests'].append((inp, future))
+    group['size'] += size
+    return await future
+
+
+def _dispatch(loop, state, key, group):
+    """Close the group and start its computation."""
+    if key is not None and state['groups'].get(key) is group:
+        del state['groups'][key]
+    loop.create_task(_run_group(loop, state, group))
+
+
+async def _run_group(loop, state, group):
+    """Run the computation of a group and distribute the results."""
+    async with state['slots']:
+
+        # Drop cancelled requests; nothing to do if none is left.
+        requests = [r for r in group['requests'] if not r[1].done()]
+        if not requests:
+            return
+
+        # Merge requests; run them separately if they cannot be merged.
+        if len(requests) > 1:
+            inp, nrec = _merge(requests)
+            try:
+                out = await loop.run_in_executor(
+                        _get_executor(), _compute, group['routine'], inp)
+            except Exception:
+                out = None
+            if out is not None:
+                _set_split(requests, out, nrec)
+                return
+
+        # Run each request on its own (concurrently).
+        await asyncio.gather(
+                *[_run_single(loop, group['routine'], inp, future)
+                  for inp, future in requests])
+
+
+async def _run_single(loop, routine, inp, future):
+    """Run a single request and set its result."""
+    try:
+        out = await loop.run_in_executor(
+                _get_executor(), _compute, routine, inp)
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+    else:
+        if not future.done():
+            future.set_result(out)
+
+
+def _compute(routine, inp):
+    """Run the modelling routine (in the pool)."""
+    return getattr(model, routine)(**inp)
+
+
+def _set_split(requests, out, nrec):
+    """Split the merged result along the receivers, set the results."""
+    for (inp, future), part in zip(requests, np.split(out, nrec[:-1], 1)):
+        if not future.done():
+            if inp.get('squeeze', True):
+                part = np.squeeze(part)
+            future.set_result(EMArray(part))
+
+
+def _merge(requests):
+    """Return merged input of requests and cumulative number of receivers.
+
+    Each coordinate of the receivers is broadcast to the number of receivers
+    of its request and concatenated; if it is the same single value for all
+    requests it is kept as such.
+
+    """
+    recs = [inp['rec'] for inp, _ in requests]
+    sizes = [max(np.size(v) for v in rec) for rec in recs]
+    rec = []
+    for i in range(len(recs[0])):
+        values = [r[i] for r in recs]
+        if all(np.ndim(v) == 0 and v == values[0] for v in values):
+            rec.append(values[0])
+        else:
+            rec.append(np.concatenate(
+                [np.broadcast_to(np.asarray(v, dtype=float), (n, ))
+                 for v, n in zip(values, sizes)]))
+
+    inp = {**requests[0][0], 'rec': rec, 'squeeze': False}
+    return inp, np.cumsum(sizes)
+
+
+def _coalesce_key(routine, inp):
+    """Return the key of requests which can be merged, or None."""
+
+    # Only for transforms where the offsets are independent from each other.
+    ht = inp.get('ht', 'dlf')
+    htarg = inp.get('htarg', {}) or {}
+    ftarg = inp.get('ftarg', {}) or {}
+    if not isinstance(htarg, dict) or not isinstance(ftarg, dict):
+        return None
+    if ht in ['dlf', 'qwe'] and htarg.get('pts_per_dec', 0) != 0:
+        return None
+    if ht == 'dlf' and isinstance(htarg.get('dlf'), str):
+        if htarg['dlf'] == 'auto':
+            return None
+    if ftarg.get('adaptive') is not None:
+        return None
+
+    # Not for outputs to files and finite loops.
+    if any(inp.get(k) is not None for k in
+           ['outfile', 'loop_radius', 'loop_vertices']):
+        return None
+
+    # Receivers must be a list of coordinates, and requests small enough.
+    rec = inp.get('rec')
+    if not isinstance(rec, (list, tuple)) or _size(inp) > _COALESCE_SIZE//2:
+        return None
+
+    try:
+        other = {k: v for k, v in inp.items() if k not in ['rec', 'squeeze']}
+        key = (routine, len(rec), _hashable(other))
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+
+def _size(inp):
+    """Return number of receivers times number of frequencies/times."""
+    return max(np.size(v) for v in inp['rec'])*np.size(inp.get('freqtime'))
+
+
+def _hashable(value):
+    """Return a hashable representation of the (nested) input `value`."""
+    if isinstance(value, dict):
+        return ('dict', ) + tuple(
+                (k, _hashable(v)) for k, v in sorted(value.items()))
+    elif isinstance(value, (list, tuple)):
+        return ('list', ) + tuple(_hashable(v) for v in value)
+    elif isinstance(value, np.ndarray):
+        return ('array', value.dtype.str, value.shape, value.tobytes())
+    elif isinstance(value, (str, int, float, complex, np.generic)):
+        return value
+    elif value is None:
+        return None
+    else:  # E.g., filters or functions: the very same object
+        return ('id', id(value))
@@ -27,7 +27,8 @@ import numpy as np
 
 from empymod import utils, filters
 
-__all__ = ["save_input", "load_input", "save_data", "load_data"]
+__all__ = ["save_input", "load_input", "save_data", "load_data",
+           "create_data"]
 
 
 def __dir__():
@@ -124,6 +125,10 @@ def save_data(fname, data, **kwargs):
 
         - ``.txt``: Uses numpy to store data to a plain text file.
         - ``.json``: Uses json to store inputs to a plain text file.
+        - ``.npy``: Uses numpy to store data to a binary file; the meta
+          information is stored in a JSON sidecar file ``{fname}.json``.
+        - ``.npz``: Uses numpy to store data and meta information to an
+          (uncompressed) binary archive.
 
     data : ndarray
         The output from an empymod modelling routine.
@@ -135,7 +140,9 @@ def save_data(fname, data, **kwargs):
         Information (one-line) to put into the header.
 
     kwargs : optional
-        Passed through to the saving method.
+        Passed through to the saving method (``np.savetxt`` for ``.txt``,
+        ``json.dump`` for ``.json``, and ``np.save`` for ``.npy``); not
+        possible for ``.npz``.
 
     """
     # Ensure the right dimensionality.
@@ -151,13 +158,7 @@ def save_data(fname, data, **kwargs):
 
     # Collect meta information.
     shape = data.shape
-    meta = {
-        "date": f"{time.strftime('%a %b %d %H:%M:%S %Y %Z')}",
-        "version": f"empymod v{utils.__version__}",
-        "shape": str(shape),
-        "dtype": str(data.dtype),
-        "info": kwargs.pop("info", "")
-    }
+    meta = _meta(shape, data.dtype, kwargs.pop("info", ""))
 
     # Save txt with NumPy.
     if fname.endswith(".txt"):
@@ -188,12 +189,24 @@ def save_data(fname, data, **kwargs):
             json.dump({**meta, 'data': data}, f, cls=_ComplexNumPyEncoder,
                       **{"indent": 2, **kwargs})
 
+    # Save binary NumPy file, plus JSON sidecar for the meta information.
+    elif fname.endswith(".npy"):
+        np.save(fname, np.asarray(data), **kwargs)
+        _save_meta(fname, meta)
+
+    # Save binary NumPy archive, including the meta information.
+    elif fname.endswith(".npz"):
+        if kwargs:
+            raise TypeError("Unexpected **kwargs for '.npz': "
+                            f"{list(kwargs.keys())}.")
+        np.savez(fname, data=np.asarray(data), **meta)
+
     # Unknown, throw error
     else:
         raise ValueError(f"Unknown extension '.{fname.split('.')[-1]}'.")
 
 
-def load_data(fname):
+def load_data(fname, mmap_mode=None, meta=False):
     """Load results from empymod stored with ``save_data``.
 
 
@@ -204,7 +217,18 @@ def load_data(fname):
         defines the used data format. Implemented are currently:
 
         - ``.txt``: Plain text file, loaded with np.loadtxt;
-        - ``.json``: JSON plain text file.
+        - ``.json``: JSON plain text file;
+        - ``.npy``: Binary NumPy file, loaded with np.load;
+        - ``.npz``: Binary NumPy archive, loaded with np.load.
+
+    mmap_mode : {None, 'r+', 'r', 'w+', 'c'}, default: None
+        Only for ``.npy``: If not None, the data is memory-mapped with the
+        given mode (see :func:`numpy.load`), and only read from disk when
+        accessed; this allows to slice large data without loading it all.
+
+    meta : bool, default: False
+        If True, the meta information stored by ``save_data`` is returned
+        too.
 
 
     Returns
@@ -212,26 +236,36 @@ def load_data(fname):
     EM : EMArray, (nfreqtime, nrec, nsrc)
         EM data.
 
+    info : dict
+        Meta information (``date``, ``version``, ``shape``, ``dtype``, and
+        ``info``), all as strings; only returned if ``meta=True``. It is
+        empty for a ``.npy`` file without its JSON sidecar.
+
     """
 
     # Ensure fname is absolute.
     fname = os.path.abspath(fname)
 
+    # Memory-mapping is only possible for NumPy binary files.
+    if mmap_mode is not None and not fname.endswith(".npy"):
+        raise ValueError("Memory-mapping is only implemented for '.npy'; "
+                         f"provided: '.{fname.split('.')[-1]}'.")
+
     # Load txt with NumPy.
     if fname.endswith(".txt"):
 
         # Read header for shape and dtype.
-        meta = {}
+        info = {}
         with open(fname, "r") as f:
             for line in f:
                 if "data" in line:
                     break
                 (key, val) = line.split(':', maxsplit=1)
-                meta[key.lstrip('# ')] = val.lstrip(' ').rstrip()
-        strshape = re.split(r'\(|\)', meta['shape'])[1]
+                info[key.lstrip('# ')] = val.lstrip(' ').rstrip()
+        strshape = re.split(r'\(|\)', info['shape'])[1]
         shape = tuple(map(int, strshape.split(",")))
 
-        args = {"delimiter": ",", "dtype": meta['dtype'], "encoding": "utf-8"}
+        args = {"delimiter": ",", "dtype": info['dtype'], "encoding": "utf-8"}
         data = np.loadtxt(fname, **args).reshape(shape)
 
     # Load JSON
@@ -242,17 +276,108 @@ def load_data(fname):
             inpdat = json.load(f)
 
         # If complex, re-create complex data.
-        data = np.array(inpdat['data'])
+        data = np.array(inpdat.pop('data'))
         if 'complex' in inpdat['dtype']:
             data = data[0, ...] + 1j*data[1, ...]
+        info = inpdat
+
+    # Load binary NumPy file (the sidecar is not required).
+    elif fname.endswith(".npy"):
+        data = np.load(fname, mmap_mode=mmap_mode)
+        info = {}
+        if meta and os.path.isfile(fname + ".json"):
+            with open(fname + ".json", "r", encoding="utf-8") as f:
+                info = json.load(f)
+
+    # Load binary NumPy archive.
+    elif fname.endswith(".npz"):
+        with np.load(fname) as f:
+            data = f['data']
+            info = {k: str(f[k]) for k in f.files if k != 'data'}
 
     # Unknown, throw error
     else:
         raise ValueError(f"Unknown extension '.{fname.split('.')[-1]}'.")
 
+    if meta:
+        return utils.EMArray(data), info
     return utils.EMArray(data)
 
 
+def create_data(fname, shape, dtype=complex, info=""):
+    """Create a memory-mapped data file to be filled block by block.
+
+    The file is pre-allocated (filled with zeros) and can be loaded with
+    ``load_data`` at any time, also while it is being filled.
+
+
+    Parameters
+    ----------
+    fname : str
+        File name with absolute or relative path, which must end in ``.npy``.
+        The meta information is stored in a JSON sidecar file
+        ``{fname}.json``, as done by ``save_data``.
+
+    shape : tuple, (nfreqtime, nrec, nsrc)
+        Shape of the data.
+
+    dtype : dtype, default: complex
+        Data type of the data.
+
+    info : str, default: ""
+        Additional information stored in the meta information.
+
+
+    Returns
+    -------
+    data : memmap, (nfreqtime, nrec, nsrc)
+        Writable memory-mapped array. It is stored in Fortran order, so that
+        ``data.reshape((nfreqtime, -1), order='F')`` is a view with the
+        receivers and sources on the second axis in the layout of the
+        modelling routines. Call ``data.flush()`` to write changes to disk.
+
+    """
+    # Ensure the right dimensionality.
+    if len(shape) != 3:
+        raise ValueError(
+            "Data must be 3D (nfreqtime, nrec, nsrc); provided dimensions:  "
+            f"{len(shape)}."
+        )
+
+    # Ensure fname is absolute.
+    fname = os.path.abspath(fname)
+
+    # Only NumPy binary files can be memory-mapped.
+    if not fname.endswith(".npy"):
+        raise ValueError("Memory-mapping is only implemented for '.npy'; "
+                         f"provided: '.{fname.split('.')[-1]}'.")
+
+    # Create the file and store the meta information.
+    data = np.lib.format.open_memmap(
+            fname, mode="w+", dtype=dtype, shape=tuple(shape),
+            fortran_order=True)
+    _save_meta(fname, _meta(shape, dtype, info))
+
+    return data
+
+
+def _meta(shape, dtype, info=""):
+    """Return meta information of data of given shape and dtype."""
+    return {
+        "date": f"{time.strftime('%a %b %d %H:%M:%S %Y %Z')}",
+        "version": f"empymod v{utils.__version__}",
+        "shape": str(tuple(shape)),
+        "dtype": str(np.dtype(dtype)),
+        "info": info,
+    }
+
+
+def _save_meta(fname, meta):
+    """Save meta information to the JSON sidecar of `fname`."""
+    with open(fname + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
 class _ComplexNumPyEncoder(json.JSONEncoder):
     """Custom json-encoder for NumPy, including complex data."""
 
@@ -33,13 +33,17 @@ import numpy as np
 import scipy as sp
 import numba as nb
 
-__all__ = ['wavenumber', 'angle_factor', 'fullspace', 'greenfct',
-           'reflections', 'fields', 'halfspace']
+__all__ = ['wavenumber', 'loop_wavenumber', 'angle_factor', 'fullspace',
+           'greenfct', 'reflections', 'fields', 'halfspace', 'mt_impedance',
+           'dc_wavenumber', 'dc_direct']
 
 # Numba-settings
 _numba_setting = {'nogil': True, 'cache': True}
 _numba_with_fm = {'fastmath': True, **_numba_setting}
 
+# Number of layers from which on greenfct uses the layer-streaming kernel
+_NLAYER_STREAM = 40
+
 
 def __dir__():
     return __all__
@@ -171,6 +175,43 @@ def wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
     return PJ0, PJ1, PJ0b
 
 
+def loop_wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                    lambd, xdirect):
+    r"""Calculate wavenumber domain solution of a horizontal loop.
+
+    Return the wavenumber domain solution of the vertical magnetic field of a
+    finite, horizontal loop source, as `(None, PJ1, None)`, where `PJ1` has to
+    be transformed with a Bessel function of order 1 (:math:`J_1`).
+
+    A horizontal loop of area :math:`A` is equivalent to vertical magnetic
+    dipoles distributed over :math:`A`. With the vertical-dipole kernel
+    :math:`P(\lambda)` (`PJ0` of :func:`wavenumber` for `ab=33` and magnetic
+    source and receiver) and the divergence theorem it follows
+
+    .. math::
+        :label: loopwavenumber
+
+        \int_A \int_0^\infty P(\lambda) J_0(\lambda\rho)\
+        \mathrm{d}\lambda\ \mathrm{d}A =
+        \oint \rho\ \int_0^\infty \frac{P(\lambda)}{\lambda}
+        J_1(\lambda \rho)\ \mathrm{d}\lambda\ \mathrm{d}\theta \ ,
+
+    where :math:`\rho` is the distance from the receiver to the loop and
+    :math:`\theta` the angle under which the receiver sees the loop. The
+    kernel :math:`P/\lambda` is the same for all parts of the loop; for a
+    central loop of radius :math:`a` the right-hand side reduces to
+    :math:`2\pi a` times a single :math:`J_1` Hankel transform at offset
+    :math:`a`.
+
+    See :func:`wavenumber` for the input parameters.
+
+    """
+    PJ0, _, _ = wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH,
+                           zetaV, lambd, 33, xdirect, True, True)
+
+    return None, PJ0/lambd[None, :, :], None
+
+
 @nb.njit(**_numba_setting)
 def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
              ab, xdirect, msrc, mrec):
@@ -194,10 +235,19 @@ def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
 
     This function is called from the function :func:`wavenumber`.
 
+    Models with many layers (at least 40) are computed layer-streaming, one
+    point after the other, without the arrays of shape (nfreq, noff, nlayer,
+    nlambda) for Gamma and the reflection coefficients.
+
     """
     nfreq, nlayer = etaH.shape
     noff, nlambda = lambd.shape
 
+    # Many layers: memory bound, layer-streaming is faster
+    if nlayer >= _NLAYER_STREAM:
+        return _greenfct_stream(zsrc, zrec, lsrc, lrec, depth, etaH, etaV,
+                                zetaH, zetaV, lambd, ab, xdirect, msrc, mrec)
+
     # GTM/GTE have shape (frequency, offset, lambda).
     # gamTM/gamTE have shape (frequency, offset, layer, lambda):
 
@@ -212,6 +262,11 @@ def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
             zsrc, zrec = zrec, zsrc
             lsrc, lrec = lrec, lsrc
 
+    # In an isotropic model (etaH = etaV, zetaH = zetaV) TM and TE have the
+    # same Gamma, which is then only computed once.
+    isotropic = np.all(etaH == etaV) and np.all(zetaH == zetaV)
+    have_gam = False
+
     for TM in [True, False]:
 
         # Continue if Green's function not required
@@ -227,15 +282,9 @@ def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
             e_zH, e_zV, z_eH = zetaH, zetaV, etaH  # TE: etaV not used
 
         # Uppercase gamma
-        Gam = np.zeros((nfreq, noff, nlayer, nlambda), etaH.dtype)
-        for i in range(nfreq):
-            for ii in range(noff):
-                for iii in range(nlayer):
-                    h_div_v = e_zH[i, iii]/e_zV[i, iii]
-                    h_times_h = z_eH[i, iii]*e_zH[i, iii]
-                    for iv in range(nlambda):
-                        l2 = lambd[ii, iv]*lambd[ii, iv]
-                        Gam[i, ii, iii, iv] = np.sqrt(h_div_v*l2 + h_times_h)
+        if not (isotropic and have_gam):
+            Gam = _gamma(e_zH, e_zV, z_eH, lambd, isotropic)
+            have_gam = True
 
         # Gamma in receiver layer
         lrecGam = Gam[:, :, lrec, :]
@@ -312,8 +361,10 @@ def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
 
         else:
 
-            # Calculate exponential factor
-            if lrec == nlayer-1:
+            # Calculate exponential factor (not used in the first and last
+            # layer, where Wd and Wu are zero, respectively; in the first
+            # layer, exp(-Gam*inf) would yield NaN in compiled code)
+            if lrec == nlayer-1 or lrec == 0:
                 ddepth = 0
             else:
                 ddepth = depth[lrec+1] - depth[lrec]
@@ -418,6 +469,36 @@ def greenfct(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV, lambd,
     return GTM, GTE
 
 
+@nb.njit(**_numba_setting)
+def _gamma(e_zH, e_zV, z_eH, lambd, isotropic):
+    r"""Return uppercase gamma of shape (nfreq, noff, nlayer, nlambda).
+
+    If `isotropic`, the ratio `e_zH/e_zV` is one and not computed.
+
+    """
+    nfreq, nlayer = e_zH.shape
+    noff, nlambda = lambd.shape
+
+    # Squared wavenumbers are the same for all frequencies and layers
+    l2 = lambd*lambd
+
+    Gam = np.zeros((nfreq, noff, nlayer, nlambda), e_zH.dtype)
+    for i in range(nfreq):
+        for ii in range(noff):
+            for iii in range(nlayer):
+                h_times_h = z_eH[i, iii]*e_zH[i, iii]
+                if isotropic:
+                    for iv in range(nlambda):
+                        Gam[i, ii, iii, iv] = np.sqrt(l2[ii, iv] + h_times_h)
+                else:
+                    h_div_v = e_zH[i, iii]/e_zV[i, iii]
+                    for iv in range(nlambda):
+                        Gam[i, ii, iii, iv] = np.sqrt(
+                                h_div_v*l2[ii, iv] + h_times_h)
+
+    return Gam
+
+
 @nb.njit(**_numba_with_fm)
 def reflections(depth, e_zH, Gam, lrec, lsrc):
     r"""Calculate Rp, Rm.
@@ -698,6 +779,382 @@ def fields(depth, Rp, Rm, Gam, lrec, lsrc, zsrc, ab, TM):
     return Pu, Pd
 
 
+# Layer-streaming kernel
+
+@nb.njit(**_numba_setting)
+def _greenfct_stream(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                     lambd, ab, xdirect, msrc, mrec):
+    r"""Calculate Green's function for TM and TE, layer-streaming.
+
+    Same as :func:`greenfct`, but computed for one frequency, offset, and
+    wavenumber at a time: Gamma, the layer propagators, and the reflection
+    coefficients are computed during the recursions and only kept for the
+    current point (see :func:`_green_point`), instead of in arrays of shape
+    (nfreq, noff, nlayer, nlambda). The memory is therefore independent of
+    the number of layers.
+
+    This function is called from the function :func:`greenfct`.
+
+    """
+    nfreq, nlayer = etaH.shape
+    noff, nlambda = lambd.shape
+
+    # Reciprocity switches for magnetic receivers (see greenfct)
+    if mrec:
+        if msrc:
+            etaH, zetaH = -zetaH, -etaH
+            etaV, zetaV = -zetaV, -etaV
+        else:
+            zsrc, zrec = zrec, zsrc
+            lsrc, lrec = lrec, lsrc
+
+    # Required Green's functions
+    do_tm = ab not in [16, 26]
+    do_te = ab not in [13, 23, 31, 32, 33, 34, 35]
+
+    # In an isotropic model TM and TE share Gamma and the propagators
+    share = do_tm and np.all(etaH == etaV) and np.all(zetaH == zetaV)
+
+    # <ab>-dependent signs, see _green_point
+    flagsTM = _green_signs(ab, True)
+    flagsTE = _green_signs(ab, False)
+
+    # Frequency-dependent parts of Gamma
+    hvTM = etaH/etaV
+    hvTE = zetaH/zetaV
+    hh = etaH*zetaH
+
+    # Layer thicknesses (zero for the infinite first and last layer)
+    thick = np.zeros(nlayer, depth.dtype)
+    for iii in range(1, nlayer-1):
+        thick[iii] = depth[iii+1] - depth[iii]
+
+    # Output and scratch arrays of one point
+    GTM = np.zeros((nfreq, noff, nlambda), etaH.dtype)
+    GTE = np.zeros_like(GTM)
+    gamTM = np.zeros(nlayer, etaH.dtype)
+    expTM = np.zeros_like(gamTM)
+    if share:
+        gamTE, expTE = gamTM, expTM
+    else:
+        gamTE, expTE = np.zeros_like(gamTM), np.zeros_like(gamTM)
+    Rp = np.zeros_like(gamTM)
+    Rm = np.zeros_like(gamTM)
+
+    for i in range(nfreq):
+        for ii in range(noff):
+            for iv in range(nlambda):
+                l2 = lambd[ii, iv]*lambd[ii, iv]
+
+                if do_tm:
+                    _gamma_point(hvTM[i, :], hh[i, :], l2, thick, gamTM,
+                                 expTM)
+                    GTM[i, ii, iv] = _green_point(
+                            depth, etaH[i, :], gamTM, expTM, Rp, Rm, lrec,
+                            lsrc, zsrc, zrec, flagsTM, xdirect)
+
+                if do_te:
+                    if not share:
+                        _gamma_point(hvTE[i, :], hh[i, :], l2, thick, gamTE,
+                                     expTE)
+                    GTE[i, ii, iv] = _green_point(
+                            depth, zetaH[i, :], gamTE, expTE, Rp, Rm, lrec,
+                            lsrc, zsrc, zrec, flagsTE, xdirect)
+
+                # AB-specific factors; Eqs 105-107, 111-116, 119-121, 123-128
+                if ab in [11, 12, 21, 22]:
+                    GTM[i, ii, iv] *= gamTM[lrec]/etaH[i, lrec]
+                    GTE[i, ii, iv] *= zetaH[i, lsrc]/gamTE[lsrc]
+
+                elif ab in [14, 15, 24, 25]:
+                    fact = etaH[i, lsrc]/etaH[i, lrec]
+                    GTM[i, ii, iv] *= fact*gamTM[lrec]/gamTM[lsrc]
+
+                elif ab in [13, 23]:
+                    fact = etaH[i, lsrc]/etaH[i, lrec]/etaV[i, lsrc]
+                    GTM[i, ii, iv] *= -fact*gamTM[lrec]/gamTM[lsrc]
+
+                elif ab in [31, 32]:
+                    GTM[i, ii, iv] /= etaV[i, lrec]
+
+                elif ab in [34, 35]:
+                    fact = etaH[i, lsrc]/etaV[i, lrec]
+                    GTM[i, ii, iv] *= fact/gamTM[lsrc]
+
+                elif ab in [16, 26]:
+                    fact = zetaH[i, lsrc]/zetaV[i, lsrc]
+                    GTE[i, ii, iv] *= fact/gamTE[lsrc]
+
+                elif ab in [33, ]:
+                    fact = etaH[i, lsrc]/etaV[i, lsrc]/etaV[i, lrec]
+                    GTM[i, ii, iv] *= fact/gamTM[lsrc]
+
+    # Return Green's functions
+    return GTM, GTE
+
+
+@nb.njit(**_numba_with_fm)
+def _gamma_point(h_div_v, h_times_h, l2, thick, Gam, Exp):
+    r"""Compute Gamma and the layer propagators of one point.
+
+    `Gam` and `Exp` are filled with :math:`\Gamma` and
+    :math:`\exp(-\Gamma h)` of each layer of thickness :math:`h`; the
+    propagator of the infinite first and last layer is zero.
+
+    """
+    nlayer = Gam.size
+    for iii in range(nlayer):
+        Gam[iii] = np.sqrt(h_div_v[iii]*l2 + h_times_h[iii])
+    Exp[0] = 0
+    Exp[nlayer-1] = 0
+    for iii in range(1, nlayer-1):
+        Exp[iii] = np.exp(-Gam[iii]*thick[iii])
+
+
+@nb.njit(**_numba_setting)
+def _green_signs(ab, TM):
+    r"""Return the <ab>- and TM/TE-dependent signs for :func:`_green_point`.
+
+    Returns `(pmPd, pmdir, pmw, pm)`: the sign of Pd*Wd if src and rec are in
+    the same layer, the sign of the direct field, the sign-switch for rec
+    outside of the src layer, and the plus/minus switch of :func:`fields`.
+
+    """
+    pmPd = -1 if ab in [13, 23, 31, 32, 14, 24, 15, 25] else 1
+    pmdir = 1
+    if TM and ab in [11, 12, 13, 14, 15, 21, 22, 23, 24, 25]:
+        pmdir = -1
+    pmw = 1
+    if TM and ab in [11, 12, 13, 21, 22, 23, 14, 24, 15, 25]:
+        pmw = -1
+    plus = ab in [13, 23, 33, 14, 24, 34, 15, 25, 35]
+    pm = 1 if plus == TM else -1
+    return pmPd, pmdir, pmw, pm
+
+
+@nb.njit(**_numba_with_fm)
+def _green_point(depth, e_zH, Gam, Exp, Rp, Rm, lrec, lsrc, zsrc, zrec, signs,
+                 xdirect):
+    r"""Return the TM or TE Green's function of one point.
+
+    Scalar version of the Green's function part of :func:`greenfct`, for
+    one frequency, offset, and wavenumber; `e_zH`, `Gam`, and `Exp` (see
+    :func:`_gamma_point`) are of shape (nlayer, ). `Rp` and `Rm` are scratch
+    arrays of the same shape, and `signs` are from :func:`_green_signs`.
+
+    """
+    pmPd, pmdir, pmw, pm = signs
+    nlayer = Gam.size
+    lrecGam = Gam[lrec]
+    zero = lrecGam*0
+    Pu, Pd, Wu, Wd = zero, zero, zero, zero
+
+    if nlayer > 1:
+
+        # Reflections (coming from below (Rp) and above (Rm) rec)
+        _reflections_point(e_zH, Gam, Exp, lrec, lsrc, Rp, Rm)
+
+        # Field propagators (up- (Wu) and downgoing (Wd), in rec layer)
+        if lrec != nlayer-1:
+            Wu = np.exp(-lrecGam*(depth[lrec+1] - zrec))
+        if lrec != 0:
+            Wd = np.exp(-lrecGam*(zrec - depth[lrec]))
+
+        # Field at rec level (coming from below (Pu) and above (Pd) rec)
+        Pu, Pd = _fields_point(depth, Rp, Rm, Gam, Exp, lrec, lsrc, zsrc, pm)
+
+    green = zero
+    if lsrc == lrec:  # Rec in src layer
+
+        if nlayer > 1:
+            green = Pu*Wu + pmPd*Pd*Wd
+
+        # Direct field, if it is computed in the wavenumber domain; the sign
+        # of zrec-zsrc applies for the same <ab> as the sign of Pd*Wd
+        if not xdirect:
+            directf = pmdir*np.exp(-lrecGam*abs(zsrc - zrec))
+            if pmPd < 0:
+                directf *= np.sign(zrec - zsrc)
+            green += directf
+
+    else:
+
+        # Exponential factor (not used in the first and last layer)
+        if lrec == nlayer-1 or lrec == 0:
+            fexp = zero + 1
+        else:
+            fexp = Exp[lrec]
+
+        if lrec < lsrc:  # Rec above src layer: Pd not used
+            green = Pu*(Wu + pmw*Rm[0]*fexp*Wd)
+        else:            # Rec below src layer: Pu not used
+            green = Pd*(pmw*Wd + Rp[lrec-lsrc]*fexp*Wu)
+
+    return green
+
+
+@nb.njit(**_numba_with_fm)
+def _reflections_point(e_zH, Gam, Exp, lrec, lsrc, Rp, Rm):
+    r"""Compute Rp, Rm of one point.
+
+    Scalar version of :func:`reflections`. The global reflection coefficients
+    of the layers between and including src- and rec-layer are stored in `Rp`
+    and `Rm`, starting at index 0 for the upper of the two layers; only the
+    current coefficient is kept during the recursion.
+
+    """
+    nlayer = Gam.size
+    if lrec > lsrc:
+        maxl, minl = lrec, lsrc
+    else:
+        maxl, minl = lsrc, lrec
+    Rp[:maxl-minl+1] = 0
+    Rm[:maxl-minl+1] = 0
+
+    # Coming from below, Eqs 64/65
+    tRef = Gam[0]*0
+    for iz in range(nlayer-2, minl-1, -1):
+        rloca = e_zH[iz+1]*Gam[iz]
+        rlocb = e_zH[iz]*Gam[iz+1]
+        rloc = (rloca - rlocb)/(rloca + rlocb)
+        if iz == nlayer-2:
+            tRef = rloc
+        else:
+            term = tRef*Exp[iz+1]*Exp[iz+1]
+            tRef = (rloc + term)/(1 + rloc*term)
+        if iz <= maxl:
+            Rp[iz-minl] = tRef
+
+    # Coming from above, Eqs A-11/A-12
+    for iz in range(1, maxl+1):
+        rloca = e_zH[iz-1]*Gam[iz]
+        rlocb = e_zH[iz]*Gam[iz-1]
+        rloc = (rloca - rlocb)/(rloca + rlocb)
+        if iz == 1:
+            tRef = rloc
+        else:
+            term = tRef*Exp[iz-1]*Exp[iz-1]
+            tRef = (rloc + term)/(1 + rloc*term)
+        if iz >= minl:
+            Rm[iz-minl] = tRef
+
+
+@nb.njit(**_numba_with_fm)
+def _fields_point(depth, Rp, Rm, Gam, Exp, lrec, lsrc, zsrc, pm):
+    r"""Return Pu, Pd of one point.
+
+    Scalar version of :func:`fields`, with `Rp` and `Rm` as computed by
+    :func:`_reflections_point`; `pm` is +1 (plus) or -1 (minus).
+
+    """
+    nlayer = Gam.size
+
+    # Variables
+    nlsr = abs(lsrc-lrec)+1  # nr of layers btw and incl. src and rec layer
+    rsrcl = 0  # src-layer in reflection (Rp/Rm), first if down
+    izstart, izstop = 2, nlsr
+    isr = lsrc
+    last = nlayer-1
+
+    # Booleans if src in first or last layer; swapped if up=True
+    first_layer = lsrc == 0
+    last_layer = lsrc == nlayer-1
+
+    # Depths; dp and dm are swapped if up=True
+    dm = zsrc-depth[lsrc]
+    dp = zsrc-zsrc
+    if lsrc != nlayer-1:
+        dp = depth[lsrc+1]-zsrc
+
+    # Propagator of the source layer
+    iExp = Exp[lsrc]
+
+    # Rm and Rp; swapped if up=True
+    Rmp = Rm
+    Rpm = Rp
+
+    # Sign-switches
+    pup = -1   # + if up=True,   - if up=False
+    mupm = 1   # + except if up=True and plus=False
+
+    # Gamma of source layer
+    iGam = Gam[lsrc]
+    Pu = iGam*0
+    Pd = iGam*0
+
+    # Calculate down- and up-going fields
+    for up in [False, True]:
+
+        # No upgoing field if rec is in last layer or below src
+        if up and (lrec == nlayer-1 or lrec > lsrc):
+            continue
+        # No downgoing field if rec is in first layer or above src
+        if not up and (lrec == 0 or lrec < lsrc):
+            continue
+
+        # Swaps if up=True
+        if up:
+            if not last_layer:
+                dp, dm = dm, dp
+            else:
+                dp = dm
+            Rmp, Rpm = Rpm, Rmp
+            first_layer, last_layer = last_layer, first_layer
+            rsrcl = nlsr-1  # src-layer in refl. (Rp/Rm), last (nlsr-1) if up
+            izstart, izstop = 0, nlsr-2
+            isr = lrec
+            last = 0
+            pup = 1
+            mupm = pm
+
+        # Calculate Pu+, Pu-, Pd+, Pd-
+        if lsrc == lrec:  # rec in src layer; Eqs  81/82, A-8/A-9
+            if last_layer:  # If src/rec are in top (up) or bottom (down) layer
+                P = Rmp[0]*np.exp(-iGam*dm)
+
+            else:           # If src and rec are in any layer in between
+                p1 = np.exp(-iGam*dm)
+                p2 = pm*Rpm[0]*iExp*np.exp(-iGam*dp)
+                p3 = 1 - Rmp[0]*Rpm[0]*iExp*iExp
+                P = (p1 + p2)*Rmp[0]/p3
+
+        else:           # rec above (up) / below (down) src layer
+            #           # Eqs  95/96,  A-24/A-25 for rec above src layer
+            #           # Eqs 103/104, A-32/A-33 for rec below src layer
+
+            # First compute P_{s-1} (up) / P_{s+1} (down)
+            iRpm = Rpm[rsrcl]
+            if first_layer:  # If src is in bottom (up) / top (down) layer
+                P = (1 + iRpm)*mupm*np.exp(-iGam*dp)
+            else:
+                iRmp = Rmp[rsrcl]
+                p1 = mupm*np.exp(-iGam*dp)
+                p2 = pm*mupm*iRmp*iExp*np.exp(-iGam*dm)
+                p3 = (1 + iRpm)/(1 - iRmp*iRpm*iExp*iExp)
+                P = (p1 + p2)*p3
+
+            # If up or down and src is in last but one layer
+            if up or (not up and lsrc+1 < nlayer-1):
+                P /= 1 + Rpm[rsrcl-1*pup]*Exp[lsrc-1*pup]*Exp[lsrc-1*pup]
+
+            # Second compute P for all other layers
+            for iz in range(izstart, izstop):
+                P *= (1+Rpm[iz+pup])*Exp[isr+iz+pup]
+
+                # If rec/src NOT in first/last layer (up/down)
+                if isr+iz != last:
+                    P /= 1 + Rpm[iz]*Exp[isr+iz]*Exp[isr+iz]
+
+        # Store P in Pu/Pd
+        if up:
+            Pu = P
+        else:
+            Pd = P
+
+    # Return fields (up- and downgoing)
+    return Pu, Pd
+
+
 # Angle Factor
 
 def angle_factor(angle, ab, msrc, mrec):
@@ -1238,3 +1695,321 @@ def halfspace(off, angle, zsrc, zrec, etaH, etaV, freqtime, ab, signal,
         return direct_TE, direct_TM, reflect_TE, reflect_TM, air
     else:
         return direct + reflect + air
+
+
+# Magnetotellurics
+
+@nb.njit(**_numba_with_fm)
+def mt_impedance(thick, res, epermH, mpermH, freq):
+    r"""Return the 1D magnetotelluric surface impedance.
+
+    Plane-wave impedance :math:`Z = E_x/H_y` at the top of a stack of layers,
+    following the recursion of Pedersen and Hermance (1986), from the bottom
+    half-space (:math:`Z_N = z_{0N}`) upwards,
+
+    .. math::
+        :label: mtimpedance
+
+        Z_j = z_{0j} \frac{1 - R_j \exp(-2\Gamma_j t_j)}
+                          {1 + R_j \exp(-2\Gamma_j t_j)} \ , \qquad
+        R_j = \frac{z_{0j} - Z_{j+1}}{z_{0j} + Z_{j+1}} \ ,
+
+    with :math:`\Gamma_j = \sqrt{\eta_{H,j}\zeta_{H,j}}`, the intrinsic
+    impedance :math:`z_{0j} = \sqrt{\zeta_{H,j}/\eta_{H,j}}`, and the
+    thickness :math:`t_j`. For vertical incidence only the horizontal
+    parameters are relevant. The parameters :math:`\eta_H` and
+    :math:`\zeta_H` are computed on the fly (as in
+    :func:`empymod.utils.check_frequency`), to avoid storing them for all
+    models and frequencies.
+
+    Parameters
+    ----------
+    thick : ndarray, (nmodel or 1, nlayer-1)
+        Layer thicknesses (m), without the bottom half-space.
+
+    res, epermH, mpermH : ndarray, (nmodel, nlayer)
+        Horizontal resistivities (Ohm.m), relative electric permittivities and
+        magnetic permeabilities (-).
+
+    freq : ndarray, (nfreq, )
+        Frequencies (Hz).
+
+
+    Returns
+    -------
+    Z : ndarray, (nmodel, nfreq)
+        Surface impedance (Ohm).
+
+    """
+    nmodel, nlayer = res.shape
+    nfreq = freq.size
+    Z = np.zeros((nmodel, nfreq), dtype=np.complex128)
+
+    mu_0 = 4e-7*np.pi
+    epsilon_0 = 1./(mu_0*299792458.0**2)
+
+    for m in range(nmodel):
+        mt = m if thick.shape[0] > 1 else 0
+        for f in range(nfreq):
+            sval = 2j*np.pi*freq[f]
+
+            # Impedance of the bottom half-space
+            etaH = 1/res[m, -1] + sval*epermH[m, -1]*epsilon_0
+            Zj = np.sqrt(sval*mpermH[m, -1]*mu_0/etaH)
+
+            # Move up the stack of layers
+            for j in range(nlayer-2, -1, -1):
+                etaH = 1/res[m, j] + sval*epermH[m, j]*epsilon_0
+                zetaH = sval*mpermH[m, j]*mu_0
+                Gam = np.sqrt(etaH*zetaH)
+                z0j = zetaH/Gam
+                Rexp = (z0j - Zj)/(z0j + Zj)*np.exp(-2*Gam*thick[mt, j])
+                Zj = z0j*(1 - Rexp)/(1 + Rexp)
+
+            Z[m, f] = Zj
+
+    return Z
+
+
+# DC resistivity
+
+@nb.njit(**_numba_setting)
+def dc_wavenumber(zsrc, zrec, lsrc, lrec, depth, res, aniso, lambd,
+                  xdirect):
+    r"""Return the wavenumber-domain DC potential of a point current source.
+
+    Static (zero-frequency) limit of the TM-mode Green's function
+    :func:`greenfct` for a unit point current source: the potential
+    :math:`\phi` solves :math:`\nabla\cdot(\sigma\nabla\phi)=-\delta`,
+    with :math:`\sigma` the (VTI) conductivity. In the wavenumber domain it is
+
+    .. math::
+        :label: dcwavenumber
+
+        \phi(r, z_r) = \int_0^\infty \tilde{\phi}(\lambda, z_r)
+                       J_0(\lambda r) \,\mathrm{d}\lambda \ , \qquad
+        \tilde{\phi}(\lambda, z_s) = \frac{1}{2\pi(Y^+ + Y^-)} \ ,
+
+    where :math:`Y^\pm` are the admittances below and above the source,
+    divided by :math:`\lambda`, computed with the transmission-line
+    recursion
+
+    .. math::
+
+        Y_j = y_j \frac{Y_{j+1} + y_j \tanh(\lambda a_j h_j)}
+                       {y_j + Y_{j+1} \tanh(\lambda a_j h_j)} \ ,
+
+    with :math:`y_j = 1/(\rho_{h,j} a_j)` and the anisotropy :math:`a_j`. The
+    potential is then propagated from the source to the receiver depth.
+    Everything is real-valued, there are no frequencies involved.
+
+    If `xdirect` is True and source and receiver are in the same layer, the
+    direct potential :math:`c\exp(-\lambda a_s|z_r-z_s|)` is subtracted,
+    where :math:`c` is the large-wavenumber limit of the kernel at the source
+    (:math:`c=1/(4\pi y_s)` within a layer); it has to be added analytically
+    in the space domain, see :func:`dc_direct`. This removes the
+    non-decaying part of the kernel, which is badly resolved by the DLF.
+
+    Parameters
+    ----------
+    zsrc, zrec : float
+        Source and receiver depths (m).
+
+    lsrc, lrec : int
+        Layer in which the source and the receiver reside.
+
+    depth : ndarray
+        Depths of the layer interfaces (m); the first entry is -inf.
+
+    res, aniso : ndarray
+        Horizontal resistivities (Ohm.m) and anisotropies (-) of the layers.
+
+    lambd : ndarray, (noff, nlambda)
+        Wavenumbers lambda (1/m).
+
+    xdirect : bool
+        If True, the direct potential is not included in the kernel.
+
+
+    Returns
+    -------
+    PJ0 : ndarray, (1, noff, nlambda)
+        Wavenumber-domain potential, to be transformed with :math:`J_0`.
+
+    """
+    nlayer = depth.size
+    noff, nlambda = lambd.shape
+    PJ0 = np.zeros((1, noff, nlambda), dtype=np.float64)
+
+    # Admittances (divided by lambda) of the layers and interface admittances
+    # looking down (below each layer) and up (above each layer).
+    y = 1/(res*aniso)
+    Ydown = np.zeros(nlayer)
+    Yup = np.zeros(nlayer)
+    cdir = _dc_direct_fact(zsrc, lsrc, depth, y)
+
+    for i in range(noff):
+        for ii in range(nlambda):
+            lmbd = lambd[i, ii]
+
+            # Recursions from the bottom up and from the top down
+            Ydown[nlayer-1] = y[nlayer-1]
+            for j in range(nlayer-2, -1, -1):
+                Ydown[j] = _dc_admittance(Ydown[j+1], y[j+1], _dc_dist(
+                    lmbd*aniso[j+1], depth[j+1], j+1, depth, True))
+            Yup[0] = y[0]
+            for j in range(1, nlayer):
+                Yup[j] = _dc_admittance(Yup[j-1], y[j-1], _dc_dist(
+                    lmbd*aniso[j-1], depth[j], j-1, depth, False))
+
+            # Admittances at the source depth
+            Yd = _dc_admittance(Ydown[lsrc], y[lsrc], _dc_dist(
+                    lmbd*aniso[lsrc], zsrc, lsrc, depth, True))
+            Yu = _dc_admittance(Yup[lsrc], y[lsrc], _dc_dist(
+                    lmbd*aniso[lsrc], zsrc, lsrc, depth, False))
+            phi = 1/(2*np.pi*(Yd + Yu))
+
+            # Propagate the potential from the source to the receiver
+            if zrec > zsrc:
+                if lrec == lsrc:
+                    Yr = _dc_admittance(Ydown[lrec], y[lrec], _dc_dist(
+                        lmbd*aniso[lrec], zrec, lrec, depth, True))
+                    phi *= _dc_ratio(Yr, y[lrec], lmbd*aniso[lrec]*(
+                        zrec-zsrc))
+                else:
+                    phi *= _dc_ratio(Ydown[lsrc], y[lsrc], lmbd*aniso[lsrc]*(
+                        depth[lsrc+1]-zsrc))
+                    for j in range(lsrc+1, lrec):
+                        phi *= _dc_ratio(Ydown[j], y[j], lmbd*aniso[j]*(
+                            depth[j+1]-depth[j]))
+                    Yr = _dc_admittance(Ydown[lrec], y[lrec], _dc_dist(
+                        lmbd*aniso[lrec], zrec, lrec, depth, True))
+                    phi *= _dc_ratio(Yr, y[lrec], lmbd*aniso[lrec]*(
+                        zrec-depth[lrec]))
+
+            elif zrec < zsrc:
+                if lrec == lsrc:
+                    Yr = _dc_admittance(Yup[lrec], y[lrec], _dc_dist(
+                        lmbd*aniso[lrec], zrec, lrec, depth, False))
+                    phi *= _dc_ratio(Yr, y[lrec], lmbd*aniso[lrec]*(
+                        zsrc-zrec))
+                else:
+                    phi *= _dc_ratio(Yup[lsrc], y[lsrc], lmbd*aniso[lsrc]*(
+                        zsrc-depth[lsrc]))
+                    for j in range(lsrc-1, lrec, -1):
+                        phi *= _dc_ratio(Yup[j], y[j], lmbd*aniso[j]*(
+                            depth[j+1]-depth[j]))
+                    Yr = _dc_admittance(Yup[lrec], y[lrec], _dc_dist(
+                        lmbd*aniso[lrec], zrec, lrec, depth, False))
+                    phi *= _dc_ratio(Yr, y[lrec], lmbd*aniso[lrec]*(
+                        depth[lrec+1]-zrec))
+
+            # Remove direct potential
+            if xdirect and lsrc == lrec:
+                phi -= cdir*np.exp(-lmbd*aniso[lsrc]*abs(zrec-zsrc))
+
+            PJ0[0, i, ii] = phi
+
+    return PJ0
+
+
+def dc_direct(off, zsrc, zrec, lsrc, depth, res, aniso):
+    r"""Return the direct DC potential of a point source.
+
+    Space-domain counterpart of the direct potential removed in
+    :func:`dc_wavenumber` if `xdirect=True`,
+
+    .. math::
+        :label: dcdirect
+
+        \phi_d = \frac{c}{\sqrt{r^2 + a_s^2 (z_r-z_s)^2}} \ ,
+
+    for a unit current, where :math:`r` is the horizontal offset and
+    :math:`a_s` the anisotropy of the source layer. Within a layer,
+    :math:`c=\rho_{h,s}a_s/(4\pi)`, which is the potential in a VTI
+    full-space. For a source on an interface, :math:`c` accounts for the
+    layers on both sides; e.g., for a source at the surface of a half-space
+    it is :math:`\rho_h a/(2\pi)`.
+
+    Parameters
+    ----------
+    off : ndarray
+        Horizontal offsets (m).
+
+    zsrc, zrec : float
+        Source and receiver depths (m).
+
+    lsrc : int
+        Layer in which the source resides.
+
+    depth : ndarray
+        Depths of the layer interfaces (m); the first entry is -inf.
+
+    res, aniso : ndarray
+        Horizontal resistivities (Ohm.m) and anisotropies (-) of the layers.
+
+
+    Returns
+    -------
+    phi : ndarray
+        Potential (V) for a unit current, same shape as `off`.
+
+    """
+    cdir = _dc_direct_fact(zsrc, lsrc, depth, 1/(res*aniso))
+    return cdir/np.sqrt(off**2 + (aniso[lsrc]*(zrec-zsrc))**2)
+
+
+@nb.njit(**_numba_setting)
+def _dc_direct_fact(zsrc, lsrc, depth, y):
+    r"""Large-wavenumber limit of the DC kernel at the source depth."""
+    ydown = y[lsrc]
+    if lsrc < depth.size-1 and zsrc == depth[lsrc+1]:
+        ydown = y[lsrc+1]
+    yup = y[lsrc]
+    if lsrc > 0 and zsrc == depth[lsrc]:
+        yup = y[lsrc-1]
+    return 1/(2*np.pi*(ydown + yup))
+
+
+@nb.njit(**_numba_setting)
+def _dc_dist(lmbda, z, layer, depth, down):
+    r"""Return lambda*a times distance from z to the bottom/top of layer.
+
+    Returns -1 if that boundary is at infinity (the admittance does not
+    change within the half-spaces).
+    """
+    if down:
+        if layer == depth.size-1:
+            return -1.0
+        return lmbda*(depth[layer+1]-z)
+    else:
+        if layer == 0:
+            return -1.0
+        return lmbda*(z-depth[layer])
+
+
+@nb.njit(**_numba_setting)
+def _dc_admittance(Yin, yj, x):
+    r"""Move admittance `Yin` through a layer of admittance `yj`.
+
+    `x` is lambda*aniso*thickness; a negative `x` denotes a half-space, for
+    which the admittance is `yj`.
+    """
+    if x < 0:
+        return yj
+    t = np.tanh(x)
+    return yj*(Yin + yj*t)/(yj + Yin*t)
+
+
+@nb.njit(**_numba_setting)
+def _dc_ratio(Yin, yj, x):
+    r"""Ratio of the potential over a distance within a layer.
+
+    Potential at the far end divided by the potential at the near end, where
+    the far end has the admittance `Yin` (looking away from the near end),
+    and `x` is lambda*aniso*distance. Written in decaying exponentials only,
+    which is stable for large `x`.
+    """
+    rho = Yin/yj
+    ex = np.exp(-x)
+    return 2*ex/((1 + rho) + (1 - rho)*ex*ex)
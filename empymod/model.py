@@ -22,6 +22,8 @@ Further routines are:
 - :func:`dipole_k`: Calculate the electromagnetic wavenumber-domain solution.
 - :func:`gpr`: Calculate the Ground-Penetrating Radar (GPR) response.
 - :func:`ip_and_q`: Calculate in-phase and quadrature responses.
+- :func:`mt`: Calculate 1D magnetotelluric (plane-wave) responses.
+- :func:`dc`: Calculate DC resistivity (zero-frequency) responses.
 
 The :func:`dipole_k` routine can be used if you are interested in the
 wavenumber-domain result, without Hankel nor Fourier transform. It calls
@@ -52,25 +54,38 @@ The modelling routines make use of the following two core routines:
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
 # License for the specific language governing permissions and limitations under
 # the License.
-import copy
+import threading
+from collections import OrderedDict
 
 import numpy as np
+import scipy as sp
 
-from empymod import kernel, transform
+from empymod import io, kernel, transform
+from empymod.profiling import span, traced, annotate
 from empymod.utils import (
-        check_time, check_time_only, check_model, check_frequency,
-        check_hankel, check_loop, check_dipole, check_bipole, check_ab,
-        check_solution, get_abs, get_geo_fact, get_azm_dip, get_off_ang,
-        get_layer_nr, get_kwargs, printstartfinish, conv_warning, EMArray)
+        check_time, check_time_only, check_model, check_batch_model,
+        check_frequency, check_hankel, check_loop, check_dipole, check_bipole,
+        check_ab, check_solution, check_waveform, check_gates, check_lowpass,
+        check_finite_loop, check_mt, check_dc, get_abs, get_geo_fact,
+        get_azm_dip, get_off_ang, get_batch_off_ang, get_layer_nr, get_kwargs,
+        get_minimum, printstartfinish, conv_warning, dlf_auto_info,
+        adaptive_info, EMArray)
 
 __all__ = ['bipole', 'dipole', 'loop', 'analytical', 'gpr', 'dipole_k',
-           'ip_and_q', 'fem', 'tem']
+           'ip_and_q', 'mt', 'dc', 'fem', 'tem']
 
 
 def __dir__():
     return __all__
 
 
+# Cache of primary fields of ip_and_q
+_IP_AND_Q_PRIMARY = OrderedDict()
+_IP_AND_Q_PRIMARY_MAXSIZE = 128
+_IP_AND_Q_PRIMARY_LOCK = threading.Lock()
+
+
+@traced('model.bipole')
 def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
            epermH=None, epermV=None, mpermH=None, mpermV=None, msrc=False,
            srcpts=1, mrec=False, recpts=1, strength=0, **kwargs):
@@ -131,6 +146,10 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
     freqtime : array_like
         Frequencies f (Hz) if `signal==None`, else times t (s); (f, t > 0).
 
+        If `signal==None` and all values are negative, they are taken as
+        Laplace-domain values s = -f (1/s); the kernel and the Hankel
+        transform are then computed in real (float64) arithmetic.
+
     signal : {None, 0, 1, -1}, default: None
         Source signal:
 
@@ -139,6 +158,8 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
         - 0 : Impulse time-domain response
         - +1 : Switch-on time-domain response
 
+        Ignored if `waveform` is provided.
+
     aniso : array_like, default: ones
         Anisotropies lambda = sqrt(rho_v/rho_h) (-); #aniso = #res.
 
@@ -202,6 +223,14 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
             - If < 0: Lagged Convolution DLF.
             - If > 0: Splined DLF
 
+          If `dlf='auto'`, the shortest filter and the cheapest DLF type
+          (unless `pts_per_dec` is provided) meeting the tolerances `rtol`
+          (default: 1e-6) and `atol` (default: 1e-30) are selected by probing
+          the actual kernel; see :func:`empymod.transform.get_dlf_auto`.
+          The selection is made once, for the first source-receiver depth
+          combination (its offsets, depths, and frequencies), and used for
+          all others.
+
         - If `ht='qwe'`:
 
           - `rtol`: relative tolerance (default: 1e-12)
@@ -219,6 +248,9 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
           - `a`: lower limit for QUAD (default: first interval from QWE)
           - `b`: upper limit for QUAD (default: last interval from QWE)
           - `limit`: limit for quad (default: maxint)
+          - `workers`: number of threads to distribute the QUAD-integrations
+            of the different offsets (-1 means all CPUs), or a map-like
+            callable such as ``multiprocessing.Pool(n).map``. (default: 1)
 
         - If `ht='quad'`:
 
@@ -229,6 +261,9 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
           - `a`: Minimum wavenumber (default 1e-6)
           - `b`: Maximum wavenumber (default 0.1)
           - `pts_per_dec`: points per decade (default: 40)
+          - `workers`: number of threads to distribute the integrations of
+            the different offsets (-1 means all CPUs), or a map-like callable
+            such as ``multiprocessing.Pool(n).map``. (default: 1)
 
     ft : {'dlf', 'sin', 'cos', 'qwe', 'fftlog', 'fft'}, default: 'dlf'
         Only used if signal!=None. Flag to choose either the Digital Linear
@@ -286,6 +321,15 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
           given number per decade, and then interpolated to yield the required
           frequencies for the FFT.
 
+        - For all `ft`:
+
+          - `adaptive`: relative tolerance for adaptive frequency sampling
+            (default: None). If set, the frequency-domain response is only
+            computed at an adaptively refined subset of the required
+            frequencies, starting at about one frequency per decade, and
+            interpolated with cubic splines at the others. Number of computed
+            frequencies is printed if ``verb>2``.
+
     xdirect : bool or None, default: False
         Direct field calculation (only if src and rec are in the same layer):
 
@@ -304,10 +348,51 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
         be faster to loop over frequencies. Only comparing the different
         versions will yield the answer for your specific problem at hand!
 
+    waveform : dict, default: None
+        Piecewise-linear source waveform for time-domain responses, with the
+        keys:
+
+        - `time`: times (s) of the waveform points;
+        - `current`: current (A) at the waveform points, usually normalized to
+          [0, 1]; the current is zero before the first and constant after the
+          last point;
+        - `nquad`: order of the Gauss-Legendre quadrature per waveform segment
+          (default: 3).
+
+        If provided, `freqtime` are times and the response to the waveform is
+        returned; it is obtained by convolving the switch-on response with the
+        derivative of the waveform, using a precomputed quadrature operator.
+
+    lowpass : float, tuple, callable, or list of those; default: None
+        Lowpass filter(s) of the system, applied to the frequency-domain
+        response (hence also before the Fourier transform). Each filter is
+        either:
+
+        - a float: cut-off frequency (Hz) of a first-order Butterworth filter;
+        - a tuple ``(cutoff, order)``: Butterworth filter of given order;
+        - a callable: returns the complex frequency response for given
+          frequencies (Hz).
+
+    gates : array_like, (nfreqtime, 2), default: None
+        Opening and closing times (s) of receiver gates, one gate per time in
+        `freqtime` (usually the gate centres). If provided, the average of the
+        time-domain response over each gate is returned, obtained with a
+        Gauss-Legendre quadrature (in log-time) of five points per gate.
+
     squeeze : bool, default: True
         If True, the output is squeezed. If False, the output will always be of
         ``ndim=3``, (nfreqtime, nrec, nsrc).
 
+    outfile : str, default: None
+        File name (ending in ``.npy``) to stream the result to disk. The file
+        is pre-allocated with :func:`empymod.io.create_data`, and the response
+        of each source/receiver-depth block is written to it as soon as it is
+        finished (including lowpass filters and the Fourier transform). The
+        peak memory is then bounded by one block instead of the entire
+        result, and finished blocks survive an interruption. The returned
+        EMArray is memory-mapped to the file; it can be loaded later with
+        :func:`empymod.io.load_data`.
+
 
     Returns
     -------
@@ -386,21 +471,40 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
     """
     # Get kwargs with defaults.
     out = get_kwargs(
-        ['verb', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'squeeze'],
-        [2, 'dlf', {}, 'dlf', {}, False, None, True], kwargs,
+        ['verb', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'squeeze',
+         'waveform', 'lowpass', 'gates', 'outfile'],
+        [2, 'dlf', {}, 'dlf', {}, False, None, True, None, None, None, None],
+        kwargs,
     )
-    verb, ht, htarg, ft, ftarg, xdirect, loop, squeeze = out
+    verb, ht, htarg, ft, ftarg, xdirect, loop, squeeze = out[:8]
+    waveform, lowpass, gates, outfile = out[8:]
 
     # === 1.  LET'S START ============
     t0 = printstartfinish(verb)
 
     # === 2.  CHECK INPUT ============
 
+    # Check instrument response: lowpass filters and gates
+    if lowpass is not None:
+        lowpass = check_lowpass(lowpass, verb)
+    if gates is not None:
+        gates = check_gates(
+                gates, freqtime, 1 if waveform is not None else signal, verb)
+        freqtime = gates['gtime']
+
+    # Check waveform; its response is obtained from the switch-on response
+    if waveform is not None:
+        waveform = check_waveform(waveform, freqtime, verb)
+        freqtime, signal = waveform['qtime'], 1
+
     # Check times and Fourier Transform arguments and get required frequencies
     if signal is None:
         freq = freqtime
+        time = None
+        adaptive = None
     else:
         time, freq, ft, ftarg = check_time(freqtime, signal, ft, ftarg, verb)
+        adaptive = _get_adaptive(ftarg, signal)
 
     # Check layer parameters
     model = check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV,
@@ -439,12 +543,30 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
     # === 3. EM-FIELD CALCULATION ============
 
     # Pre-allocate output EM array
-    EM = np.zeros((freq.size, nrec*nsrc), dtype=etaH.dtype)
+    if outfile is None:
+        EM = np.zeros((freq.size, nrec*nsrc), dtype=etaH.dtype)
 
-    # Initialize kernel count, conv (only for QWE)
+    # If streaming, pre-allocate the output file instead, in its final shape
+    else:
+        if signal is None:
+            nout, odtype = freq.size, etaH.dtype
+        elif gates is not None:
+            nout, odtype = gates['operator'].shape[0], float
+        elif waveform is not None:
+            nout, odtype = waveform['operator'].shape[0], float
+        else:
+            nout, odtype = time.size, float
+        mEM = io.create_data(outfile, (nout, nrec, nsrc), odtype)
+        EM = mEM.reshape((nout, nrec*nsrc), order='F')  # View of the file
+        if verb > 2:
+            print(f"   Output file     :  {mEM.filename}")
+
+    # Initialize kernel count, conv (only for QWE), and fconv (Fourier
+    # transform; only used here if streaming)
     # (how many times the wavenumber-domain kernel was calld)
     kcount = 0
     conv = True
+    fconv = True
 
     # Define some indices
     isrc = int(nsrc/nsrcz)  # this is either 1 or nsrc
@@ -517,7 +639,7 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
                     for iab in ab_calc:  # Loop over required ab's
 
                         # Carry-out the frequency-domain calculation
-                        out = fem(iab, *finp)
+                        out = fem(iab, *finp, adaptive=adaptive)
 
                         # Get geometrical scaling factor,
                         # broadcast to (irec, isrc)
@@ -551,6 +673,12 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
             if rec_j:
                 sEM *= etaH[:, lrec, None]
 
+            # If streaming, apply lowpass and f->t transform to this block
+            if outfile is not None:
+                sEM, out = _output(sEM, freq, time, signal, ft, ftarg,
+                                   lowpass, waveform, gates)
+                fconv *= out
+
             # Add this src-rec signal
             if nrec == nrecz:
                 if nsrc == nsrcz:  # Case 1: Looped over each src and each rec
@@ -560,30 +688,45 @@ def bipole(src, rec, depth, res, freqtime, signal=None, aniso=None,
             else:
                 if nsrc == nsrcz:  # Case 3: Looped over each src
                     EM[:, isz*nrec:nrec*(isz+1)] = sEM
-                else:              # Case 4: All in one go
+                elif outfile is None:  # Case 4: All in one go
                     EM = sEM
+                else:
+                    EM[...] = sEM
+
+            # Write this block to disk
+            if outfile is not None:
+                mEM.flush()
 
     # In case of QWE/QUAD, print Warning if not converged
     conv_warning(conv, htarg, 'Hankel', verb)
+    dlf_auto_info(htarg, verb)
 
-    # Do f->t transform if required
-    if signal is not None:
-        EM, conv = tem(EM, EM[0, :], freq, time, signal, ft, ftarg)
+    # Apply lowpass filters and do f->t transform if required
+    if outfile is None:
+        EM, fconv = _output(EM, freq, time, signal, ft, ftarg, lowpass,
+                            waveform, gates)
 
+    if signal is not None:
         # In case of QWE/QUAD, print Warning if not converged
-        conv_warning(conv, ftarg, 'Fourier', verb)
+        conv_warning(fconv, ftarg, 'Fourier', verb)
+        adaptive_info(adaptive, verb)
 
-    # Reshape for number of sources
-    EM = EM.reshape((-1, nrec, nsrc), order='F')
+    # Reshape for number of sources (the streamed file has the final shape)
+    if outfile is None:
+        EM = EM.reshape((-1, nrec, nsrc), order='F')
+    else:
+        EM = mEM
     if squeeze:
         EM = np.squeeze(EM)
 
     # === 4.  FINISHED ============
+    annotate(nfreq=freq.size, nrec=nrec, nsrc=nsrc, kcount=kcount)
     printstartfinish(verb, t0, kcount)
 
     return EMArray(EM)
 
 
+@traced('model.dipole')
 def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
            epermH=None, epermV=None, mpermH=None, mpermV=None, **kwargs):
     r"""Return EM fields due to infinitesimal small EM dipoles.
@@ -638,6 +781,10 @@ def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
     freqtime : array_like
         Frequencies f (Hz) if `signal==None`, else times t (s); (f, t > 0).
 
+        If `signal==None` and all values are negative, they are taken as
+        Laplace-domain values s = -f (1/s); the kernel and the Hankel
+        transform are then computed in real (float64) arithmetic.
+
     signal : {None, 0, 1, -1}, default: None
         Source signal:
 
@@ -745,8 +892,10 @@ def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
     # (freq = freqtime if `signal=None`)
     if signal is not None:
         time, freq, ft, ftarg = check_time(freqtime, signal, ft, ftarg, verb)
+        adaptive = _get_adaptive(ftarg, signal)
     else:
         freq = freqtime
+        adaptive = None
 
     # Check layer parameters
     model = check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV,
@@ -791,10 +940,11 @@ def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
     inp = (ab_calc, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH,
            etaV, zetaH, zetaV, xdirect, isfullspace, ht, htarg, msrc, mrec,
            loop_freq, loop_off)
-    EM, kcount, conv = fem(*inp)
+    EM, kcount, conv = fem(*inp, adaptive=adaptive)
 
     # In case of QWE/QUAD, print Warning if not converged
     conv_warning(conv, htarg, 'Hankel', verb)
+    dlf_auto_info(htarg, verb)
 
     # Do f->t transform if required
     if signal is not None:
@@ -802,6 +952,7 @@ def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
 
         # In case of QWE/QUAD, print Warning if not converged
         conv_warning(conv, ftarg, 'Fourier', verb)
+        adaptive_info(adaptive, verb)
 
     # Reshape for number of sources
     EM = EM.reshape((-1, nrec, nsrc), order='F')
@@ -809,11 +960,13 @@ def dipole(src, rec, depth, res, freqtime, signal=None, ab=11, aniso=None,
         EM = np.squeeze(EM)
 
     # === 4.  FINISHED ============
+    annotate(nfreq=freq.size, nrec=nrec, nsrc=nsrc, kcount=kcount)
     printstartfinish(verb, t0, kcount)
 
     return EMArray(EM)
 
 
+@traced('model.loop')
 def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
          epermV=None, mpermH=None, mpermV=None, mrec=True, recpts=1,
          strength=0, **kwargs):
@@ -892,6 +1045,10 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
     freqtime : array_like
         Frequencies f (Hz) if `signal==None`, else times t (s); (f, t > 0).
 
+        If `signal==None` and all values are negative, they are taken as
+        Laplace-domain values s = -f (1/s); the kernel and the Hankel
+        transform are then computed in real (float64) arithmetic.
+
     signal : {None, 0, 1, -1}, default: None
         Source signal:
 
@@ -900,6 +1057,8 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
         - 0 : Impulse time-domain response
         - +1 : Switch-on time-domain response
 
+        Ignored if `waveform` is provided.
+
     aniso : array_like, default: ones
         Anisotropies lambda = sqrt(rho_v/rho_h) (-); #aniso = #res.
 
@@ -956,6 +1115,36 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
     ht, htarg, ft, ftarg, xdirect, loop : settings, optinal
         See docstring of :func:`bipole` for a description.
 
+    waveform, lowpass, gates : settings, optinal
+        See docstring of :func:`bipole` for a description.
+
+    loop_radius : float, default: None
+        If provided, the source is a finite, horizontal, circular loop of
+        this radius (m), centred at the `src` coordinates, instead of a
+        dipole. The response is not normalized by the loop area.
+
+        Finite loops are computed with one Hankel transform of order one along
+        the loop, sharing the wavenumber-domain kernel for all receivers at
+        the same depth (see :func:`empymod.kernel.loop_wavenumber`). They are
+        implemented for:
+
+        - one source, ``src=[x, y, z, azimuth, dip]`` with ``dip=±90``;
+        - vertical magnetic receivers (``dip=±90``; `mrec` True or 'loop');
+        - the DLF Hankel transform with a given filter;
+        - without adaptive frequency sampling (``ftarg['adaptive']``).
+
+        For a receiver in the centre of a circular loop the response is a
+        single Hankel transform. For other receivers, and for polygonal
+        loops, many offsets are required, for which the lagged convolution
+        DLF (``htarg={'pts_per_dec': -1}``) is much cheaper than the standard
+        DLF. The direct field is always computed in the wavenumber domain
+        (unless ``xdirect=None``).
+
+    loop_vertices : array_like, default: None
+        If provided, the source is a finite, horizontal, polygonal loop, with
+        the vertices (nvertices, 2) given as (x, y) coordinates (m) relative
+        to the `src` coordinates. See `loop_radius` for more details.
+
     squeeze : bool, default: True
         If True, the output is squeezed. If False, the output will always be of
         ``ndim=3``, (nfreqtime, nrec, nsrc).
@@ -1031,21 +1220,40 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
     """
     # Get kwargs with defaults.
     out = get_kwargs(
-        ['verb', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'squeeze'],
-        [2, 'dlf', {}, 'dlf', {}, False, None, True], kwargs,
+        ['verb', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'squeeze',
+         'waveform', 'lowpass', 'gates', 'loop_radius', 'loop_vertices'],
+        [2, 'dlf', {}, 'dlf', {}, False, None, True, None, None, None, None,
+         None], kwargs,
     )
-    verb, ht, htarg, ft, ftarg, xdirect, loop, squeeze = out
+    verb, ht, htarg, ft, ftarg, xdirect, loop, squeeze = out[:8]
+    waveform, lowpass, gates, loop_radius, loop_vertices = out[8:]
 
     # === 1.  LET'S START ============
     t0 = printstartfinish(verb)
 
     # === 2.  CHECK INPUT ============
 
+    # Check instrument response: lowpass filters and gates
+    if lowpass is not None:
+        lowpass = check_lowpass(lowpass, verb)
+    if gates is not None:
+        gates = check_gates(
+                gates, freqtime, 1 if waveform is not None else signal, verb)
+        freqtime = gates['gtime']
+
+    # Check waveform; its response is obtained from the switch-on response
+    if waveform is not None:
+        waveform = check_waveform(waveform, freqtime, verb)
+        freqtime, signal = waveform['qtime'], 1
+
     # Check times and Fourier Transform arguments and get required frequencies
     if signal is None:
         freq = freqtime
+        time = None
+        adaptive = None
     else:
         time, freq, ft, ftarg = check_time(freqtime, signal, ft, ftarg, verb)
+        adaptive = _get_adaptive(ftarg, signal)
 
     # Check layer parameters
     model = check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV,
@@ -1074,6 +1282,16 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
     src, nsrc, nsrcz, srcdipole = check_bipole(src, 'src')
     rec, nrec, nrecz, recdipole = check_bipole(rec, 'rec')
 
+    # Check finite loop source
+    if loop_radius is not None or loop_vertices is not None:
+        floop = check_finite_loop(loop_radius, loop_vertices, src, srcdipole,
+                                  rec, recdipole, mrec, ht, htarg, verb)
+        if adaptive is not None:
+            raise ValueError("Finite loops are not implemented with adaptive "
+                             "frequency sampling (`ftarg['adaptive']`).")
+    else:
+        floop = None
+
     # Check if receiver is a loop too.
     if mrec == 'loop':
         rec_loop = True
@@ -1084,6 +1302,37 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
 
     # === 3. EM-FIELD CALCULATION ============
 
+    # Finite loop source: one kernel evaluation per receiver depth
+    if floop is not None:
+        EM, kcount, lsrc, lrec = _loop_finite(
+                floop, rec, depth, etaH, etaV, zetaH, zetaV, xdirect, htarg,
+                loop_freq)
+
+        # Scale signal for src-strength
+        if strength > 0:
+            EM *= strength
+
+        # Multiplication with frequency-dependent loop factors.
+        EM *= zetaH[:, lsrc, None]
+        if rec_loop:
+            EM *= zetaH[:, lrec, None]
+
+        # Apply lowpass filters and do f->t transform if required
+        EM, conv = _output(EM, freq, time, signal, ft, ftarg, lowpass,
+                           waveform, gates)
+        if signal is not None:
+            conv_warning(conv, ftarg, 'Fourier', verb)
+
+        # Reshape for number of sources
+        EM = EM.reshape((-1, nrec, nsrc), order='F')
+        if squeeze:
+            EM = np.squeeze(EM)
+
+        annotate(nfreq=freq.size, nrec=nrec, nsrc=nsrc, kcount=kcount)
+        printstartfinish(verb, t0, kcount)
+
+        return EMArray(EM)
+
     # Pre-allocate output EM array
     EM = np.zeros((freq.size, nrec*nsrc), dtype=etaH.dtype)
 
@@ -1159,7 +1408,7 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
                 for iab in ab_calc:  # Loop over required ab's
 
                     # Carry-out the frequency-domain calculation
-                    out = fem(iab, *finp)
+                    out = fem(iab, *finp, adaptive=adaptive)
 
                     # Get geometrical scaling factor, broadcast to (irec, isrc)
                     tfact = np.ones((irec, isrc))*get_geo_fact(
@@ -1199,18 +1448,20 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
 
     # In case of QWE/QUAD, print Warning if not converged
     conv_warning(conv, htarg, 'Hankel', verb)
+    dlf_auto_info(htarg, verb)
 
     # Multiplication with frequency-dependent loop factors.
     EM *= zetaH[:, lsrc, None]
     if rec_loop:
         EM *= zetaH[:, lrec, None]
 
-    # Do f->t transform if required
+    # Apply lowpass filters and do f->t transform if required
+    EM, conv = _output(EM, freq, time, signal, ft, ftarg, lowpass, waveform,
+                       gates)
     if signal is not None:
-        EM, conv = tem(EM, EM[0, :], freq, time, signal, ft, ftarg)
-
         # In case of QWE/QUAD, print Warning if not converged
         conv_warning(conv, ftarg, 'Fourier', verb)
+        adaptive_info(adaptive, verb)
 
     # Reshape for number of sources
     EM = EM.reshape((-1, nrec, nsrc), order='F')
@@ -1218,11 +1469,77 @@ def loop(src, rec, depth, res, freqtime, signal=None, aniso=None, epermH=None,
         EM = np.squeeze(EM)
 
     # === 4.  FINISHED ============
+    annotate(nfreq=freq.size, nrec=nrec, nsrc=nsrc, kcount=kcount)
     printstartfinish(verb, t0, kcount)
 
     return EMArray(EM)
 
 
+def _loop_finite(floop, rec, depth, etaH, etaV, zetaH, zetaV, xdirect,
+                 htarg, loop_freq):
+    r"""Return frequency-domain response of a finite, horizontal loop.
+
+    The vertical magnetic field of the loop `floop` (as returned from
+    :func:`empymod.utils.check_finite_loop`) is computed as a line integral
+    along the loop of a single :math:`J_1` Hankel transform (see
+    :func:`empymod.kernel.loop_wavenumber`). The wavenumber-domain kernel is
+    evaluated once for all receivers at the same depth and all integration
+    points along the loop. If `loop_freq` is True (required by the lagged
+    convolution and splined DLF), the frequencies are computed one after the
+    other.
+
+    Returns the response of shape (nfreq, nrec), the kernel count, and the
+    layer numbers of the source and of the (last) receivers.
+
+    """
+    EM = np.zeros((etaH.shape[0], rec[0].size), dtype=etaH.dtype)
+
+    # Direct field is always computed in the wavenumber domain, unless it is
+    # not wanted at all (xdirect=None).
+    xdir = xdirect is None
+
+    # Get layer number in which src resides
+    lsrc, zsrc = get_layer_nr(floop['src'], depth)
+
+    # Initialize kernel count
+    kcount = 0
+
+    # Loop over receiver depths
+    zrecs = np.broadcast_to(rec[2], rec[0].shape)
+    recsign = np.broadcast_to(floop['recsign'], rec[0].shape)
+    for zrec in np.unique(zrecs):
+        ind = zrecs == zrec
+        lrec, zrec = get_layer_nr([None, None, zrec], depth)
+
+        # Offsets and integration operator along the loop
+        off, operator = transform.get_loop_operator(
+                rec[0][ind] - floop['src'][0], rec[1][ind] - floop['src'][1],
+                floop['radius'], floop['vertices'])
+
+        # Kernel and DLF at all offsets in one go; frequency by frequency
+        # for the lagged convolution and splined DLF.
+        plan = transform.get_dlf_plan(
+                htarg['dlf'], off, htarg['pts_per_dec'])
+        if loop_freq:
+            freqs = [slice(i, i+1) for i in range(etaH.shape[0])]
+        else:
+            freqs = [slice(None)]
+        for i in freqs:
+            PJ = kernel.loop_wavenumber(
+                    zsrc, zrec, lsrc, lrec, depth, etaH[i], etaV[i],
+                    zetaH[i], zetaV[i], plan.points, xdir)
+            G = transform.dlf(PJ, plan.points, off, htarg['dlf'],
+                              htarg['pts_per_dec'],
+                              ang_fact=np.ones(off.size), ab=33, plan=plan)
+
+            # Integrate along the loop; orientation of source and receivers
+            EM[i, ind] = G @ operator.T*recsign[ind]*floop['srcsign']
+            kcount += 1
+
+    return EM, kcount, lsrc, lrec
+
+
+@traced('model.analytical')
 def analytical(src, rec, res, freqtime, solution='fs', signal=None, ab=11,
                aniso=None, epermH=None, epermV=None, mpermH=None, mpermV=None,
                **kwargs):
@@ -1281,6 +1598,9 @@ def analytical(src, rec, res, freqtime, solution='fs', signal=None, ab=11,
     freqtime : array_like
         Frequencies f (Hz) if `signal==None`, else times t (s); (f, t > 0).
 
+        If `signal==None` and all values are negative, they are taken as
+        Laplace-domain values s = -f (1/s); the solution is then real-valued.
+
     solution : str, default: 'fs'
       Defines which solution is returned:
 
@@ -1570,6 +1890,7 @@ def gpr(src, rec, depth, res, freqtime, cf, gain=None, ab=11, aniso=None,
     return EM
 
 
+@traced('model.dipole_k')
 def dipole_k(src, rec, depth, res, freq, wavenumber, ab=11, aniso=None,
              epermH=None, epermV=None, mpermH=None, mpermV=None, **kwargs):
     r"""Return electromagnetic wavenumber-domain field.
@@ -1745,10 +2066,11 @@ def dipole_k(src, rec, depth, res, freq, wavenumber, ab=11, aniso=None,
     if ab_calc not in [36, ]:
 
         # Calculate wavenumber response
-        J0, J1, J0b = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH,
-                                        etaV, zetaH, zetaV,
-                                        np.atleast_2d(wavenumber), ab_calc,
-                                        False, msrc, mrec)
+        with span('kernel.wavenumber', nfreq=etaH.shape[0],
+                  nlambda=np.size(wavenumber), nlayer=depth.size):
+            J0, J1, J0b = kernel.wavenumber(
+                    zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                    np.atleast_2d(wavenumber), ab_calc, False, msrc, mrec)
 
         # Collect output
         if J1 is not None:
@@ -1770,13 +2092,14 @@ def dipole_k(src, rec, depth, res, freq, wavenumber, ab=11, aniso=None,
 def ip_and_q(**kwargs):
     """Return In-Phase and Quadrature components for provided model and system.
 
-    This wrapper calls :func:`dipole` two times:
+    This wrapper computes:
 
-    - 1st: with `xdirect=None` for the secondary field Hs.
-    - 2nd: with `xdirect=True`, and only the first value of all model
-      parameters and an empty `depth`-parameter for the primary field Hp.
-      For the primary field, the co-planar field of the source configuration is
-      used.
+    - the secondary field Hs with :func:`dipole` and `xdirect=None`;
+    - the primary field Hp analytically (:func:`empymod.kernel.fullspace`),
+      for a full-space with only the first value of all model parameters.
+      For the primary field, the co-planar field of the source configuration
+      is used. The primary fields are cached, as they usually repeat for many
+      calls with the same system.
 
     It then returns the real (in-phase) and imaginary (quadrature) components
     of the ratio Hs/Hp, scaled by `scale`.
@@ -1816,12 +2139,24 @@ def ip_and_q(**kwargs):
     scale : float, default: 1e3 (ppt)
         Multiplication factor. E.g., 1e3 for ppt, 1e6 for ppm.
 
+    batch : bool, default: False
+        If True, many soundings (e.g., a flight line) are computed in one call.
+        Then, `res`, `aniso`, `epermH`, `epermV`, `mpermH`, `mpermV`, and
+        `depth` can be provided per sounding as 2D arrays (nsoundings,
+        nlayers), and `src` and `rec` as 2D arrays (nsoundings, 3); parameters
+        provided as usual are used for all soundings. Each sounding must
+        consist of one source and one receiver. Soundings which share the
+        depths, the source and receiver heights, and the offset are computed
+        together in a single pass through the Hankel transform. In batch mode,
+        `verb` only controls warnings, and the primary fields are not cached.
+
 
     Returns
     -------
 
     IP, Q : ndarrays
-        In-phase and quadrature values.
+        In-phase and quadrature values; of shape (nsoundings, nfreq) if
+        `batch=True` (squeezed, unless `squeeze=False`).
 
     """
 
@@ -1835,35 +2170,40 @@ def ip_and_q(**kwargs):
 
     # Warning that it has not been thoroughly tested.
     verb = kwargs.get('verb', 2)
-    if verb > 0 and not np.allclose(kwargs['src'][2], kwargs['rec'][2]):
+    batch = kwargs.pop('batch', False)
+    if batch:
+        zsrc = np.asarray(kwargs['src'], dtype=float)[..., 2]
+        zrec = np.asarray(kwargs['rec'], dtype=float)[..., 2]
+    else:
+        zsrc, zrec = kwargs['src'][2], kwargs['rec'][2]
+    if verb > 0 and not np.allclose(zsrc, zrec):
         print("* WARNING :: This function is experimental. Please let us know "
               "if you encounter any issues when using this function!")
 
     # Get or set scale
     scale = kwargs.pop('scale', 1e3)
 
-    # Secondary magnetic field (xdirect=None means no direct field)
-    Hs = dipole(**{**kwargs, 'xdirect': None})
+    # For the primary field, use the co-planar field of source configuration.
+    ab = int(kwargs['ab'])
+    abp = 44 + 11*(ab % 10 - 4)
 
-    # Primary magnetic field
-    new = copy.deepcopy(kwargs)
+    # Batch of soundings
+    if batch:
+        Hs, Hp = _ip_and_q_batch(abp=abp, **kwargs)
 
-    # For the primary field, use the co-planar field of source configuration.
-    if new['ab'] in [44, 54, 64]:
-        new['ab'] = 44
-    elif new['ab'] in [45, 55, 65]:
-        new['ab'] = 55
-    elif new['ab'] in [46, 56, 66]:
-        new['ab'] = 66
-
-    # Take only the first value of each parameter, and set depth to empty.
-    new['depth'] = []
-    for k in ['res', 'aniso', 'epermH', 'epermV', 'mpermH', 'mpermV']:
-        if k in kwargs.keys():
-            new[k] = np.atleast_1d(kwargs[k])[0]
-
-    # Primary magnetic field (a fullspace of air, hence ONLY the direct field)
-    Hp = dipole(**{**new, 'xdirect': True})
+    else:
+
+        # Secondary magnetic field (xdirect=None means no direct field)
+        Hs = dipole(**{**kwargs, 'xdirect': None})
+
+        # Primary magnetic field (a fullspace of the first layer parameters,
+        # hence ONLY the direct field)
+        Hp = _ip_and_q_primary(
+                abp, kwargs['src'], kwargs['rec'], kwargs['freqtime'],
+                [kwargs.get(k, None) for k in
+                 ['res', 'aniso', 'epermH', 'epermV', 'mpermH', 'mpermV']])
+        if kwargs.get('squeeze', True):
+            Hp = np.squeeze(Hp)
 
     # Take the ratio, multiply by scale
     H = scale * Hs / Hp
@@ -1872,11 +2212,442 @@ def ip_and_q(**kwargs):
     return H.real, H.imag
 
 
+def _ip_and_q_primary(ab, src, rec, freq, model):
+    r"""Return (cached) primary field for :func:`ip_and_q`.
+
+    The primary field is the direct field in a full-space of the first values
+    of the model parameters `model` (res, aniso, epermH, epermV, mpermH,
+    mpermV); it has shape (nfreq, nrec, nsrc), as from :func:`dipole`.
+
+    """
+    # Take only the first value of each parameter.
+    model = [np.atleast_1d(v['res'] if isinstance(v, dict) else v)[:1]
+             if v is not None else None for v in model]
+
+    # Return from cache if the same primary field was computed before.
+    key = (ab, freq, src, rec, model)
+    key = tuple(v if v is None else np.asarray(v, dtype=float).tobytes()
+                for v in _flatten_key(key))
+    with _IP_AND_Q_PRIMARY_LOCK:
+        if key in _IP_AND_Q_PRIMARY:
+            _IP_AND_Q_PRIMARY.move_to_end(key)
+            return _IP_AND_Q_PRIMARY[key]
+
+    # Check the input, without the Hankel-transform related parts.
+    ab_calc, msrc, mrec = check_ab(ab, 0)
+    depth, *model, _ = check_model([], *model, True, 0)
+    freq, etaH, etaV, zetaH, zetaV = check_frequency(freq, *model, 0)
+    src, nsrc = check_dipole(src, 'src', 0)
+    rec, nrec = check_dipole(rec, 'rec', 0)
+    off, angle = get_off_ang(src, rec, nsrc, nrec, 0)
+    _, zsrc = get_layer_nr(src, depth)
+    _, zrec = get_layer_nr(rec, depth)
+
+    # Analytical full-space solution
+    Hp = kernel.fullspace(off, angle, zsrc, zrec, etaH[:, 0], etaV[:, 0],
+                          zetaH[:, 0], zetaV[:, 0], ab_calc, msrc, mrec)
+    Hp = Hp.reshape((-1, nrec, nsrc), order='F')
+
+    # Cache it
+    with _IP_AND_Q_PRIMARY_LOCK:
+        _IP_AND_Q_PRIMARY[key] = Hp
+        if len(_IP_AND_Q_PRIMARY) > _IP_AND_Q_PRIMARY_MAXSIZE:
+            _IP_AND_Q_PRIMARY.popitem(last=False)
+
+    return Hp
+
+
+def _ip_and_q_batch(ab, abp, src, rec, depth, res, freqtime, aniso=None,
+                    epermH=None, epermV=None, mpermH=None, mpermV=None,
+                    verb=2, ht='dlf', htarg=None, loop=None, squeeze=True,
+                    **kwargs):
+    r"""Return secondary and primary fields of many soundings.
+
+    The input is checked for all soundings at once. Soundings which share
+    depths, src/rec depths, and offset and angle are stacked along the
+    frequency axis and computed with one call to :func:`fem` (secondary field)
+    and one call to :func:`empymod.kernel.fullspace` (primary field), as the
+    Hankel transform is independent for each row of the layer parameters. See
+    :func:`ip_and_q` for the input parameters.
+
+    """
+    # Collect parameters, and get number of soundings.
+    pars = {'src': src, 'rec': rec, 'depth': depth, 'res': res,
+            'aniso': aniso, 'epermH': epermH, 'epermV': epermV,
+            'mpermH': mpermH, 'mpermV': mpermV}
+    nsound = 1
+    for name, value in pars.items():
+        if value is not None:
+            value = np.asarray(value, dtype=float)
+            if value.ndim == 2:
+                if nsound > 1 and value.shape[0] != nsound:
+                    raise ValueError(
+                            f"Parameter {name} has wrong number of soundings;"
+                            f" expected: {nsound}; provided: {value.shape[0]}"
+                    )
+                nsound = value.shape[0]
+            pars[name] = value
+
+    # Check parameters shared by all soundings.
+    vb = min(verb, 1)
+    ab_calc, msrc, mrec = check_ab(ab, vb)
+    abp_calc, _, _ = check_ab(abp, vb)
+    ht, htarg = check_hankel(ht, {} if htarg is None else htarg, vb)
+    loop_freq, loop_off = check_loop(loop, ht, htarg, vb)
+    mpars = [pars[n] for n in
+             ['res', 'aniso', 'epermH', 'epermV', 'mpermH', 'mpermV']]
+
+    # Sources and receivers, (nsound, 3).
+    for name in ['src', 'rec']:
+        if pars[name].shape[-1] != 3 or pars[name].ndim > 2:
+            raise ValueError("In batch mode each sounding must consist of one "
+                             "source and one receiver.")
+        pars[name] = np.broadcast_to(pars[name], (nsound, 3))
+    zsrc, zrec = pars['src'][:, 2], pars['rec'][:, 2]
+    off, angle = get_batch_off_ang(pars['src'], pars['rec'], vb)
+
+    # Check the models of all soundings, and get eta and zeta of all layers.
+    depth, *model, isfull = check_batch_model(pars['depth'], *mpars, nsound,
+                                              vb)
+    nlayer = depth.shape[1]
+    freq, etaH, etaV, zetaH, zetaV = check_frequency(
+            freqtime, *[m.ravel() for m in model], vb)
+    eta = [v.reshape(freq.size, nsound, nlayer) for v in
+           [etaH, etaV, zetaH, zetaV]]
+
+    # Layer numbers; on an interface, the layer above is chosen.
+    pdepth = np.c_[depth[:, 1:], np.full(nsound, np.inf)]
+    lsrc = np.argmax((depth < zsrc[:, None])*(pdepth >= zsrc[:, None]), 1)
+    lrec = np.argmax((depth < zrec[:, None])*(pdepth >= zrec[:, None]), 1)
+
+    # Primary field: eta and zeta of a fullspace of the first values of the
+    # model parameters (as provided, before any swapping of the layers).
+    _, *pmodel, _ = check_batch_model(
+            None, *[m if m is None else np.atleast_2d(m)[:, :1]
+                    for m in mpars], nsound, vb)
+    _, *etap = check_frequency(freqtime, *[m[:, 0] for m in pmodel], vb)
+
+    # Group soundings by everything the Hankel transform shares.
+    keys = np.c_[depth, lsrc, lrec, zsrc, zrec, off, angle, isfull]
+    _, groups = np.unique(keys, axis=0, return_inverse=True)
+
+    # Secondary and primary field, one call to fem/fullspace per group.
+    Hs = np.zeros((nsound, freq.size), dtype=np.complex128)
+    Hp = np.zeros((nsound, freq.size), dtype=np.complex128)
+    for ig in range(groups.max()+1):
+        ind = np.flatnonzero(groups.ravel() == ig)
+        i = ind[0]
+
+        # Stack soundings along the frequency axis (sounding by sounding).
+        geta = [v[:, ind].swapaxes(0, 1).reshape(-1, nlayer) for v in eta]
+        out = fem(ab_calc, off[i:i+1], angle[i:i+1], zsrc[i], zrec[i],
+                  lsrc[i], lrec[i], depth[i], np.tile(freq, ind.size), *geta,
+                  None, isfull[i], ht, htarg, msrc, mrec, loop_freq, loop_off)
+        Hs[ind, :] = out[0].reshape(-1, freq.size)
+
+        # Analytical full-space solution
+        geta = [v[:, ind].T.ravel() for v in etap]
+        out = kernel.fullspace(off[i:i+1], angle[i:i+1], zsrc[i], zrec[i],
+                               *geta, abp_calc, msrc, mrec)
+        Hp[ind, :] = out.reshape(-1, freq.size)
+
+    if squeeze:
+        Hs, Hp = np.squeeze(Hs), np.squeeze(Hp)
+
+    return Hs, Hp
+
+
+def _flatten_key(key):
+    r"""Yield the leaves of nested lists/tuples of `key`."""
+    for value in key:
+        if isinstance(value, (list, tuple)):
+            yield from _flatten_key(value)
+        else:
+            yield value
+
+
+def mt(depth, res, freq, epermH=None, mpermH=None, **kwargs):
+    r"""Return 1D magnetotelluric responses.
+
+    Calculate the plane-wave (magnetotelluric) surface impedance
+    :math:`Z = E_x/H_y` of layered models, and from it the apparent
+    resistivity and phase,
+
+    .. math::
+
+        \rho_a = \frac{|Z|^2}{\omega \mu_0} \ , \qquad
+        \phi_a = \tan^{-1}\frac{\Im(Z)}{\Re(Z)} \ .
+
+    The impedance is computed with the recursion of Pedersen and Hermance
+    (1986) in :func:`empymod.kernel.mt_impedance`, compiled with numba and
+    looping over models and frequencies. No Hankel nor Fourier transforms are
+    involved, which makes this routine fast enough to compute many (stacked)
+    models at once, e.g., for stochastic inversions.
+
+    For vertically incident plane waves only the horizontal parameters
+    matter; hence there are no parameters `aniso`, `epermV`, and `mpermV`.
+
+
+    Parameters
+    ----------
+    depth : array_like
+        Absolute layer interfaces z (m); #depth = #res - 1 (excluding +/-
+        infinity). The first interface is the surface, where the impedance is
+        computed; the layer above it (usually air) is ignored. If empty, the
+        model is a full-space. Depths must be continuously increasing or
+        decreasing (positive z downwards or upwards, respectively), with the
+        layers ordered accordingly.
+
+        For stacked models, `depth` can be of shape (nmodel, #res - 1).
+
+    res : array_like
+        Horizontal resistivities rho_h (Ohm.m); #res = #depth + 1.
+
+        For stacked models, `res` is of shape (nmodel, #res).
+
+    freq : array_like
+        Frequencies f (Hz).
+
+    epermH, mpermH : array_like, default: ones
+        Relative horizontal electric permittivities and magnetic
+        permeabilities (-); same shape as `res`, or broadcastable to it.
+
+    verb : {0, 1, 2, 3, 4}, default: 2
+        Level of verbosity.
+
+    squeeze : bool, default: True
+        If True, the output is squeezed. If False, the output will always be of
+        ``ndim=2``, (nfreq, nmodel).
+
+
+    Returns
+    -------
+    Z : EMArray, (nfreq, nmodel)
+        Complex surface impedance (Ohm).
+
+    rho_a : ndarray, (nfreq, nmodel)
+        Apparent resistivity (Ohm.m).
+
+    phi_a : ndarray, (nfreq, nmodel)
+        Apparent phase (°).
+
+
+    Examples
+    --------
+
+    .. ipython::
+
+       In [1]: import empymod
+          ...: import numpy as np
+          ...: # Half-space: rho_a = 100 Ohm.m, phi_a = 45°
+          ...: Z, rho_a, phi_a = empymod.mt(
+          ...:         [0], [2e14, 100], [0.1, 1, 10], epermH=0, verb=0)
+          ...: rho_a, phi_a
+       Out[1]: (array([100., 100., 100.]), array([45., 45., 45.]))
+
+    """
+    # Get kwargs with defaults.
+    verb, squeeze = get_kwargs(['verb', 'squeeze'], [2, True], kwargs)
+
+    # === 1.  LET'S START ============
+    t0 = printstartfinish(verb)
+
+    # === 2.  CHECK INPUT ============
+    thick, res, epermH, mpermH, freq = check_mt(
+            depth, res, freq, epermH, mpermH, verb)
+
+    # === 3. IMPEDANCE CALCULATION ============
+    Z = kernel.mt_impedance(thick, res, epermH, mpermH, freq).T
+
+    # Apparent resistivity and phase
+    rho_a = np.abs(Z)**2/(2*np.pi*freq[:, None]*4e-7*np.pi)
+    phi_a = np.angle(Z, deg=True)
+
+    if squeeze:
+        Z, rho_a, phi_a = np.squeeze(Z), np.squeeze(rho_a), np.squeeze(phi_a)
+
+    # === 4.  FINISHED ============
+    printstartfinish(verb, t0)
+
+    return EMArray(Z), rho_a, phi_a
+
+
+def dc(src, rec, depth, res, aniso=None, **kwargs):
+    r"""Return DC resistivity responses.
+
+    Calculate the potential differences of four-electrode DC resistivity
+    measurements (current electrodes A, B; potential electrodes M, N) for a
+    unit current,
+
+    .. math::
+
+        \Delta V = \phi_{AM} - \phi_{AN} - \phi_{BM} + \phi_{BN} \ ,
+
+    and the corresponding apparent resistivities
+
+    .. math::
+
+        \rho_a = K \Delta V \ , \qquad
+        K = 2\pi\left(\frac{1}{AM} - \frac{1}{AN} - \frac{1}{BM} +
+                        \frac{1}{BN}\right)^{-1} \ ,
+
+    where :math:`K` is the geometric factor for electrodes on the surface of
+    a homogeneous half-space (computed from horizontal distances).
+
+    The potentials are the static limit of the electric field: they are
+    computed with a real-valued wavenumber-domain kernel,
+    :func:`empymod.kernel.dc_wavenumber`, and a single :math:`J_0` Hankel
+    transform. This is much faster and more accurate than computing DC
+    responses through the frequency- or time-domain routines (e.g.,
+    :func:`bipole` at a very low frequency or late time). All measurements
+    are computed in one call, which makes it suited to compute whole
+    pseudosections; see :func:`empymod.utils.get_dc_layout` to create the
+    electrodes of Wenner, Schlumberger, and dipole-dipole arrays. For each
+    combination of current- and potential-electrode depths the kernel is
+    computed once, for all unique offsets.
+
+
+    Parameters
+    ----------
+    src, rec : list of floats or arrays
+        Current electrodes A, B (`src`) and potential electrodes M, N (`rec`),
+        ``[x0, x1, y0, y1, z0, z1]`` (m), where 0 and 1 denote A and B (M and
+        N), respectively. Each coordinate is either a float or an array of
+        size nmeas (number of measurements). Electrodes exactly on an interface
+        (e.g., at the surface, z=0) are correctly treated as on the interface.
+
+    depth : list
+        Absolute layer interfaces z (m); #depth = #res - 1
+        (excluding +/- infinity).
+
+    res : array_like
+        Horizontal resistivities rho_h (Ohm.m); #res = #depth + 1.
+
+    aniso : array_like, default: ones
+        Anisotropies lambda = sqrt(rho_v/rho_h) (-); #aniso = #res.
+
+    htarg : dict, optional
+        Arguments of the Hankel DLF, see `htarg` in :func:`bipole`. The
+        default filter is ``'key_401_2009'``, and the default is the standard
+        DLF (``pts_per_dec=0``). Use the lagged convolution DLF
+        (``pts_per_dec=-1``) for many different offsets.
+
+    verb : {0, 1, 2, 3, 4}, default: 2
+        Level of verbosity.
+
+
+    Returns
+    -------
+    dV : ndarray, (nmeas, )
+        Potential differences (V) between M and N for a unit current (1 A)
+        injected at A and extracted at B.
+
+    rho_a : ndarray, (nmeas, )
+        Apparent resistivities (Ohm.m). NaN for measurements where the
+        geometric factor is undefined (the sum of the inverse distances is
+        zero, e.g., for M and N on the perpendicular bisector of A and B, or
+        A and B on the one of M and N); `dV` is valid for these.
+
+
+    Examples
+    --------
+
+    .. ipython::
+
+       In [1]: import empymod
+          ...: # Wenner array over a half-space: rho_a = rho = 100 Ohm.m
+          ...: src, rec, level = empymod.utils.get_dc_layout('wenner', 10)
+          ...: dV, rho_a = empymod.dc(src, rec, 0, [2e14, 100], verb=0)
+          ...: rho_a.round(6)
+       Out[1]: array([100., 100., 100., 100., 100., 100., 100., 100., 100.,
+                      100., 100., 100.])
+
+    """
+    # Get kwargs with defaults.
+    htarg, verb = get_kwargs(['htarg', 'verb'], [{}, 2], kwargs)
+
+    # === 1.  LET'S START ============
+    t0 = printstartfinish(verb)
+
+    # === 2.  CHECK INPUT ============
+    elec = check_dc(src, rec, verb)
+    model = check_model(depth, res, aniso, None, None, None, None, True, verb)
+    depth, res, aniso = model[:3]
+    htarg = {'dlf': 'key_401_2009', **htarg}
+    _, htarg = check_hankel('dlf', htarg, verb)
+    if isinstance(htarg['dlf'], str):
+        raise ValueError("DC responses require a given DLF filter, "
+                         "not `dlf='auto'`.")
+
+    # === 3. POTENTIAL CALCULATION ============
+
+    # Layer numbers of all electrodes
+    zelec = elec[:, 2, :]
+    lelec = np.zeros(zelec.shape, dtype=int)
+    for z in np.unique(zelec):
+        lelec[zelec == z] = get_layer_nr([None, None, z], depth)[0]
+
+    # Potential differences; sum of AM, AN, BM, BN
+    min_off = get_minimum()['min_off']
+    dV = np.zeros(elec.shape[2])
+    geo = np.zeros(elec.shape[2])
+    geo_abs = np.zeros(elec.shape[2])
+    kcount = 0
+    for isrc, irec, sign in [(0, 2, 1), (0, 3, -1), (1, 2, -1), (1, 3, 1)]:
+        off = np.hypot(elec[irec, 0] - elec[isrc, 0],
+                       elec[irec, 1] - elec[isrc, 1])
+        geo += sign/np.clip(off, min_off, None)
+        geo_abs += 1/np.clip(off, min_off, None)
+
+        # One kernel call per combination of electrode depths
+        zpairs = np.c_[zelec[isrc], zelec[irec]]
+        for zsrc, zrec in np.unique(zpairs, axis=0):
+            ind = (zpairs[:, 0] == zsrc) & (zpairs[:, 1] == zrec)
+            lsrc = lelec[isrc][ind][0]
+            lrec = lelec[irec][ind][0]
+
+            # Unique offsets only
+            uoff, inv = np.unique(np.clip(off[ind], min_off, None),
+                                  return_inverse=True)
+
+            plan = transform.get_dlf_plan(
+                    htarg['dlf'], uoff, htarg['pts_per_dec'])
+            PJ0 = kernel.dc_wavenumber(zsrc, zrec, lsrc, lrec, depth, res,
+                                       aniso, plan.points, True)
+            phi = transform.dlf((PJ0, None, None), plan.points, uoff,
+                                htarg['dlf'], htarg['pts_per_dec'],
+                                ang_fact=np.ones(uoff.size), ab=33,
+                                plan=plan).ravel()
+            kcount += 1
+
+            # Direct potential, analytically
+            if lsrc == lrec:
+                phi += kernel.dc_direct(uoff, zsrc, zrec, lsrc, depth, res,
+                                        aniso)
+
+            dV[ind] += sign*phi[inv.ravel()]
+
+    # Apparent resistivity; undefined (NaN) if the geometric sum vanishes
+    # (up to round-off), e.g., for M and N on the bisector of A and B.
+    undefined = abs(geo) < 1e-12*geo_abs
+    if verb > 0 and np.any(undefined):
+        print("* WARNING :: Geometric factor is undefined for "
+              f"{np.sum(undefined)} measurement(s); rho_a is set to NaN!")
+    geo[undefined] = np.nan
+    rho_a = 2*np.pi/geo*dV
+
+    # === 4.  FINISHED ============
+    printstartfinish(verb, t0, kcount)
+
+    return dV, rho_a
+
+
 # Core modelling routines
 
+@traced('model.fem')
 def fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH, etaV, zetaH,
         zetaV, xdirect, isfullspace, ht, htarg, msrc, mrec, loop_freq,
-        loop_off, conv=True):
+        loop_off, conv=True, adaptive=None):
     r"""Return electromagnetic frequency-domain response.
 
     This function is called from one of the modelling routines
@@ -1887,7 +2658,15 @@ def fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH, etaV, zetaH,
     the correct format. This is useful for inversion routines and similar, as
     it can speed-up the calculation by omitting input-checks.
 
+    If `adaptive` is a dict with the keys `rtol` (see `ftarg['adaptive']` in
+    :func:`bipole`) and, optionally, `signal`, the response is only computed
+    at an adaptively refined subset of the frequencies, and interpolated at
+    the others. The computed frequencies are marked in the boolean array
+    `adaptive['used']`.
+
     """
+    annotate(nfreq=freq.size, noff=off.size, nlayer=depth.size)
+
     # Preallocate array
     fEM = np.zeros((freq.size, off.size), dtype=etaH.dtype)
 
@@ -1899,6 +2678,13 @@ def fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH, etaV, zetaH,
     if ab in [36, ]:
         return fEM, kcount, conv
 
+    # Adaptive frequency sampling
+    if adaptive is not None:
+        return _fem_adaptive(
+                ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH,
+                etaV, zetaH, zetaV, xdirect, isfullspace, ht, htarg, msrc,
+                mrec, loop_freq, loop_off, conv, adaptive)
+
     # Get full-space-solution if xdirect=True and model is a full-space or
     # if src and rec are in the same layer.
     if xdirect and (isfullspace or lsrc == lrec):
@@ -1919,6 +2705,15 @@ def fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH, etaV, zetaH,
         # Get angle dependent factors
         ang_fact = kernel.angle_factor(angle, ab, msrc, mrec)
 
+        # Select DLF filter and type automatically; this is done only once,
+        # for the first call, and the selection is stored in htarg
+        # (`check_hankel` with dlf='auto'), hence used for all further
+        # source-receiver pairs.
+        if ht == 'dlf' and isinstance(htarg['dlf'], str):
+            htarg['dlf'], htarg['pts_per_dec'] = transform.get_dlf_auto(
+                    zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH,
+                    etaV, zetaH, zetaV, xdir, htarg, msrc, mrec)
+
         calc = getattr(transform, 'hankel_'+ht)
         if loop_freq:
 
@@ -1950,7 +2745,134 @@ def fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH, etaV, zetaH,
     return fEM, kcount, conv
 
 
-def tem(fEM, off, freq, time, signal, ft, ftarg, conv=True):
+def _fem_adaptive(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq, etaH,
+                  etaV, zetaH, zetaV, xdirect, isfullspace, ht, htarg, msrc,
+                  mrec, loop_freq, loop_off, conv, adaptive):
+    r"""Return electromagnetic frequency-domain response, adaptively sampled.
+
+    The response is first computed at about one frequency per decade (at
+    least five). Each interval between computed frequencies, which contains
+    further required frequencies, is then tested by computing the response at
+    its central frequency and comparing it to the cubic-spline prediction
+    (in log(f)) from the already computed frequencies. Intervals where
+
+    .. math::
+
+        |f_\mathrm{pred} - f_\mathrm{EM}| > \mathrm{rtol}\ (|f_\mathrm{EM}|
+        + 10^{-6} \max|f_\mathrm{EM}|)
+
+    for the real or the imaginary part at any offset are split and tested
+    again. The response at frequencies which were not computed is finally
+    obtained by cubic-spline interpolation.
+
+    For switch-on and switch-off responses (``adaptive['signal']`` is -1 or
+    +1), the test and the interpolation are carried out on :math:`f_\mathrm{EM}
+    / f`, which is the quantity actually transformed to the time domain.
+
+    Consult :func:`fem` for the input and output parameters.
+
+    """
+    # Unique, sorted frequencies (e.g., the standard Fourier DLF can require
+    # the same frequency more than once); ifreq points into the input arrays.
+    freq = freq.ravel()
+    ufreq, ifreq, inv = np.unique(
+            freq, return_index=True, return_inverse=True)
+    logf = np.log(ufreq)
+    nfreq = ufreq.size
+
+    # Weights of the transformed quantity (step responses are divided by f)
+    if adaptive.get('signal', 0) in [-1, 1]:
+        wgt = 1/ufreq[:, None]
+    else:
+        wgt = np.ones((nfreq, 1))
+
+    # Record of computed frequencies (shared by all calls)
+    if adaptive.get('used', None) is None:
+        adaptive['used'] = np.zeros(freq.size, dtype=bool)
+
+    # Pre-allocate
+    uEM = np.zeros((nfreq, off.size), dtype=etaH.dtype)
+    done = np.zeros(nfreq, dtype=bool)
+    kcount = 0
+
+    def compute(ind):
+        r"""Compute the response at the unique frequencies `ind`."""
+        nonlocal kcount, conv
+        i = ifreq[ind]
+        out = fem(ab, off, angle, zsrc, zrec, lsrc, lrec, depth, freq[i],
+                  etaH[i, :], etaV[i, :], zetaH[i, :], zetaV[i, :], xdirect,
+                  isfullspace, ht, htarg, msrc, mrec, loop_freq, loop_off,
+                  conv)
+        uEM[ind, :] = out[0]*wgt[ind]
+        kcount += out[1]
+        conv = out[2]
+        done[ind] = True
+
+    # Initial coarse set: about one frequency per decade, at least five.
+    nstart = max(5, int(np.ceil((logf[-1]-logf[0])/np.log(10)))+1)
+    ind = np.unique(np.linspace(0, nfreq-1, min(nfreq, nstart)).astype(int))
+    compute(ind)
+
+    # Refine intervals (index pairs) which contain not computed frequencies.
+    todo = [(a, b) for a, b in zip(ind[:-1], ind[1:]) if b-a > 1]
+    while todo:
+
+        # Predict the response at the central frequencies, then compute it.
+        mid = np.array([(a+b)//2 for a, b in todo])
+        isdone = np.where(done)[0]
+        pred = sp.interpolate.CubicSpline(
+                logf[isdone], uEM[isdone, :], axis=0)(logf[mid])
+        compute(mid)
+
+        # Split intervals which fail the error estimate (real and imaginary
+        # parts separately, as the transforms might only use one of them).
+        fail = np.zeros(mid.size, dtype=bool)
+        for part in [np.real, np.imag]:
+            act = part(uEM[mid, :])
+            scale = 1e-6*np.abs(part(uEM[done, :])).max(axis=0)
+            tol = adaptive['rtol']*(np.abs(act) + scale)
+            fail |= np.any(np.abs(part(pred) - act) > tol, axis=1)
+        todo = [(x, y) for (a, b), m, f in zip(todo, mid, fail) if f
+                for x, y in [(a, m), (m, b)] if y-x > 1]
+
+    # Interpolate the response at the not computed frequencies.
+    if not np.all(done):
+        isdone = np.where(done)[0]
+        uEM[~done, :] = sp.interpolate.CubicSpline(
+                logf[isdone], uEM[isdone, :], axis=0)(logf[~done])
+
+    # Record the computed frequencies
+    adaptive['used'] |= done[inv]
+
+    return (uEM/wgt)[inv, :], kcount, conv
+
+
+def _output(fEM, freq, time, signal, ft, ftarg, lowpass, waveform, gates):
+    """Return output of bipole: apply lowpass filters and f->t transform."""
+    conv = True
+
+    # Apply lowpass filters
+    if lowpass is not None:
+        fEM *= transform.get_lowpass_response(freq, lowpass)[:, None]
+
+    # Do f->t transform if required
+    if signal is not None:
+        fEM, conv = tem(fEM, fEM[0, :], freq, time, signal, ft, ftarg,
+                        waveform=waveform, gates=gates)
+
+    return fEM, conv
+
+
+def _get_adaptive(ftarg, signal):
+    r"""Return the `adaptive` argument for :func:`fem` from checked `ftarg`."""
+    if ftarg['adaptive'] is None:
+        return None
+    return {'rtol': ftarg['adaptive'], 'signal': signal}
+
+
+@traced('model.tem')
+def tem(fEM, off, freq, time, signal, ft, ftarg, conv=True, waveform=None,
+        gates=None):
     r"""Return time-domain response of the frequency-domain response fEM.
 
     This function is called from one of the modelling routines
@@ -1961,6 +2883,16 @@ def tem(fEM, off, freq, time, signal, ft, ftarg, conv=True):
     the correct format. This is useful for inversion routines and similar, as
     it can speed-up the calculation by omitting input-checks.
 
+    If `waveform` is provided, it has to be the output of
+    :func:`empymod.utils.check_waveform`, `time` its times ``qtime``, and
+    `signal=1`; the returned response is then the waveform response at the
+    times provided to `check_waveform`.
+
+    Similarly, if `gates` is provided, it has to be the output of
+    :func:`empymod.utils.check_gates`, and `time` its times ``gtime`` (or,
+    together with a waveform, the times provided to `check_waveform` must be
+    ``gtime``); the returned response are then the gate averages.
+
     """
     # 1. Scale frequencies if switch-on/off response
     # Step function for causal times is like a unit fct, therefore an impulse
@@ -1971,6 +2903,8 @@ def tem(fEM, off, freq, time, signal, ft, ftarg, conv=True):
     else:
         fact = 1
 
+    annotate(nfreq=freq.size, ntime=time.size, noff=off.size)
+
     # 2. f->t transform
     calc = getattr(transform, 'fourier_'+ft)
     tEM = np.zeros((time.size, off.size))
@@ -1979,4 +2913,12 @@ def tem(fEM, off, freq, time, signal, ft, ftarg, conv=True):
         tEM[:, i] += out[0]
         conv *= out[1]
 
+    # 3. Convolve with source waveform
+    if waveform is not None:
+        tEM = waveform['operator'] @ tEM
+
+    # 4. Integrate over gates
+    if gates is not None:
+        tEM = gates['operator'] @ tEM
+
     return tEM*2/np.pi, conv  # Scaling from Fourier transform
@@ -0,0 +1,391 @@
+"""
+Cost and memory planner (dry run) of the modelling routines.
+
+:func:`plan` takes the same input as :func:`empymod.model.bipole` and carries
+out all its input checks, but without computing anything. It returns the
+predicted number of kernel calls and evaluations (the kernel shapes follow
+from the number of frequencies, offsets, layers, filter lengths, and
+integration points), the output shape, and estimates of the peak memory and
+of the runtime. The runtime estimate is calibrated by a short micro-benchmark
+of the kernel on the current machine, see :func:`calibrate`.
+
+This can be used to size chunks (e.g., of receivers or frequencies) and
+workers before submitting large computations.
+
+.. ipython::
+
+   In [1]: import empymod
+      ...: inp = {'src': [0, 0, 100, 0, 0], 'rec': [5000, 0, 200, 0, 0],
+      ...:        'depth': [0, 150], 'res': [2e14, 1, 10],
+      ...:        'freqtime': [0.1, 1, 10]}
+      ...: empymod.plan(**inp)
+
+"""
+# Copyright 2016 The emsig community.
+#
+# This file is part of empymod.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License.  You may obtain a copy
+# of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+import numpy as np
+import scipy as sp
+
+from empymod import filters, kernel, transform
+from empymod.model import fem
+from empymod.utils import (
+        check_time, check_model, check_frequency, check_hankel, check_loop,
+        check_bipole, check_ab, check_lowpass, check_gates, check_waveform,
+        get_abs, get_layer_nr, get_off_ang, get_azm_dip, get_kwargs,
+        default_timer)
+
+__all__ = ['plan', 'calibrate']
+
+
+def __dir__():
+    return __all__
+
+
+# Number of temporary arrays of the size of the kernel output (nfreq, noff,
+# nlambda) in the kernel and the DLF, and of those times the layers (Gamma
+# and the reflection coefficients); see `kernel.greenfct`.
+_KERNEL_ARRAYS = 8
+_KERNEL_LAYER_ARRAYS = 2
+
+# Calibration of the runtime (filled by `calibrate`)
+_CALIBRATION = {}
+
+
+def plan(src, rec, depth, res, freqtime, signal=None, aniso=None,
+         epermH=None, epermV=None, mpermH=None, mpermV=None, msrc=False,
+         srcpts=1, mrec=False, recpts=1, strength=0, **kwargs):
+    r"""Return the predicted cost of :func:`empymod.model.bipole`.
+
+    All input checks of :func:`empymod.model.bipole` are carried out, and the
+    loops over source and receiver depths, integration points, and
+    source-receiver configurations (ab's) are run through, without computing
+    the wavenumber-domain kernel or any transform.
+
+    The number of kernel calls and evaluations is exact for the DLF (except
+    with ``htarg={'dlf': 'auto'}``, where the default filter with the lagged
+    convolution is assumed) and QUAD, and for the splined QWE. For the
+    non-splined QWE it is the upper bound for convergence at ``maxint``; for
+    adaptive frequency sampling (``ftarg={'adaptive': ...}``) it is the upper
+    bound if all frequencies are computed. The flag `exact` is False in these
+    cases.
+
+    The peak memory is estimated from the output arrays, the arrays of the
+    loops in :func:`empymod.model.bipole`, and the temporary arrays of the
+    largest kernel call. The runtime is estimated from the kernel calls with
+    the calibration of :func:`calibrate`; the checks, the Fourier transform,
+    and, for QWE and QUAD, the integration are not included, hence it is a
+    lower bound for these methods.
+
+
+    Parameters
+    ----------
+    src, rec, depth, res, freqtime, signal, aniso, epermH, epermV, mpermH,
+    mpermV, msrc, srcpts, mrec, recpts, strength, **kwargs :
+        See :func:`empymod.model.bipole`; `outfile` is checked but not created,
+        and the response of a streamed output is not counted in the memory.
+
+    calibration : dict, default: None
+        Runtime calibration, as returned by :func:`calibrate`. By default, the
+        cached calibration is used (it is computed the first time).
+
+
+    Returns
+    -------
+    plan : dict
+        The predicted cost, with the keys:
+
+        - ``shape``: tuple, shape of the response (before squeezing);
+        - ``nfreq``: int, number of frequencies to compute;
+        - ``nlayer``: int, number of layers;
+        - ``fem_calls``: int, number of calls to :func:`empymod.model.fem`;
+        - ``kernel_calls``: int, number of calls to
+          :func:`empymod.kernel.wavenumber`;
+        - ``kernel_evals``: int, number of kernel evaluations (frequencies
+          times offsets times wavenumbers, summed over all kernel calls);
+        - ``kernel_shape``: tuple, shape (nfreq, noff, nlambda) of the
+          largest kernel call;
+        - ``memory``: int, estimated peak memory (bytes);
+        - ``runtime``: float, estimated runtime (s);
+        - ``exact``: bool, if the kernel calls and evaluations are exact.
+
+    """
+    # Get kwargs with defaults.
+    out = get_kwargs(
+        ['verb', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'squeeze',
+         'waveform', 'lowpass', 'gates', 'outfile', 'calibration'],
+        [2, 'dlf', {}, 'dlf', {}, False, None, True, None, None, None, None,
+         None], kwargs,
+    )
+    verb, ht, htarg, ft, ftarg, xdirect, loop, _ = out[:8]
+    waveform, lowpass, gates, outfile, calibration = out[8:]
+
+    # === 1.  CHECK INPUT (as in `bipole`) ============
+
+    if lowpass is not None:
+        check_lowpass(lowpass, verb)
+    if gates is not None:
+        gates = check_gates(
+                gates, freqtime, 1 if waveform is not None else signal, verb)
+        freqtime = gates['gtime']
+    if waveform is not None:
+        waveform = check_waveform(waveform, freqtime, verb)
+        freqtime, signal = waveform['qtime'], 1
+
+    if signal is None:
+        freq = freqtime
+        adaptive = False
+    else:
+        time, freq, ft, ftarg = check_time(freqtime, signal, ft, ftarg, verb)
+        adaptive = ftarg['adaptive'] is not None
+
+    model = check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV,
+                        xdirect, verb)
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, isfullspace = model
+
+    frequency = check_frequency(freq, res, aniso, epermH, epermV, mpermH,
+                                mpermV, verb)
+    freq, etaH = frequency[:2]
+
+    ht, htarg = check_hankel(ht, htarg, verb)
+    loop_freq, loop_off = check_loop(loop, ht, htarg, verb)
+
+    src, nsrc, nsrcz, srcdipole = check_bipole(src, 'src')
+    rec, nrec, nrecz, recdipole = check_bipole(rec, 'rec')
+    if mrec == 'j':
+        mrec = False
+
+    # Automatic DLF: assume the default filter with the lagged convolution
+    exact = not adaptive and not (ht == 'qwe' and htarg['pts_per_dec'] == 0)
+    if ht == 'dlf' and isinstance(htarg['dlf'], str):
+        htarg = {'dlf': filters.Hankel().key_201_2009, 'pts_per_dec': -1}
+        exact = False
+
+    # === 2.  RUN THROUGH THE LOOPS OF `bipole` ============
+
+    # Item size of the kernel and of the response
+    isize = etaH.dtype.itemsize
+
+    isrc = int(nsrc/nsrcz)
+    irec = int(nrec/nrecz)
+    isrz = int(isrc*irec)
+
+    fem_calls = 0
+    calls = []  # Kernel calls as (number, nfreq, noff, nlambda)
+    for isz in range(nsrcz):
+        tsrc, srcazm, srcdip, _, tsrcpts, _ = get_azm_dip(
+                src, isz, nsrcz, srcpts, srcdipole, strength, 'src', verb)
+
+        for irz in range(nrecz):
+            trec, recazm, recdip, _, trecpts, _ = get_azm_dip(
+                    rec, irz, nrecz, recpts, recdipole, strength, 'rec', verb)
+            ab_calc = get_abs(msrc, mrec, srcazm, srcdip, recazm, recdip,
+                              verb)
+
+            for isg in range(tsrcpts):
+                tisrc = [tsrc[0][isg::tsrcpts], tsrc[1][isg::tsrcpts],
+                         tsrc[2][isg]]
+                lsrc, _ = get_layer_nr(tisrc, depth)
+
+                for irg in range(trecpts):
+                    tirec = [trec[0][irg::trecpts], trec[1][irg::trecpts],
+                             trec[2][irg]]
+                    off, _ = get_off_ang(tisrc, tirec, isrc, irec, verb)
+                    lrec, _ = get_layer_nr(tirec, depth)
+
+                    # Kernel calls of `fem` for each ab
+                    xdir = True if xdirect is None else xdirect
+                    for iab in ab_calc:
+                        fem_calls += 1
+                        if iab in [36, ] or (isfullspace and xdir):
+                            continue
+                        calls += _kernel_calls(
+                                freq.size, off, ht, htarg, loop_freq,
+                                loop_off)
+
+    # === 3.  PREDICT COST ============
+
+    if calibration is None:
+        calibration = calibrate()
+
+    nlayer = depth.size
+    kernel_calls = sum(c[0] for c in calls)
+    kernel_evals = sum(c[0]*c[1]*c[2]*c[3] for c in calls)
+    sizes = [c[1]*c[2]*c[3] for c in calls]
+    kernel_shape = tuple(calls[int(np.argmax(sizes))][1:]) if calls else ()
+
+    # Runtime of the kernel calls
+    runtime = kernel_calls*calibration['call']
+    runtime += kernel_evals*(calibration['eval'] +
+                             nlayer*calibration['eval_layer'])
+
+    # Peak memory: output and loop arrays, and the largest kernel call
+    narrays = _KERNEL_ARRAYS
+    if nlayer < kernel._NLAYER_STREAM:
+        narrays += _KERNEL_LAYER_ARRAYS*nlayer
+    memory = isize*max(sizes, default=0)*narrays
+    memory += 5*isize*freq.size*isrz  # fEM, abEM, rEM, sEM, and output
+    if signal is None:
+        shape = (freq.size, nrec, nsrc)
+    else:
+        if gates is not None:
+            nout = gates['operator'].shape[0]
+        elif waveform is not None:
+            nout = waveform['operator'].shape[0]
+        else:
+            nout = time.size
+        shape = (nout, nrec, nsrc)
+        if outfile is None:
+            memory += 8*time.size*nrec*nsrc  # Time-domain response
+    if outfile is None:
+        memory += isize*freq.size*nrec*nsrc
+
+    out = {'shape': shape, 'nfreq': freq.size, 'nlayer': nlayer,
+           'fem_calls': fem_calls, 'kernel_calls': kernel_calls,
+           'kernel_evals': kernel_evals, 'kernel_shape': kernel_shape,
+           'memory': int(memory), 'runtime': runtime, 'exact': exact}
+
+    if verb > 2:
+        print("   Plan            :")
+        print(f"     > shape       :  {shape}")
+        print(f"     > kernel calls:  {kernel_calls}")
+        print(f"     > evaluations :  {kernel_evals}")
+        print(f"     > memory [MB] :  {memory/2**20:.1f}")
+        print(f"     > runtime [s] :  {runtime:.3g}")
+        print(f"     > exact       :  {exact}")
+
+    return out
+
+
+def calibrate(force=False):
+    r"""Return the runtime calibration of the kernel.
+
+    The calibration is obtained by timing :func:`empymod.model.fem` with the
+    standard DLF on a small and on two larger problems with few and more
+    layers, with source and receiver in different layers. The runtime of a
+    kernel call with ``nevals`` evaluations (frequencies times offsets times
+    wavenumbers) and ``nlayer`` layers is then modelled as
+
+    .. math::
+
+        t = t_\mathrm{call} + n_\mathrm{evals}\ (t_\mathrm{eval} +
+            n_\mathrm{layer}\ t_\mathrm{eval,layer}) \ .
+
+    The calibration is computed once and cached.
+
+
+    Parameters
+    ----------
+    force : bool, default: False
+        If True, the calibration is recomputed.
+
+
+    Returns
+    -------
+    calibration : dict
+        Calibration with the keys ``'call'``, ``'eval'``, and
+        ``'eval_layer'`` (s).
+
+    """
+    if _CALIBRATION and not force:
+        return dict(_CALIBRATION)
+
+    # Small problem (call overhead) and two larger problems
+    t_call, _, _ = _time_fem(1, 1, 4)
+    t_few, nevals, nfew = _time_fem(8, 20, 4)
+    t_more, _, nmore = _time_fem(8, 20, 12)
+
+    eval_layer = max(0, (t_more-t_few)/(nevals*(nmore-nfew)))
+    per_eval = max(0, (t_few-t_call)/nevals - nfew*eval_layer)
+
+    _CALIBRATION.update(
+            {'call': t_call, 'eval': per_eval, 'eval_layer': eval_layer})
+    return dict(_CALIBRATION)
+
+
+def _kernel_calls(nfreq, off, ht, htarg, loop_freq, loop_off):
+    r"""Return the kernel calls of one `fem`-call.
+
+    Returns a list of tuples (number of calls, nfreq, noff, nlambda).
+
+    """
+    noff = off.size
+
+    if ht == 'dlf':
+        if loop_off:
+            points = transform.get_dlf_plan(
+                    htarg['dlf'], off[:1], htarg['pts_per_dec']).points
+            return [(noff, nfreq, *points.shape)]
+        points = transform.get_dlf_plan(
+                htarg['dlf'], off, htarg['pts_per_dec']).points
+        if loop_freq:
+            return [(nfreq, 1, *points.shape)]
+        return [(1, nfreq, *points.shape)]
+
+    elif ht == 'qwe':
+        nquad, maxint = htarg['nquad'], htarg['maxint']
+
+        # Wavenumbers as in `transform.hankel_qwe` (asymptotic zeros)
+        g_x, _ = sp.special.roots_legendre(nquad)
+        xint = np.r_[1e-20, np.pi*np.arange(1.25, maxint+1)]
+        lmin = np.diff(xint[:2])[0]/2*(g_x[0]+1) + xint[0]
+        lmax = np.diff(xint[-2:])[0]/2*(g_x[-1]+1) + xint[-2]
+        start = np.log10(lmin/off.max())
+        stop = np.log10(lmax/off.min())
+
+        if htarg['pts_per_dec'] == 0:
+            # Check call, and (at most) one call per interval
+            return [(nfreq, 1, 1, 3), (nfreq*maxint, 1, noff, nquad)]
+        nlambd = int((stop-start)*htarg['pts_per_dec'] + 1)
+        return [(nfreq, 1, 1, nlambd)]
+
+    else:  # quad
+        la, lb = np.log10(htarg['a']), np.log10(htarg['b'])
+        nlambd = int((lb-la)*htarg['pts_per_dec'] + 1)
+        return [(nfreq, 1, 1, nlambd)]
+
+
+def _time_fem(nfreq, noff, nlayer, repeat=5):
+    r"""Return runtime of `fem`, kernel evaluations, and layers (depth.size).
+
+    The runtime is the minimum of `repeat` runs of :func:`empymod.model.fem`
+    with the standard DLF (one kernel call).
+
+    """
+    depth = np.r_[0, 100*np.arange(1, nlayer-1)]
+    res = np.r_[2e14, 1 + 10*(np.arange(nlayer-1) % 4)]
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = check_model(
+            depth, res, None, None, None, None, None, False, 0)
+    freq, etaH, etaV, zetaH, zetaV = check_frequency(
+            np.logspace(-2, 2, nfreq), res, aniso, epermH, epermV, mpermH,
+            mpermV, 0)
+    ht, htarg = check_hankel('dlf', {'pts_per_dec': 0}, 0)
+    ab, msrc, mrec = check_ab(11, 0)
+    off = np.logspace(2, 4, noff)
+    lsrc, zsrc = get_layer_nr(np.array([[0], [0], [50]]), depth)
+    lrec, zrec = get_layer_nr(np.array([[0], [0], [150]]), depth)
+    inp = (ab, off, np.zeros(noff), zsrc, zrec, lsrc, lrec, depth, freq,
+           etaH, etaV, zetaH, zetaV, False, False, ht, htarg, msrc, mrec,
+           False, False)
+
+    fem(*inp)  # Compile the kernel (or load it from the cache)
+    runtime = np.inf
+    for _ in range(repeat):
+        tic = default_timer()
+        fem(*inp)
+        runtime = min(runtime, default_timer()-tic)
+
+    return runtime, nfreq*noff*htarg['dlf'].base.size, depth.size
@@ -0,0 +1,324 @@
+"""
+Profiling of the modelling routines: timed stages and hooks.
+
+The modelling routines, the Hankel and Fourier transforms, the kernel calls,
+and the input checks are instrumented with *spans*: named, timed stages of a
+computation, which can be nested. If no hook is registered, a span is a no-op
+and the instrumentation has no measurable overhead.
+
+A hook is any callable which is registered with :func:`add_hook`; it is
+called with each finished :class:`Span`. The :class:`Profiler` is such a
+hook, which aggregates the spans into a machine-readable report:
+
+.. ipython::
+
+   In [1]: import empymod
+      ...: with empymod.profiling.Profiler(memory=True) as prof:
+      ...:     empymod.dipole([0, 0, 100], [1000, 0, 200], [0, 150],
+      ...:                    [2e14, 1, 10], [1, 10], verb=1)
+      ...: prof.report['model.dipole']
+
+"""
+# Copyright 2016 The emsig community.
+#
+# This file is part of empymod.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License.  You may obtain a copy
+# of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+import time
+import tracemalloc
+from random import getrandbits
+from functools import wraps
+from contextvars import ContextVar
+
+__all__ = ['Span', 'Profiler', 'span', 'traced', 'annotate', 'add_hook',
+           'remove_hook']
+
+
+def __dir__():
+    return __all__
+
+
+# Registered hooks; spans are only recorded if there is at least one
+_HOOKS = []
+
+# Currently open span (of this thread or task)
+_CURRENT = ContextVar('empymod_span', default=None)
+
+
+class Span:
+    r"""Named, timed stage of a computation.
+
+    Spans are created with :func:`span` or :func:`traced`, and passed to the
+    hooks when they are finished.
+
+
+    Attributes
+    ----------
+    name : str
+        Name of the stage, ``module.function`` (e.g., ``'model.fem'``).
+
+    attrs : dict
+        Attributes of the stage, e.g., sizes of the involved arrays.
+
+    parent : Span or None
+        Enclosing span.
+
+    start, duration : float
+        Start (``time.perf_counter``) and wall time (s) of the stage.
+
+    memory : int or None
+        Peak memory (bytes) allocated during the stage in addition to the
+        memory at its start; only if ``tracemalloc`` is tracing.
+
+    error : str or None
+        Name of the exception if the stage failed.
+
+    span_id, trace_id : int
+        Random 64-bit ID of the span, and ID of the trace, which is the ID of
+        the outermost span.
+
+    """
+
+    __slots__ = ['name', 'attrs', 'parent', 'start', 'duration', 'memory',
+                 'error', 'span_id', 'trace_id', '_mem0', '_peak', '_token']
+
+    def __init__(self, name, attrs=None):
+        """Create a new span named `name`."""
+        self.name = name
+        self.attrs = {} if attrs is None else attrs
+        self.parent = None
+        self.start = None
+        self.duration = None
+        self.memory = None
+        self.error = None
+
+    def __enter__(self):
+        """Start the span."""
+        self.parent = _CURRENT.get()
+        self._token = _CURRENT.set(self)
+        self.span_id = getrandbits(64)
+        if self.parent is None:
+            self.trace_id = self.span_id
+        else:
+            self.trace_id = self.parent.trace_id
+        if tracemalloc.is_tracing():
+            self._mem0 = _update_peaks(self.parent)
+            self._peak = self._mem0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        """Finish the span and call the hooks."""
+        self.duration = time.perf_counter() - self.start
+        _CURRENT.reset(self._token)
+        if exc[0] is not None:
+            self.error = exc[0].__name__
+        if tracemalloc.is_tracing() and hasattr(self, '_mem0'):
+            _update_peaks(self)
+            self.memory = self._peak - self._mem0
+        for hook in list(_HOOKS):
+            hook(self)
+        return False
+
+    def set(self, **attrs):
+        """Add attributes to the span."""
+        self.attrs.update(attrs)
+
+    def __repr__(self):
+        """Return name and duration."""
+        return f"Span({self.name!r}, duration={self.duration})"
+
+
+class _NullSpan:
+    """Span which does nothing; used if no hook is registered."""
+
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **attrs):
+    """Return a span (context manager) for the stage `name`.
+
+    If no hook is registered, a shared no-op span is returned.
+
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, ``module.function``.
+
+    attrs : optional
+        Attributes of the stage, e.g., sizes of the involved arrays.
+
+    """
+    if not _HOOKS:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def traced(name):
+    """Decorator recording each call of the function as span `name`."""
+
+    def decorator(func):
+        """Wrap `func` into a span."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _HOOKS:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(**attrs):
+    """Add attributes (e.g., array sizes) to the currently open span."""
+    if _HOOKS:
+        current = _CURRENT.get()
+        if current is not None:
+            current.set(**attrs)
+
+
+def add_hook(hook):
+    """Register `hook`, a callable which is called with each finished span."""
+    if hook not in _HOOKS:
+        _HOOKS.append(hook)
+
+
+def remove_hook(hook):
+    """Remove `hook` from the registered hooks (if registered)."""
+    if hook in _HOOKS:
+        _HOOKS.remove(hook)
+
+
+class Profiler:
+    r"""Record wall time, calls, sizes, and peak memory of all stages.
+
+    Use it as context manager; all computations within the context are
+    recorded (from all threads).
+
+
+    Parameters
+    ----------
+    memory : bool, default: False
+        If True, the peak memory of each stage is recorded too. This requires
+        ``tracemalloc``, which is started if it is not running already; it
+        slows down the computation considerably.
+
+
+    Attributes
+    ----------
+    spans : list of Span
+        All recorded spans, in order of completion.
+
+    """
+
+    def __init__(self, memory=False):
+        """Initiate a new profiler."""
+        self.memory = memory
+        self.spans = []
+        self._tracemalloc = False
+
+    def __enter__(self):
+        """Start recording."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc = True
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc):
+        """Stop recording."""
+        remove_hook(self)
+        if self._tracemalloc:
+            tracemalloc.stop()
+            self._tracemalloc = False
+        return False
+
+    def __call__(self, span):
+        """Record finished `span`."""
+        self.spans.append(span)
+
+    @property
+    def report(self):
+        r"""Aggregated report, a dict of dicts.
+
+        For each stage (by name, in order of first completion):
+
+        - ``calls``: number of calls;
+        - ``time``: total wall time (s);
+        - ``self_time``: total wall time excluding nested stages (s);
+        - ``sizes``: maximum of each numeric attribute (e.g., array sizes);
+        - ``memory``: maximum peak memory (bytes), None if not recorded.
+
+        """
+        report = {}
+        children = {}
+        for s in self.spans:
+            if s.parent is not None:
+                pid = id(s.parent)
+                children[pid] = children.get(pid, 0) + s.duration
+        for s in self.spans:
+            r = report.setdefault(s.name, {
+                'calls': 0, 'time': 0.0, 'self_time': 0.0, 'sizes': {},
+                'memory': None})
+            r['calls'] += 1
+            r['time'] += s.duration
+            r['self_time'] += s.duration - children.get(id(s), 0.0)
+            for k, v in s.attrs.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    r['sizes'][k] = max(r['sizes'].get(k, v), v)
+            if s.memory is not None:
+                r['memory'] = max(r['memory'] or 0, s.memory)
+        return report
+
+    def __repr__(self):
+        """Return the report as table, sorted by total time."""
+        report = self.report
+        out = f"{'stage':<28} {'calls':>7} {'time [s]':>10} {'self [s]':>10}"
+        out += f" {'memory [MB]':>12}\n"
+        for name, r in sorted(report.items(), key=lambda x: -x[1]['time']):
+            mem = '-' if r['memory'] is None else f"{r['memory']/1e6:.3f}"
+            out += f"{name:<28} {r['calls']:>7} {r['time']:>10.4f} "
+            out += f"{r['self_time']:>10.4f} {mem:>12}\n"
+        return out
+
+
+def _update_peaks(span):
+    """Propagate the traced peak to `span` and its parents; reset it.
+
+    Returns the currently traced memory.
+
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    while span is not None:
+        if getattr(span, '_peak', None) is not None:
+            span._peak = max(span._peak, peak)
+        span = span.parent
+    tracemalloc.reset_peak()
+    return current
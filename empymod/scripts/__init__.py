@@ -14,6 +14,6 @@
 # License for the specific language governing permissions and limitations under
 # the License.
 
-from empymod.scripts import tmtemod, fdesign
+from empymod.scripts import tmtemod, fdesign, filterbench
 
-__all__ = ['tmtemod', 'fdesign']
+__all__ = ['tmtemod', 'fdesign', 'filterbench']
@@ -0,0 +1,389 @@
+r"""
+Accuracy-versus-cost benchmark of the Hankel and Fourier DLF filters.
+
+The add-on filterbench runs each digital linear filter (DLF) in its standard,
+lagged, and splined variant on a set of canonical models, and compares the
+responses to references: high-accuracy QWE (or QUAD) for the Hankel transform
+of layered models, and the analytical time-domain solutions of the diffusive
+full- and halfspace for the Fourier transform. It returns for each filter,
+variant, and model
+
+- the number of kernel evaluations (frequencies times the wavenumbers of all
+  offsets for the Hankel transform; frequencies times offsets for the Fourier
+  transform),
+- the number of computed frequencies,
+- the runtime (minimum of several runs), and
+- percentiles of the relative error.
+
+This quantifies the trade-off between runtime and accuracy to choose a
+filter, e.g.:
+
+.. code-block:: python
+
+   from empymod.scripts import filterbench
+   results = filterbench.hankel(filters=['key_201_2012', 'wer_201_2018'])
+   print(filterbench.table(results))
+
+The results are lists of dicts, which can be stored as JSON. Note that the
+errors depend on the models (``HANKEL_MODELS``, ``FOURIER_MODELS``), the
+source-receiver configuration, and the reference; the relative errors at very
+small amplitudes (e.g., in sign changes) can be large for every filter.
+
+"""
+# Copyright 2016 The emsig community.
+#
+# This file is part of empymod.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License.  You may obtain a copy
+# of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+import numpy as np
+
+from empymod import profiling
+from empymod.utils import check_time
+from empymod.filters import Hankel, Fourier
+from empymod.model import dipole, analytical, tem
+from empymod.utils import printstartfinish, default_timer
+
+__all__ = ['hankel', 'fourier', 'table', 'HANKEL_MODELS', 'FOURIER_MODELS']
+
+
+def __dir__():
+    return __all__
+
+
+# Canonical layered models for the Hankel transform: model, source and
+# receiver depths, offsets, and frequencies.
+HANKEL_MODELS = {
+    'halfspace': {
+        'depth': [0], 'res': [2e14, 10], 'zsrc': 50, 'zrec': 50,
+        'off': np.logspace(1.5, 4, 26), 'freq': [0.1, 1, 10]},
+    'land': {
+        'depth': [0, 30, 130], 'res': [2e14, 50, 5, 300], 'zsrc': 0.1,
+        'zrec': 0.1, 'off': np.logspace(1, 3, 26), 'freq': [1, 10, 100]},
+    'marine': {
+        'depth': [0, 1000, 2000, 2100], 'res': [2e14, 0.3, 1, 100, 1],
+        'zsrc': 950, 'zrec': 999, 'off': np.logspace(2.7, 4.3, 26),
+        'freq': [0.1, 0.5, 2]},
+    'anisotropic': {
+        'depth': [0, 500, 800], 'res': [2e14, 1, 50, 2],
+        'aniso': [1, 1.5, 1, 2], 'zsrc': 100, 'zrec': 200,
+        'off': np.logspace(2, 4, 26), 'freq': [0.1, 1, 10]},
+}
+
+# Canonical models for the Fourier transform, with analytical solutions of
+# the switch-off response: diffusive fullspace (dfs) or halfspace (dhs).
+FOURIER_MODELS = {
+    'fullspace': {
+        'solution': 'dfs', 'res': 1, 'zsrc': 0, 'zrec': 0,
+        'off': np.logspace(2, 4, 11), 'time': np.logspace(-2, 1, 16)},
+    'halfspace': {
+        'solution': 'dhs', 'res': 10, 'zsrc': 50, 'zrec': 50,
+        'off': np.logspace(2, 4, 11), 'time': np.logspace(-3, 0, 16)},
+    'surface': {
+        'solution': 'dhs', 'res': 100, 'zsrc': 0, 'zrec': 0,
+        'off': np.logspace(1.5, 3.5, 11), 'time': np.logspace(-5, -2, 16)},
+    'seawater': {
+        'solution': 'dhs', 'res': 0.3, 'zsrc': 950, 'zrec': 1000,
+        'off': np.logspace(2.7, 4.3, 11), 'time': np.logspace(-1, 1.5, 16)},
+}
+
+# DLF variants: name => pts_per_dec (splined: given by `pts_per_dec`)
+VARIANTS = {'standard': 0, 'lagged': -1, 'splined': None}
+
+
+def hankel(filters=None, variants=('standard', 'lagged', 'splined'),
+           models=None, ab=11, reference=None, pts_per_dec=10, repeat=3,
+           percentiles=(50, 90, 99), verb=2):
+    r"""Benchmark the Hankel DLF filters against a reference.
+
+    The responses are computed with :func:`empymod.model.dipole` in the
+    frequency domain.
+
+
+    Parameters
+    ----------
+    filters : list of str, default: None
+        Names of the filters; default are all filters of
+        :class:`empymod.filters.Hankel` which provide the J0 and J1 kernels.
+
+    variants : tuple of str, default: ('standard', 'lagged', 'splined')
+        DLF variants.
+
+    models : list of str, default: None
+        Names of the models in ``HANKEL_MODELS``; default are all.
+
+    ab : int, default: 11
+        Source-receiver configuration.
+
+    reference : dict, default: None
+        Hankel transform of the reference, ``{'ht': ..., 'htarg': ...}``.
+        Default is QWE with ``rtol=1e-12``, ``atol=1e-30``, ``nquad=51``, and
+        ``maxint=200``.
+
+    pts_per_dec : int, default: 10
+        Points per decade of the splined DLF.
+
+    repeat : int, default: 3
+        The runtime is the minimum of `repeat` runs.
+
+    percentiles : tuple of float, default: (50, 90, 99)
+        Percentiles of the relative errors; the maximum is always returned.
+
+    verb : {0, 1, 2}, default: 2
+        Level of verbosity; prints the results as they are computed if 2.
+
+
+    Returns
+    -------
+    results : list of dict
+        One dict per filter, variant, and model, see :func:`table`.
+
+    """
+    if filters is None:
+        filters = [f for f in Hankel().available if
+                   hasattr(getattr(Hankel(), f), 'j0') and
+                   hasattr(getattr(Hankel(), f), 'j1')]
+    if reference is None:
+        reference = {'ht': 'qwe', 'htarg': {
+            'rtol': 1e-12, 'atol': 1e-30, 'nquad': 51, 'maxint': 200}}
+
+    def get_reference(name):
+        """Return the input and the reference of model `name`."""
+        model = HANKEL_MODELS[name]
+        off = np.asarray(model['off'], dtype=float)
+        inp = {'src': [0, 0, model['zsrc']],
+               'rec': [off, np.zeros(off.size), model['zrec']],
+               'depth': model['depth'], 'res': model['res'],
+               'aniso': model.get('aniso'), 'ab': ab,
+               'freqtime': model['freq']}
+
+        # Warnings, e.g., of non-convergence, are shown.
+        return inp, dipole(**inp, **reference, verb=min(verb, 1))
+
+    def run(inp, filt, pts_per_dec):
+        """Return response, kernel evaluations, frequencies, and runtime."""
+        inp = {**inp, 'htarg': {'dlf': filt, 'pts_per_dec': pts_per_dec},
+               'verb': 0}
+
+        # Count kernel evaluations and frequencies with the profiling hooks.
+        with profiling.Profiler() as prof:
+            resp = dipole(**inp)
+        kernel_evals = sum(s.attrs['nfreq']*s.attrs['nlambda'] for s in
+                           prof.spans if s.name == 'kernel.wavenumber')
+        nfreq = prof.report['model.dipole']['sizes']['nfreq']
+
+        # Time separately (the profiling has some overhead).
+        runtime = _runtime(dipole, inp, repeat)
+
+        return resp, kernel_evals, nfreq, runtime
+
+    models = list(HANKEL_MODELS) if models is None else models
+    return _bench('hankel', filters, variants, models, get_reference, run,
+                  pts_per_dec, percentiles, verb)
+
+
+def fourier(filters=None, variants=('standard', 'lagged', 'splined'),
+            models=None, ab=11, pts_per_dec=10, repeat=3,
+            percentiles=(50, 90, 99), verb=2):
+    r"""Benchmark the Fourier DLF filters against analytical solutions.
+
+    The frequency-domain responses required by each filter are computed
+    analytically (:func:`empymod.model.analytical`), and transformed to the
+    switch-off response with :func:`empymod.model.tem`; the runtime is the
+    runtime of the transform. The reference is the analytical time-domain
+    solution.
+
+
+    Parameters
+    ----------
+    filters : list of str, default: None
+        Names of the filters; default are all filters of
+        :class:`empymod.filters.Fourier` which provide the cosine transform
+        (required for switch-off responses).
+
+    models : list of str, default: None
+        Names of the models in ``FOURIER_MODELS``; default are all.
+
+    ab : int, default: 11
+        Source-receiver configuration; only electric source and receivers.
+
+    variants, pts_per_dec, repeat, percentiles, verb :
+        See :func:`hankel`.
+
+
+    Returns
+    -------
+    results : list of dict
+        One dict per filter, variant, and model, see :func:`table`.
+
+    """
+    if filters is None:
+        filters = [f for f in Fourier().available if
+                   hasattr(getattr(Fourier(), f), 'cos')]
+
+    def get_reference(name):
+        """Return the input and the reference of model `name`."""
+        model = FOURIER_MODELS[name]
+        off = np.asarray(model['off'], dtype=float)
+        inp = {'src': [0, 0, model['zsrc']],
+               'rec': [off, np.zeros(off.size), model['zrec']],
+               'res': model['res'], 'solution': model['solution'], 'ab': ab,
+               'verb': 0}
+        ref = analytical(**inp, freqtime=model['time'], signal=-1)
+        return (inp, model['time']), ref
+
+    def run(inp, filt, pts_per_dec):
+        """Return response, kernel evaluations, frequencies, and runtime."""
+        inp, time = inp
+        ftarg = {'dlf': filt, 'pts_per_dec': pts_per_dec}
+        time, freq, ft, ftarg = check_time(time, -1, 'dlf', ftarg, 0)
+        freq = np.ravel(freq)
+
+        fEM = analytical(**inp, freqtime=freq, squeeze=False)
+        fEM = fEM.reshape(freq.size, -1)
+        off = inp['rec'][0]
+        args = {'fEM': fEM, 'off': off, 'freq': freq, 'time': time,
+                'signal': -1, 'ft': ft, 'ftarg': ftarg}
+
+        resp = tem(**args)[0]
+        runtime = _runtime(tem, args, repeat)
+
+        return resp, freq.size*off.size, freq.size, runtime
+
+    models = list(FOURIER_MODELS) if models is None else models
+    return _bench('fourier', filters, variants, models, get_reference, run,
+                  pts_per_dec, percentiles, verb)
+
+
+def table(results, by_model=True):
+    r"""Return the results as a table (str).
+
+    Parameters
+    ----------
+    results : list of dict
+        Output of :func:`hankel` or :func:`fourier`. Each dict contains:
+
+        - ``transform``, ``filter``, ``variant``, ``model``: str;
+        - ``kernel_evals``: number of kernel evaluations;
+        - ``nfreq``: number of computed frequencies;
+        - ``runtime``: runtime (s);
+        - ``errors``: dict of the relative errors, ``'p<percentile>'`` and
+          ``'max'``.
+
+    by_model : bool, default: True
+        If False, the results of all models are combined per filter and
+        variant: The kernel evaluations, frequencies, and runtimes are summed
+        up, and the error percentiles are the maximum of all models.
+
+
+    Returns
+    -------
+    table : str
+        The results as table.
+
+    """
+    if not by_model:
+        combined = {}
+        for res in results:
+            key = (res['transform'], res['filter'], res['variant'])
+            if key not in combined:
+                combined[key] = {**res, 'model': 'all',
+                                 'errors': dict(res['errors'])}
+                continue
+            comb = combined[key]
+            for name in ['kernel_evals', 'nfreq', 'runtime']:
+                comb[name] += res[name]
+            for name, value in res['errors'].items():
+                comb['errors'][name] = max(comb['errors'][name], value)
+        results = list(combined.values())
+
+    if len(results) == 0:
+        return ''
+
+    errors = list(results[0]['errors'])
+    return _header(errors) + ''.join(_row(res) for res in results)
+
+
+def _bench(transform, filters, variants, models, get_reference, run,
+           pts_per_dec, percentiles, verb):
+    """Run the benchmark matrix, see :func:`hankel` and :func:`fourier`."""
+    t0 = printstartfinish(verb) if verb > 2 else None
+
+    for variant in variants:
+        if variant not in VARIANTS:
+            raise ValueError(
+                f"Variant must be one of {list(VARIANTS)}; "
+                f"provided: {variant}.")
+
+    results = []
+    for name in models:
+        inp, ref = get_reference(name)
+
+        for filt in filters:
+            for variant in variants:
+                ppd = VARIANTS[variant]
+                ppd = pts_per_dec if ppd is None else ppd
+                resp, kernel_evals, nfreq, runtime = run(inp, filt, ppd)
+                res = {'transform': transform, 'filter': filt,
+                       'variant': variant, 'model': name,
+                       'kernel_evals': int(kernel_evals), 'nfreq': int(nfreq),
+                       'runtime': runtime,
+                       'errors': _errors(resp, ref, percentiles)}
+                if verb > 1:
+                    if not results:
+                        print(_header(list(res['errors'])), end='')
+                    print(_row(res), end='', flush=True)
+                results.append(res)
+
+    if t0 is not None:
+        printstartfinish(verb, t0)
+
+    return results
+
+
+def _runtime(func, inp, repeat):
+    """Return the minimum runtime of `repeat` calls ``func(**inp)``."""
+    runtime = np.inf
+    for _ in range(repeat):
+        tic = default_timer()
+        func(**inp)
+        runtime = min(runtime, default_timer()-tic)
+    return runtime
+
+
+def _errors(resp, ref, percentiles):
+    """Return percentiles and maximum of the relative errors."""
+    ref = np.asarray(ref).ravel()
+    resp = np.asarray(resp).ravel()
+    ind = abs(ref) > 0
+    error = abs(resp[ind] - ref[ind])/abs(ref[ind])
+    out = {f"p{p:g}": float(np.percentile(error, p)) for p in percentiles}
+    out['max'] = float(error.max())
+    return out
+
+
+def _header(errors):
+    """Return the header of the table, with error columns `errors`."""
+    out = (f"{'filter':<20} {'variant':<9} {'model':<12} {'kernel':>9} "
+           f"{'freqs':>6} {'time [ms]':>10}")
+    out += ''.join(f" {e:>8}" for e in errors)
+    return out + '\n' + '-'*len(out) + '\n'
+
+
+def _row(res):
+    """Return the result `res` as a row of the table."""
+    out = (f"{res['filter']:<20} {res['variant']:<9} {res['model']:<12} "
+           f"{res['kernel_evals']:>9} {res['nfreq']:>6} "
+           f"{res['runtime']*1e3:>10.2f}")
+    out += ''.join(f" {v:>8.1e}" for v in res['errors'].values())
+    return out + '\n'
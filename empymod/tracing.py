@@ -0,0 +1,324 @@
+"""
+Tracing and metrics of the modelling routines for monitoring.
+
+The tracing layer builds on the spans of :mod:`empymod.profiling`. When
+enabled with :func:`enable`, each finished span of the modelling routines
+(``model.*``), the Hankel and Fourier transforms (``transform.hankel_*``,
+``transform.fourier_*``), and the kernel (``kernel.wavenumber``) is
+
+- converted to a record (name, trace and span IDs, start time, duration,
+  attributes, error), which is passed to the exporters; and
+- accounted in the metrics: call and error counters, latency histograms, and
+  the number of kernel calls and evaluations (wavenumbers times frequencies).
+
+Exporters are objects with a method ``export(record)``, and optionally
+``export_metrics(metrics)``, which is called by :meth:`Tracer.flush` and by
+:func:`disable`. Included are an in-process collector,
+:class:`MemoryExporter`, and :class:`JSONExporter`, which writes JSON lines
+to stdout or any other stream. When tracing is disabled, the spans are no-ops.
+
+.. ipython::
+
+   In [1]: import empymod
+      ...: from empymod import tracing
+      ...: collector = tracing.MemoryExporter()
+      ...: tracing.enable(collector)
+      ...: empymod.dipole([0, 0, 100], [1000, 0, 200], [0, 150],
+      ...:                [2e14, 1, 10], [1, 10], verb=1)
+      ...: tracing.disable()
+      ...: collector.metrics['counters']
+
+"""
+# Copyright 2016 The emsig community.
+#
+# This file is part of empymod.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License.  You may obtain a copy
+# of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.  See the
+# License for the specific language governing permissions and limitations under
+# the License.
+
+import sys
+import json
+import time
+import bisect
+import threading
+
+from empymod import profiling
+
+__all__ = ['Tracer', 'Histogram', 'MemoryExporter', 'JSONExporter', 'enable',
+           'disable', 'get_tracer']
+
+
+def __dir__():
+    return __all__
+
+
+# Traced stages (prefixes of the span names)
+PREFIXES = ('model.', 'transform.hankel_', 'transform.fourier_', 'kernel.')
+
+# Upper bounds (s) of the latency-histogram buckets
+BUCKETS = (1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+# The enabled tracer
+_TRACER = None
+
+
+class Histogram:
+    r"""Histogram of observed values with fixed buckets.
+
+    Parameters
+    ----------
+    buckets : tuple of float, default: BUCKETS
+        Upper bounds of the buckets; a last bucket collects all larger
+        values.
+
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """Initiate an empty histogram."""
+        self.buckets = tuple(buckets)
+        self.counts = [0]*(len(self.buckets)+1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Add `value` to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Return the estimated `q`-quantile (upper bound of its bucket)."""
+        if self.count == 0:
+            return None
+        rank = q*self.count
+        cum = 0
+        for i, count in enumerate(self.counts):
+            cum += count
+            if cum >= rank and count > 0:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        """Return the histogram as dict."""
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+class Tracer:
+    r"""Hook turning spans into exported records and metrics.
+
+    Usually created with :func:`enable`.
+
+
+    Parameters
+    ----------
+    exporters : list
+        Exporters, objects with a method ``export(record)``, and optionally
+        ``export_metrics(metrics)``.
+
+    prefixes : tuple of str, default: PREFIXES
+        Spans whose name starts with one of the prefixes are traced.
+
+    buckets : tuple of float, default: BUCKETS
+        Upper bounds (s) of the latency-histogram buckets.
+
+    """
+
+    def __init__(self, exporters=(), prefixes=PREFIXES, buckets=BUCKETS):
+        """Initiate a new tracer."""
+        self.exporters = list(exporters)
+        self.prefixes = tuple(prefixes)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Offset between the wall clock and the span clock (perf_counter)
+        self._t0 = time.time() - time.perf_counter()
+        self.reset()
+
+    def __call__(self, span):
+        """Trace finished `span`."""
+        if not span.name.startswith(self.prefixes):
+            return
+
+        record = {
+            'name': span.name,
+            'trace_id': f"{span.trace_id:016x}",
+            'span_id': f"{span.span_id:016x}",
+            'parent_id': (None if span.parent is None else
+                          f"{span.parent.span_id:016x}"),
+            'start': self._t0 + span.start,
+            'duration': span.duration,
+            'attrs': dict(span.attrs),
+            'error': span.error,
+            'thread': threading.current_thread().name,
+        }
+
+        with self._lock:
+            counters = self._counters
+            counters[span.name] = counters.get(span.name, 0) + 1
+            if span.error is not None:
+                key = span.name+'.errors'
+                counters[key] = counters.get(key, 0) + 1
+            if span.name == 'kernel.wavenumber':
+                nkern = span.attrs.get('nfreq', 1)*span.attrs.get('nlambda', 1)
+                counters['kernel.evaluations'] = counters.get(
+                        'kernel.evaluations', 0) + nkern
+            if span.name not in self._histograms:
+                self._histograms[span.name] = Histogram(self.buckets)
+            self._histograms[span.name].observe(span.duration)
+
+        for exporter in self.exporters:
+            exporter.export(record)
+
+    @property
+    def metrics(self):
+        r"""Snapshot of the metrics, a JSON-serializable dict.
+
+        - ``counters``: number of calls per stage, ``<stage>.errors``, and
+          ``kernel.evaluations`` (sum of wavenumbers times frequencies);
+        - ``histograms``: latency histogram (s) per stage, see
+          :meth:`Histogram.to_dict`.
+
+        """
+        with self._lock:
+            return {'counters': dict(self._counters),
+                    'histograms': {k: v.to_dict() for k, v in
+                                   self._histograms.items()}}
+
+    def reset(self):
+        """Reset the metrics."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def flush(self):
+        """Export the metrics to the exporters which accept metrics."""
+        metrics = self.metrics
+        for exporter in self.exporters:
+            if hasattr(exporter, 'export_metrics'):
+                exporter.export_metrics(metrics)
+
+
+class MemoryExporter:
+    r"""In-process collector of records and metrics.
+
+    Attributes
+    ----------
+    records : list of dict
+        Exported span records.
+
+    metrics : dict or None
+        Last exported metrics.
+
+    """
+
+    def __init__(self):
+        """Initiate an empty collector."""
+        self.records = []
+        self.metrics = None
+
+    def export(self, record):
+        """Collect `record`."""
+        self.records.append(record)
+
+    def export_metrics(self, metrics):
+        """Collect `metrics`."""
+        self.metrics = metrics
+
+    def clear(self):
+        """Remove all collected records and metrics."""
+        self.records = []
+        self.metrics = None
+
+
+class JSONExporter:
+    r"""Exporter writing records and metrics as JSON lines.
+
+    Each record is written as ``{"type": "span", ...}``, metrics as
+    ``{"type": "metrics", ...}``.
+
+
+    Parameters
+    ----------
+    stream : file-like, default: None
+        Stream to write to; default is ``sys.stdout``.
+
+    """
+
+    def __init__(self, stream=None):
+        """Initiate a new exporter."""
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        """Write `record`."""
+        self._write({'type': 'span', **record})
+
+    def export_metrics(self, metrics):
+        """Write `metrics`."""
+        self._write({'type': 'metrics', **metrics})
+
+    def _write(self, data):
+        """Write `data` as JSON line."""
+        stream = sys.stdout if self.stream is None else self.stream
+        line = json.dumps(data, default=_to_json)+'\n'
+        with self._lock:
+            stream.write(line)
+            stream.flush()
+
+
+def enable(*exporters, prefixes=PREFIXES, buckets=BUCKETS):
+    """Enable tracing, replacing a previously enabled tracer.
+
+    Parameters
+    ----------
+    exporters : optional
+        Exporters, e.g., :class:`MemoryExporter` or :class:`JSONExporter`.
+
+    prefixes, buckets : tuple, default: PREFIXES, BUCKETS
+        Traced stages and histogram buckets, see :class:`Tracer`.
+
+
+    Returns
+    -------
+    tracer : Tracer
+        The enabled tracer.
+
+    """
+    global _TRACER
+    disable()
+    _TRACER = Tracer(exporters, prefixes, buckets)
+    profiling.add_hook(_TRACER)
+    return _TRACER
+
+
+def disable():
+    """Disable tracing; the metrics are flushed to the exporters."""
+    global _TRACER
+    if _TRACER is not None:
+        profiling.remove_hook(_TRACER)
+        _TRACER.flush()
+        _TRACER = None
+
+
+def get_tracer():
+    """Return the enabled tracer, or None if tracing is disabled."""
+    return _TRACER
+
+
+def _to_json(obj):
+    """Convert NumPy scalars in span attributes for JSON."""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
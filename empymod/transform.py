@@ -28,20 +28,56 @@ root directory for more information regarding the involved licenses.
 # the License.
 
 
+import os
+import threading
+from functools import partial
+from collections import OrderedDict
+
 import numpy as np
 import scipy as sp
 
-from empymod import kernel
+from empymod import kernel, filters
+from empymod.profiling import span, traced
 
 __all__ = ['hankel_dlf', 'hankel_qwe', 'hankel_quad', 'fourier_dlf',
            'fourier_qwe', 'fourier_fftlog', 'fourier_fft', 'dlf', 'qwe',
-           'get_dlf_points', 'get_fftlog_input']
+           'get_dlf_points', 'DLFPlan', 'get_dlf_plan', 'get_dlf_auto',
+           'get_fftlog_input', 'get_waveform_operator', 'get_gate_operator',
+           'get_lowpass_response', 'get_loop_operator']
 
 
 def __dir__():
     return __all__
 
 
+# Typical relative error (90th percentile) of the Hankel filters with J0 and
+# J1 coefficients; standard DLF compared to the analytical full-space
+# solutions (ab=11, 12, 13, 31, 33) for offsets of 1 m to 20 km, frequencies
+# of 1 mHz to 10 kHz, and resistivities of 1 and 100 Ohm.m, up to five skin
+# depths. Used by `get_dlf_auto`; sorted by filter length. Only filters
+# shorter than the reference `key_401_2009` of `get_dlf_auto` are listed.
+_HANKEL_ACCURACY = {
+    'key_51_2012': 9e-3,
+    'kong_61_2007b': 2e-3,
+    'key_101_2012': 2e-6,
+    'key_101_2009': 3e-6,
+    'kong_121_2007': 3e-3,
+    'wer_201_2018': 1e-10,
+    'key_201_2012': 2e-10,
+    'key_201_2009': 2e-8,
+    'kong_241_2007': 4e-8,
+    'key_401_2009': 2e-11,
+}
+
+# Points per decade of the splined DLF tested by `get_dlf_auto`
+_AUTO_PTS_PER_DEC = [10.0, 20.0, 40.0, 80.0]
+
+# DLF-plan cache (least recently used), see `get_dlf_plan`
+_DLF_PLANS = OrderedDict()
+_DLF_PLANS_MAXSIZE = 32
+_DLF_PLANS_LOCK = threading.Lock()
+
+
 def iuSpline(x, y, *args, **kwargs):
     """Wrap in function so it does not affect import speed."""
     return sp.interpolate.InterpolatedUnivariateSpline(x, y, *args, **kwargs)
@@ -49,6 +85,7 @@ def iuSpline(x, y, *args, **kwargs):
 
 # 1. Hankel transforms (wavenumber -> frequency)
 
+@traced('transform.hankel_dlf')
 def hankel_dlf(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
                zetaH, zetaV, xdirect, htarg, msrc, mrec):
     r"""Hankel Transform using the Digital Linear Filter method.
@@ -105,20 +142,24 @@ def hankel_dlf(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
 
     """
 
-    # Compute required lambdas for given Hankel-filter-base
-    lambd, int_pts = get_dlf_points(htarg['dlf'], off, htarg['pts_per_dec'])
+    # Get (cached) plan with the required lambdas for the Hankel-filter-base
+    plan = get_dlf_plan(htarg['dlf'], off, htarg['pts_per_dec'])
 
     # Call the kernel
-    PJ = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH,
-                           zetaV, lambd, ab, xdirect, msrc, mrec)
+    with span('kernel.wavenumber', nfreq=etaH.shape[0],
+              nlambda=plan.points.size, nlayer=depth.size):
+        PJ = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH, etaV,
+                               zetaH, zetaV, plan.points, ab, xdirect, msrc,
+                               mrec)
 
     # Carry out the dlf
-    fEM = dlf(PJ, lambd, off, htarg['dlf'], htarg['pts_per_dec'],
-              ang_fact=ang_fact, ab=ab, int_pts=int_pts)
+    fEM = dlf(PJ, plan.points, off, htarg['dlf'], htarg['pts_per_dec'],
+              ang_fact=ang_fact, ab=ab, plan=plan)
 
     return fEM, 1, True
 
 
+@traced('transform.hankel_qwe')
 def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
                zetaH, zetaV, xdirect, htarg, msrc, mrec):
     r"""Hankel Transform using Quadrature-With-Extrapolation.
@@ -178,6 +219,10 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
     zetaH = zetaH[0, :]
     zetaV = zetaV[0, :]
 
+    # Real-valued parameters (Laplace domain) yield real-valued kernels, which
+    # are interpolated and integrated in real arithmetic.
+    dtype = np.result_type(etaH, zetaH)
+
     # Get rtol, atol, nquad, maxint, and pts_per_dec
     rtol = htarg['rtol']
     atol = htarg['atol']
@@ -250,11 +295,12 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
         ilambd = np.logspace(start, stop, int((stop-start)*pts_per_dec + 1))
 
     # Call the kernel
-    PJ0, PJ1, PJ0b = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth,
-                                       etaH[None, :], etaV[None, :],
-                                       zetaH[None, :], zetaV[None, :],
-                                       np.atleast_2d(ilambd), ab, xdirect,
-                                       msrc, mrec)
+    with span('kernel.wavenumber', nfreq=1, nlambda=ilambd.size,
+              nlayer=depth.size):
+        PJ0, PJ1, PJ0b = kernel.wavenumber(
+                zsrc, zrec, lsrc, lrec, depth, etaH[None, :], etaV[None, :],
+                zetaH[None, :], zetaV[None, :], np.atleast_2d(ilambd), ab,
+                xdirect, msrc, mrec)
 
     # Check which kernels have information
     k_used = [True, True, True]
@@ -267,26 +313,9 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
 
         # Interpolation : Has to be done separately on each PJ,
         # in order to work with multiple offsets which have different angles.
-        if k_used[0]:
-            sPJ0r = iuSpline(np.log(ilambd), PJ0.real)
-            sPJ0i = iuSpline(np.log(ilambd), PJ0.imag)
-        else:
-            sPJ0r = None
-            sPJ0i = None
-
-        if k_used[1]:
-            sPJ1r = iuSpline(np.log(ilambd), PJ1.real)
-            sPJ1i = iuSpline(np.log(ilambd), PJ1.imag)
-        else:
-            sPJ1r = None
-            sPJ1i = None
-
-        if k_used[2]:
-            sPJ0br = iuSpline(np.log(ilambd), PJ0b.real)
-            sPJ0bi = iuSpline(np.log(ilambd), PJ0b.imag)
-        else:
-            sPJ0br = None
-            sPJ0bi = None
+        sPJ0r, sPJ0i = _spline_kernel(ilambd, PJ0)
+        sPJ1r, sPJ1i = _spline_kernel(ilambd, PJ1)
+        sPJ0br, sPJ0bi = _spline_kernel(ilambd, PJ0b)
 
         # Get htarg: diff_quad, a, b, limit
         diff_quad = htarg['diff_quad']
@@ -311,42 +340,45 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
         # as QWE is not designed for these intervals.
         check0 = np.log(intervals[:, :-1])
         check1 = np.log(intervals[:, 1:])
-        numerator = np.zeros((off.size, maxint), dtype=np.complex128)
-        denominator = np.zeros((off.size, maxint), dtype=np.complex128)
+        numerator = np.zeros((off.size, maxint), dtype=dtype)
+        denominator = np.zeros((off.size, maxint), dtype=dtype)
 
         if k_used[0]:
-            numerator += sPJ0r(check0) + 1j*sPJ0i(check0)
-            denominator += sPJ0r(check1) + 1j*sPJ0i(check1)
+            numerator += _eval_spline(sPJ0r, sPJ0i, check0)
+            denominator += _eval_spline(sPJ0r, sPJ0i, check1)
 
         if k_used[1]:
-            numerator += sPJ1r(check0) + 1j*sPJ1i(check0)
-            denominator += sPJ1r(check1) + 1j*sPJ1i(check1)
+            numerator += _eval_spline(sPJ1r, sPJ1i, check0)
+            denominator += _eval_spline(sPJ1r, sPJ1i, check1)
 
         if k_used[2]:
-            numerator += sPJ0br(check0) + 1j*sPJ0bi(check0)
-            denominator += sPJ0br(check1) + 1j*sPJ0bi(check1)
+            numerator += _eval_spline(sPJ0br, sPJ0bi, check0)
+            denominator += _eval_spline(sPJ0br, sPJ0bi, check1)
 
         doqwe = np.all((np.abs(numerator)/np.abs(denominator) < diff_quad), 1)
 
         # Pre-allocate output array
-        fEM = np.zeros(off.size, dtype=np.complex128)
+        fEM = np.zeros(off.size, dtype=dtype)
         conv = True
 
         # Carry out SciPy's Quad if required
         if np.any(~doqwe):
 
-            # Loop over offsets that require Quad
-            for i in np.where(~doqwe)[0]:
+            # Offsets that require Quad
+            iquad = np.where(~doqwe)[0]
 
-                # Input-dictionary for quad
-                iinp = {'a': a[i], 'b': b[i], 'epsabs': atol, 'epsrel': rtol,
-                        'limit': limit}
+            # Input-dictionaries for quad
+            iinp = [{'a': a[i], 'b': b[i], 'epsabs': atol, 'epsrel': rtol,
+                     'limit': limit} for i in iquad]
 
-                fEM[i], tc = quad(sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi,
-                                  ab, off[i], ang_fact[i], iinp)
+            # Carry out quad for each offset, possibly in parallel
+            splines = (sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi)
+            fEM[iquad], tc = _quad_offsets(splines, ab, off[iquad],
+                                           ang_fact[iquad], iinp,
+                                           htarg.get('workers', 1))
 
-                # Update conv
-                conv *= tc
+            # Update conv
+            conv *= tc
 
             # Return kcount=1 in case no QWE is calculated
             kcount = 1
@@ -354,14 +386,14 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
         if np.any(doqwe):
             # Get EM-field at required offsets
             if k_used[0]:
-                sPJ0 = sPJ0r(np.log(lambd)) + 1j*sPJ0i(np.log(lambd))
+                sPJ0 = _eval_spline(sPJ0r, sPJ0i, np.log(lambd))
             if k_used[1]:
-                sPJ1 = sPJ1r(np.log(lambd)) + 1j*sPJ1i(np.log(lambd))
+                sPJ1 = _eval_spline(sPJ1r, sPJ1i, np.log(lambd))
             if k_used[2]:
-                sPJ0b = sPJ0br(np.log(lambd)) + 1j*sPJ0bi(np.log(lambd))
+                sPJ0b = _eval_spline(sPJ0br, sPJ0bi, np.log(lambd))
 
             # Carry out and return the Hankel transform for this interval
-            sEM = np.zeros_like(numerator, dtype=np.complex128)
+            sEM = np.zeros_like(numerator, dtype=dtype)
             if k_used[1]:
                 sEM += np.sum(np.reshape(sPJ1*BJ1, (off.size, nquad, -1),
                               order='F'), 1)
@@ -392,14 +424,16 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
             iB = i*nquad + np.arange(nquad)
 
             # PJ0 and PJ1 for this interval
-            PJ0, PJ1, PJ0b = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth,
-                                               etaH[None, :], etaV[None, :],
-                                               zetaH[None, :], zetaV[None, :],
-                                               np.atleast_2d(inplambd)[:, iB],
-                                               ab, xdirect, msrc, mrec)
+            with span('kernel.wavenumber', nfreq=1, nlambda=nquad,
+                      nlayer=depth.size):
+                PJ0, PJ1, PJ0b = kernel.wavenumber(
+                        zsrc, zrec, lsrc, lrec, depth, etaH[None, :],
+                        etaV[None, :], zetaH[None, :], zetaV[None, :],
+                        np.atleast_2d(inplambd)[:, iB], ab, xdirect, msrc,
+                        mrec)
 
             # Carry out and return the Hankel transform for this interval
-            gEM = np.zeros_like(inpoff, dtype=np.complex128)
+            gEM = np.zeros_like(inpoff, dtype=dtype)
             if k_used[1]:
                 gEM += inpfang*np.dot(PJ1[0, :], BJ1[iB])
                 if ab in [11, 12, 21, 22, 14, 24, 15, 25]:  # Because of J2
@@ -419,6 +453,7 @@ def hankel_qwe(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
     return fEM, kcount, conv
 
 
+@traced('transform.hankel_quad')
 def hankel_quad(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
                 zetaH, zetaV, xdirect, htarg, msrc, mrec):
     r"""Hankel Transform using the `QUADPACK` library.
@@ -455,56 +490,145 @@ def hankel_quad(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
     ilambd = np.logspace(la, lb, int((lb-la)*htarg['pts_per_dec'] + 1))
 
     # Call the kernel
-    PJ0, PJ1, PJ0b = kernel.wavenumber(zsrc, zrec, lsrc, lrec, depth, etaH,
-                                       etaV, zetaH, zetaV,
-                                       np.atleast_2d(ilambd), ab, xdirect,
-                                       msrc, mrec)
+    with span('kernel.wavenumber', nfreq=etaH.shape[0], nlambda=ilambd.size,
+              nlayer=depth.size):
+        PJ0, PJ1, PJ0b = kernel.wavenumber(
+                zsrc, zrec, lsrc, lrec, depth, etaH, etaV, zetaH, zetaV,
+                np.atleast_2d(ilambd), ab, xdirect, msrc, mrec)
 
     # Interpolation in wavenumber domain: Has to be done separately on each PJ,
     # in order to work with multiple offsets which have different angles.
     # We check if the kernels are zero, to avoid unnecessary calculations.
-    if PJ0 is not None:
-        sPJ0r = iuSpline(np.log(ilambd), PJ0.real)
-        sPJ0i = iuSpline(np.log(ilambd), PJ0.imag)
-    else:
-        sPJ0r = None
-        sPJ0i = None
-
-    if PJ1 is not None:
-        sPJ1r = iuSpline(np.log(ilambd), PJ1.real)
-        sPJ1i = iuSpline(np.log(ilambd), PJ1.imag)
-    else:
-        sPJ1r = None
-        sPJ1i = None
+    sPJ0r, sPJ0i = _spline_kernel(ilambd, PJ0)
+    sPJ1r, sPJ1i = _spline_kernel(ilambd, PJ1)
+    sPJ0br, sPJ0bi = _spline_kernel(ilambd, PJ0b)
 
-    if PJ0b is not None:
-        sPJ0br = iuSpline(np.log(ilambd), PJ0b.real)
-        sPJ0bi = iuSpline(np.log(ilambd), PJ0b.imag)
-    else:
-        sPJ0br = None
-        sPJ0bi = None
-
-    # Pre-allocate output array
-    fEM = np.zeros(off.size, dtype=np.complex128)
+    # Pre-allocate output array (real-valued in the Laplace domain)
+    fEM = np.zeros(off.size, dtype=np.result_type(etaH, zetaH))
     conv = True
 
     # Input-dictionary for quad
     iinp = {'a': htarg['a'], 'b': htarg['b'], 'epsabs': htarg['atol'],
             'epsrel': htarg['rtol'], 'limit': htarg['limit']}
 
-    # Loop over offsets
-    for i in range(off.size):
-        fEM[i], tc = quad(sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi, ab,
-                          off[i], ang_fact[i], iinp)
-        conv *= tc
+    # Carry out quad for each offset, possibly in parallel
+    splines = (sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi)
+    fEM[:], conv = _quad_offsets(splines, ab, off, ang_fact,
+                                 [iinp.copy() for _ in range(off.size)],
+                                 htarg.get('workers', 1))
 
     # Return the electromagnetic field
     # Second argument (1) is the kernel count, last argument is only for QWE.
     return fEM, 1, conv
 
 
+def get_dlf_auto(zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
+                 zetaH, zetaV, xdirect, htarg, msrc, mrec):
+    r"""Select the Hankel DLF filter and type for a given tolerance.
+
+    Used by :func:`empymod.model.fem` if ``htarg['dlf']='auto'``. It selects
+    the cheapest combination of filter and DLF type (standard, lagged
+    convolution, or splined) which reproduces a reference within the
+    tolerance ``|fEM - ref| <= rtol*|ref| + atol``:
+
+    1. The candidate filters are taken from a precomputed table of the typical
+       accuracy of the Hankel filters (filters whose typical relative error is
+       bigger than ten times `rtol` are discarded).
+    2. The actual kernel is probed at the minimum, a central, and the maximum
+       offset; the reference is the standard DLF with the longest, most
+       accurate filter ``key_401_2009``. The shortest filter meeting the
+       tolerance with the standard DLF is selected.
+    3. For the selected filter, the DLF types are sorted by their number of
+       required wavenumbers, and the first one meeting the tolerance at the
+       probed offsets is selected. The lagged convolution and splined DLF
+       depend only on the minimum and maximum offsets, so the probe is
+       representative for the actual computation.
+
+    If `htarg` contains a `pts_per_dec` (not None), only the filter is
+    selected. If no filter meets the tolerance, the reference filter is used.
+
+    :func:`empymod.model.fem` calls this function only once, for its first
+    call, and stores the selection in `htarg`. In
+    :func:`empymod.model.bipole` (and the other modelling routines) the
+    selection is therefore based on the offsets and depths of the first
+    source-receiver depth combination, and used for all others.
+
+    The input parameters are the same as for :func:`hankel_dlf`, where `htarg`
+    contains `rtol`, `atol`, and `pts_per_dec`.
+
+    Returns
+    -------
+    filt : DigitalFilter
+        Selected filter.
+
+    pts_per_dec : float
+        Selected DLF type (points per decade).
+
+    """
+    rtol = htarg['rtol']
+    atol = htarg['atol']
+
+    # Probe offsets: minimum, central (geometric mean), and maximum offset.
+    if off.size > 3:
+        ioff = np.argmin(np.abs(np.log(off/np.sqrt(off.min()*off.max()))))
+        ioff = np.unique([np.argmin(off), ioff, np.argmax(off)])
+    else:
+        ioff = np.arange(off.size)
+    poff = off[ioff]
+    pang = ang_fact[ioff]
+
+    def probe(filt, pts_per_dec):
+        r"""Return DLF result at probe offsets for `filt` and `pts_per_dec`."""
+        targ = {'dlf': filt, 'pts_per_dec': pts_per_dec}
+        out = np.zeros((etaH.shape[0], poff.size), dtype=etaH.dtype)
+        for i in range(etaH.shape[0]):  # Lagged/splined requires freq-loop
+            out[i, :] = hankel_dlf(
+                    zsrc, zrec, lsrc, lrec, poff, pang, depth, ab,
+                    etaH[None, i, :], etaV[None, i, :], zetaH[None, i, :],
+                    zetaV[None, i, :], xdirect, targ, msrc, mrec)[0]
+        return out
+
+    # Reference solution.
+    ref_filt = filters.Hankel().key_401_2009
+    ref = probe(ref_filt, 0)
+    tol = rtol*np.abs(ref) + atol
+
+    # Candidate filters from the accuracy table, sorted by length.
+    candidates = []
+    for name, error in _HANKEL_ACCURACY.items():
+        filt = getattr(filters.Hankel(), name)
+        if error <= 10*rtol and filt.base.size < ref_filt.base.size:
+            candidates.append(filt)
+
+    # 1. Shortest filter meeting the tolerance with the standard DLF.
+    filt = ref_filt
+    for cfilt in candidates:
+        if np.all(np.abs(probe(cfilt, 0) - ref) <= tol):
+            filt = cfilt
+            break
+
+    # Return if the DLF type was provided.
+    if htarg['pts_per_dec'] is not None:
+        return filt, htarg['pts_per_dec']
+
+    # 2. Cheapest DLF type meeting the tolerance, by number of wavenumbers.
+    variants = []
+    for pts_per_dec in [-1.0, ] + _AUTO_PTS_PER_DEC:
+        nlambd = get_dlf_points(filt, off, pts_per_dec)[0].size
+        if nlambd < off.size*filt.base.size:
+            variants.append((nlambd, pts_per_dec))
+
+    for _, pts_per_dec in sorted(variants):
+        if np.all(np.abs(probe(filt, pts_per_dec) - ref) <= tol):
+            return filt, pts_per_dec
+
+    # Standard DLF.
+    return filt, 0.0
+
+
 # 2. Fourier transforms (frequency -> time)
 
+@traced('transform.fourier_dlf')
 def fourier_dlf(fEM, time, freq, ftarg):
     r"""Fourier Transform using the Digital Linear Filter method.
 
@@ -532,15 +656,19 @@ def fourier_dlf(fEM, time, freq, ftarg):
     if ftarg['pts_per_dec'] == 0:
         fEM = fEM.reshape(time.size, -1)
 
+    # Get (cached) plan; the frequencies were computed from it in check_time
+    plan = get_dlf_plan(ftarg['dlf'], time, ftarg['pts_per_dec'])
+
     # Carry out DLF
     tEM = dlf(fEM, 2*np.pi*freq, time, ftarg['dlf'], ftarg['pts_per_dec'],
-              kind=ftarg['kind'])
+              kind=ftarg['kind'], plan=plan)
 
     # Return the electromagnetic time domain field
     # (Second argument is only for QWE)
     return tEM, True
 
 
+@traced('transform.fourier_qwe')
 def fourier_qwe(fEM, time, freq, ftarg):
     r"""Fourier Transform using Quadrature-With-Extrapolation.
 
@@ -653,6 +781,7 @@ def fourier_qwe(fEM, time, freq, ftarg):
     return tEM, conv
 
 
+@traced('transform.fourier_fftlog')
 def fourier_fftlog(fEM, time, freq, ftarg):
     r"""Fourier Transform using FFTLog.
 
@@ -796,6 +925,7 @@ def fourier_fftlog(fEM, time, freq, ftarg):
     return tEM, True
 
 
+@traced('transform.fourier_fft')
 def fourier_fft(fEM, time, freq, ftarg):
     r"""Fourier Transform using the Fast Fourier Transform.
 
@@ -844,8 +974,9 @@ def fourier_fft(fEM, time, freq, ftarg):
 
 # 3. Utilities
 
+@traced('transform.dlf')
 def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
-        ab=None, int_pts=None):
+        ab=None, int_pts=None, plan=None):
     r"""Digital Linear Filter method.
 
     This is the kernel of the DLF method, used for the Hankel
@@ -867,6 +998,10 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
     The Fourier DLF requires one additional parameter, `kind`, which will be
     'cos' or 'sin'.
 
+    If a :class:`DLFPlan` is provided through `plan` (which must correspond to
+    `filt`, `out_pts`, and `pts_per_dec`), its interpolation points and
+    operators are used instead of computing them on the fly.
+
     """
     # 0. HANKEL/FOURIER-DEPENDING SETTINGS
     if isinstance(signal, tuple):
@@ -921,11 +1056,20 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
     # Interpolation function
     def spline(values, points, int_pts):
         r"""Return `values` at `points` interpolated in log at `int_pts`."""
+        if plan is not None:  # Pre-computed interpolation operator
+            return plan.interpolate(values)
         out = iuSpline(np.log(points), values.real)(np.log(int_pts))
         if values.dtype == np.complex128:
             out = out+1j*iuSpline(np.log(points), values.imag)(np.log(int_pts))
         return out
 
+    # Get interpolation points from plan, if provided
+    if plan is not None:
+        int_pts = plan.int_pts
+
+    # Function to apply the filter (dot product, except for lagged DLF)
+    apply_dlf = np.dot
+
     # Re-arranging and interpolation before DLF
     if pts_per_dec < 0:  # Lagged Convolution DLF: interp. in output domain
         # Lagged Convolution DLF: re-arrange signal
@@ -934,13 +1078,15 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
         if int_pts is None:
             _, int_pts = get_dlf_points(filt, out_pts, pts_per_dec)
 
-        # Re-arrange signal
+        # Flatten signal; the DLF is carried out as a 1D convolution
         for i, val in enumerate(signal):
             if k_used[i]:  # Only if kernel contains info
-                tmp_sig = np.concatenate((np.tile(val, int_pts.size).squeeze(),
-                                         np.zeros(int_pts.size)))
-                signal[i] = tmp_sig.reshape(int_pts.size, -1)[:,
-                                                              :filt.base.size]
+                signal[i] = val.ravel()
+
+        # Lagged convolution instead of the dot product of the standard DLF
+        def apply_dlf(values, coeff):
+            r"""Return lagged convolution of `values` with filter `coeff`."""
+            return _lagged_convolve(values, coeff, int_pts.size)
 
     elif pts_per_dec > 0:  # Splined DLF: interpolate in input domain
         # Splined DLF; interpolate in input domain
@@ -959,8 +1105,11 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
 
         # If Kernel is all zeroes we just put zeroes instead of carrying out
         # the DLF
-        alt_pre = np.zeros(signal[inp_index].shape[:-1],
-                           dtype=signal[inp_index].dtype)
+        if pts_per_dec < 0:
+            out_shape = int_pts.shape
+        else:
+            out_shape = signal[inp_index].shape[:-1]
+        alt_pre = np.zeros(out_shape, dtype=signal[inp_index].dtype)
 
         if pts_per_dec != 0 and not one_angle:
             # Varying angle with either lagged or splined DLF.
@@ -972,10 +1121,10 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
 
             # Do transform for the used kernels
             if k_used[0]:  # J0
-                np.dot(inp_PJ0, filt.j0, out=out_noang)
+                out_noang[...] = apply_dlf(inp_PJ0, filt.j0)
 
             if k_used[1]:  # J1
-                np.dot(inp_PJ1, filt.j1, out=out_angle)
+                out_angle[...] = apply_dlf(inp_PJ1, filt.j1)
                 if ab in [11, 12, 21, 22, 14, 24, 15, 25]:  # Because of J2
                     # J2(kr) = 2/(kr)*J1(kr) - J0(kr)
                     if pts_per_dec < 0:  # Lagged Convolution
@@ -984,7 +1133,7 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
                         out_angle /= out_pts
 
             if k_used[2]:  # J0b
-                out_angle += np.dot(inp_PJ0b, filt.j0)
+                out_angle += apply_dlf(inp_PJ0b, filt.j0)
 
             if pts_per_dec > 0:
                 # If splined we can add them here, as the interpolation
@@ -1002,7 +1151,7 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
 
             # Do transform for the used kernels
             if k_used[1]:  # J1
-                np.dot(inp_PJ1, filt.j1, out=out_signal)
+                out_signal[...] = apply_dlf(inp_PJ1, filt.j1)
                 if ab in [11, 12, 21, 22, 14, 24, 15, 25]:  # Because of J2
                     # J2(kr) = 2/(kr)*J1(kr) - J0(kr)
                     if pts_per_dec < 0:  # Lagged Convolution
@@ -1011,41 +1160,61 @@ def dlf(signal, points, out_pts, filt, pts_per_dec, kind=None, ang_fact=None,
                         out_signal /= out_pts
 
             if k_used[2]:  # J0b
-                out_signal += np.dot(inp_PJ0b, filt.j0)
+                out_signal += apply_dlf(inp_PJ0b, filt.j0)
 
             # Angle dependency
             if has_angle_factors:
                 out_signal *= ang_fact
 
             if k_used[0]:  # J0
-                out_signal += np.dot(inp_PJ0, filt.j0)
+                out_signal += apply_dlf(inp_PJ0, filt.j0)
 
     else:  # Fourier transform
-        out_signal = np.dot(signal[0], getattr(filt, kind))
+        out_signal = apply_dlf(signal[0], getattr(filt, kind))
 
     # 3. IF LAGGED CONVOLUTION, INTERPOLATE NOW TO OUTPUT DOMAIN POINTS
     if pts_per_dec < 0:
+        with span('transform.spline', nin=np.size(int_pts),
+                  nout=np.size(out_pts)):
+            if not one_angle:  # Separately on out_noang and out_angle
 
-        if not one_angle:  # Separately on out_noang and out_angle
-
-            # J1 or J2 are always used except for ab=33; however ab=33 is
-            # angle-independent, so we don't have to check here.
-            out_signal = spline(out_angle[::-1], int_pts[::-1], out_pts)
+                # J1 or J2 are always used except for ab=33; however ab=33 is
+                # angle-independent, so we don't have to check here.
+                out_signal = spline(out_angle[::-1], int_pts[::-1], out_pts)
 
-            # Angle dependency
-            if has_angle_factors:
-                out_signal *= ang_fact
+                # Angle dependency
+                if has_angle_factors:
+                    out_signal *= ang_fact
 
-            if k_used[0]:  # Only if kernel contains info
-                out_signal += spline(out_noang[::-1], int_pts[::-1], out_pts)
+                if k_used[0]:  # Only if kernel contains info
+                    out_signal += spline(
+                            out_noang[::-1], int_pts[::-1], out_pts)
 
-        else:  # If only one angle or Fourier
-            out_signal = spline(out_signal[::-1], int_pts[::-1], out_pts)
+            else:  # If only one angle or Fourier
+                out_signal = spline(out_signal[::-1], int_pts[::-1], out_pts)
 
     # Return the signal in the output domain
     return out_signal/out_pts
 
 
+def _lagged_convolve(values, coeff, nout):
+    r"""Lagged convolution of `values` with the filter `coeff`.
+
+    Returns ``out[k] = sum_j values[k+j]*coeff[j]`` for ``k < nout``, which is
+    the DLF for all lagged output points at once. It is carried out as a 1D
+    convolution, either directly (short filters) or FFT-based (long filters).
+
+    """
+    # Rough estimate if the direct or the FFT-based convolution is faster.
+    nval = values.size
+    if nout*coeff.size > 50*nval*np.log2(nval):
+        out = sp.signal.fftconvolve(values, coeff[::-1], mode='valid')
+    else:
+        out = np.convolve(values, coeff[::-1], mode='valid')
+
+    return out[:nout]
+
+
 def qwe(rtol, atol, maxint, inp, intervals, lambd=None, off=None,
         ang_fact=None):
     r"""Quadrature-With-Extrapolation.
@@ -1140,6 +1309,9 @@ def quad(sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi, ab, off, ang_fact, iinp):
     :func:`hankel_quad` and :func:`hankel_qwe` (where the integral is not
     suited for QWE).
 
+    The splines of the imaginary parts are None for real-valued kernels
+    (Laplace domain), in which case only the real parts are integrated.
+
     """
     # Define the quadrature kernels
     def quad_PJ0(klambd, sPJ0, koff):
@@ -1162,39 +1334,117 @@ def quad(sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi, ab, off, ang_fact, iinp):
 
     # Pre-allocate output
     conv = True
-    out = np.array(0.0+0.0j)
+    out = 0.0
 
-    # Carry out quadrature for required kernels
+    # Carry out quadrature for required kernels; the imaginary splines are
+    # None for real-valued (Laplace-domain) kernels.
     iinp['full_output'] = 1
 
-    if sPJ0r is not None:
-        re = sp.integrate.quad(quad_PJ0, args=(sPJ0r, off), **iinp)
-        im = sp.integrate.quad(quad_PJ0, args=(sPJ0i, off), **iinp)
-        out += re[0] + 1j*im[0]
-        # If there is a fourth output from QUAD, it means it did not converge
-        if (len(re) or len(im)) > 3:
-            conv = False
-
-    if sPJ1r is not None:
-        re = sp.integrate.quad(
-                quad_PJ1, args=(sPJ1r, ab, off, ang_fact), **iinp)
-        im = sp.integrate.quad(
-                quad_PJ1, args=(sPJ1i, ab, off, ang_fact), **iinp)
-        out += re[0] + 1j*im[0]
-        # If there is a fourth output from QUAD, it means it did not converge
-        if (len(re) or len(im)) > 3:
-            conv = False
-
-    if sPJ0br is not None:
-        re = sp.integrate.quad(quad_PJ0b, args=(sPJ0br, off, ang_fact), **iinp)
-        im = sp.integrate.quad(quad_PJ0b, args=(sPJ0bi, off, ang_fact), **iinp)
-        out += re[0] + 1j*im[0]
-        # If there is a fourth output from QUAD, it means it did not converge
-        if (len(re) or len(im)) > 3:
-            conv = False
+    for func, sr, si, args in [
+            (quad_PJ0, sPJ0r, sPJ0i, (off, )),
+            (quad_PJ1, sPJ1r, sPJ1i, (ab, off, ang_fact)),
+            (quad_PJ0b, sPJ0br, sPJ0bi, (off, ang_fact))]:
+        if sr is not None:
+            re = sp.integrate.quad(func, args=(sr, *args), **iinp)
+            out += re[0]
+            if si is not None:
+                im = sp.integrate.quad(func, args=(si, *args), **iinp)
+                out += 1j*im[0]
+            # If there is a fourth output from QUAD, it did not converge
+            if len(re) > 3:
+                conv = False
 
     # Collect the results
-    return out, conv
+    return np.array(out), conv
+
+
+def _quad_offsets(splines, ab, off, ang_fact, iinp, workers=1):
+    r"""Carry out :func:`quad` for each offset, serially or in parallel.
+
+    The integrations of the different offsets are independent of each other,
+    and can therefore be distributed over a pool of workers.
+
+    Parameters
+    ----------
+    splines : tuple
+        Splines (sPJ0r, sPJ0i, sPJ1r, sPJ1i, sPJ0br, sPJ0bi); see :func:`quad`.
+
+    ab : int
+        Source-receiver configuration.
+
+    off, ang_fact : ndarray
+        Offsets and corresponding angle factors.
+
+    iinp : list of dict
+        Input-dictionary for :func:`scipy.integrate.quad`, one per offset.
+
+    workers : int or map-like callable, default: 1
+        If 1, the offsets are integrated serially. If an integer > 1, they are
+        distributed over a thread pool with `workers` threads (-1 uses all
+        available CPUs). Alternatively, a map-like callable, e.g.,
+        ``multiprocessing.Pool(n).map``, which is called as
+        ``workers(func, iterable)``.
+
+
+    Returns
+    -------
+    fEM : ndarray
+        Result for each offset.
+
+    conv : bool
+        If true, QUAD converged for all offsets.
+
+    """
+    # Function for one offset (a partial, so it can be pickled)
+    fquad = partial(_quad_single, splines=splines, ab=ab)
+    inp = list(zip(off, ang_fact, iinp))
+
+    # Carry out quad with the requested workers
+    if callable(workers):
+        out = list(workers(fquad, inp))
+    else:
+        nworkers = os.cpu_count() if workers < 0 else int(workers)
+        if nworkers > 1 and len(inp) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=nworkers) as executor:
+                out = list(executor.map(fquad, inp))
+        else:
+            out = list(map(fquad, inp))
+
+    # Collect the results (real-valued if all splines are real)
+    fEM = np.array([o[0] for o in out])
+    conv = all(o[1] for o in out)
+
+    return fEM, conv
+
+
+def _spline_kernel(lambd, PJ):
+    r"""Return splines (real, imag) of kernel `PJ` in log(lambd).
+
+    Returns (None, None) if the kernel is None, and an imaginary spline of None
+    if the kernel is real-valued (Laplace domain).
+
+    """
+    if PJ is None:
+        return None, None
+    sPJr = iuSpline(np.log(lambd), PJ.real)
+    if np.iscomplexobj(PJ):
+        sPJi = iuSpline(np.log(lambd), PJ.imag)
+    else:
+        sPJi = None
+    return sPJr, sPJi
+
+
+def _eval_spline(sPJr, sPJi, x):
+    r"""Evaluate splines (real, imag) of a kernel at `x`."""
+    if sPJi is None:
+        return sPJr(x)
+    return sPJr(x) + 1j*sPJi(x)
+
+
+def _quad_single(inp, splines, ab):
+    r"""Carry out :func:`quad` for one (offset, ang_fact, iinp)-tuple."""
+    return quad(*splines, ab, *inp)
 
 
 def get_dlf_points(filt, inp, nr_per_dec):
@@ -1257,6 +1507,138 @@ def get_dlf_points(filt, inp, nr_per_dec):
     return np.atleast_2d(out), new_inp
 
 
+class DLFPlan:
+    r"""Evaluation plan for the DLF.
+
+    A plan contains everything that depends only on the filter, the
+    input points (offsets or times), and `pts_per_dec`, but not on the signal:
+    the required computation points, the interpolation points, and, for the
+    splined and the lagged convolution DLF, the cubic spline interpolation as
+    linear operators. Repeated transforms with the same filter and input
+    points (e.g., in inversions) can therefore reuse the plan, and the
+    interpolations become matrix products.
+
+    Plans are usually obtained through :func:`get_dlf_plan`, which caches them.
+
+
+    Parameters
+    ----------
+    filt : DigitalFilter
+        Filter to use; see :class:`empymod.filters.DigitalFilter`.
+
+    inp : ndarray
+        Input points: offsets for the Hankel and times for the Fourier DLF.
+
+    pts_per_dec : float
+        Points per decade: 0 (standard), < 0 (lagged), or > 0 (splined).
+
+
+    Attributes
+    ----------
+    points : ndarray
+        Required computation points (wavenumbers or angular frequencies);
+        first output of :func:`get_dlf_points`.
+
+    int_pts : ndarray
+        Interpolation points; second output of :func:`get_dlf_points`.
+
+    """
+
+    def __init__(self, filt, inp, pts_per_dec):
+        """Initiate a new DLF plan."""
+
+        self.filt = filt
+        self.inp = inp
+        self.pts_per_dec = pts_per_dec
+
+        # Computation and interpolation points
+        self.points, self.int_pts = get_dlf_points(filt, inp, pts_per_dec)
+
+        # Interpolation operators
+        if pts_per_dec > 0:  # Splined: in input domain
+            self._operator = _spline_operator(
+                    np.log(self.points.ravel()), np.log(self.int_pts))
+        elif pts_per_dec < 0:  # Lagged convolution: in output domain
+            self._operator = _spline_operator(
+                    np.log(self.int_pts[::-1]), np.log(inp))
+        else:
+            self._operator = None
+
+    def __repr__(self):
+        """Simple representation."""
+        return (f"{self.__class__.__name__}: {self.filt.name}; "
+                f"{self.inp.size} input points; "
+                f"pts_per_dec={self.pts_per_dec}")
+
+    def interpolate(self, values):
+        r"""Interpolate `values` with the cubic spline operator of the plan.
+
+        - Splined DLF: `values` at `points` are interpolated to `int_pts`.
+        - Lagged DLF: `values` at ``int_pts[::-1]`` (ascending) are
+          interpolated to `inp`.
+
+        """
+        coeff, design, shape = self._operator
+        return (design @ (coeff @ values.ravel())).reshape(shape)
+
+
+def get_dlf_plan(filt, inp, pts_per_dec):
+    r"""Return a (cached) DLF plan.
+
+    Plans are cached with a least-recently-used strategy; the key consists of
+    the filter name and base, the input points, and `pts_per_dec`. The cache
+    is thread-safe.
+
+
+    Parameters
+    ----------
+    filt, inp, pts_per_dec
+        See :class:`DLFPlan`.
+
+
+    Returns
+    -------
+    plan : DLFPlan
+        DLF plan.
+
+    """
+    inp = np.asarray(inp, dtype=np.float64)
+    key = (filt.name, filt.base.tobytes(), inp.shape, inp.tobytes(),
+           float(pts_per_dec))
+
+    # Return the plan if cached (and mark it as most recently used)
+    with _DLF_PLANS_LOCK:
+        if key in _DLF_PLANS:
+            _DLF_PLANS.move_to_end(key)
+            return _DLF_PLANS[key]
+
+    # Create the plan (outside of the lock, as it can be expensive)
+    plan = DLFPlan(filt, inp, pts_per_dec)
+
+    # Cache it; drop the least recently used one if full
+    with _DLF_PLANS_LOCK:
+        _DLF_PLANS[key] = plan
+        if len(_DLF_PLANS) > _DLF_PLANS_MAXSIZE:
+            _DLF_PLANS.popitem(last=False)
+
+    return plan
+
+
+def _spline_operator(x, xi):
+    r"""Cubic-spline interpolation from `x` to `xi` as linear operator.
+
+    Returns the (dense) operator to obtain the B-spline coefficients of the
+    not-a-knot cubic spline (as :class:`InterpolatedUnivariateSpline`) from
+    values at `x`, and the sparse B-spline design matrix at `xi`, such that
+    ``design @ (coeff @ y)`` is the spline of `y` evaluated at `xi`.
+
+    """
+    spl = sp.interpolate.make_interp_spline(x, np.eye(x.size), k=3)
+    design = sp.interpolate.BSpline.design_matrix(
+            xi.ravel(), spl.t, 3, extrapolate=True)
+    return spl.c, design, xi.shape
+
+
 def get_fftlog_input(rmin, rmax, n, q, mu):
     r"""Return parameters required for FFTLog."""
     # Central point log10(r_c) of periodic interval
@@ -1287,3 +1669,261 @@ def get_fftlog_input(rmin, rmax, n, q, mu):
     rk = 10**(logrc - logkc)*np.pi/2
 
     return freq, tcalc, dlnr, kr, rk
+
+
+def get_waveform_operator(time, wtime, wcurrent, nquad=3):
+    r"""Return times and operator to convolve step responses with a waveform.
+
+    The response to a piecewise-linear source waveform :math:`I(t)`, given by
+    the current `wcurrent` at times `wtime`, is the convolution of the
+    switch-on (step) response :math:`h(t)` with the time derivative of the
+    waveform,
+
+    .. math::
+
+        e(t) = I_0\ h(t-t_0) + \sum_i \frac{\Delta I_i}{\Delta t_i}
+               \int_{t_i}^{\min(t, t_{i+1})} h(t-\tau)\ \mathrm{d}\tau \ ,
+
+    where the first term accounts for a jump of the current at the first
+    waveform time :math:`t_0`. The integrals are carried out with
+    Gauss-Legendre quadrature of order `nquad`, which results in a linear
+    operator mapping the step response at the quadrature times to the wanted
+    times.
+
+    Parameters
+    ----------
+    time : ndarray
+        Wanted times (s).
+
+    wtime, wcurrent : ndarray
+        Times (s) and current (A) defining the waveform; the current is zero
+        before the first and constant after the last time.
+
+    nquad : int, default: 3
+        Order of the Gauss-Legendre quadrature per waveform segment.
+
+
+    Returns
+    -------
+    qtime : ndarray
+        Times at which the switch-on response has to be computed.
+
+    operator : ndarray, (time.size, qtime.size)
+        Operator; ``operator @ h(qtime)`` yields the response at `time`.
+
+    """
+    g_x, g_w = sp.special.roots_legendre(nquad)
+
+    # Collect rows (wanted times), quadrature times, and weights
+    rows, qtime, weights = [], [], []
+
+    # Jump of the current at the first waveform time
+    if wcurrent[0] != 0:
+        ind = np.where(time > wtime[0])[0]
+        rows.append(ind)
+        qtime.append(time[ind] - wtime[0])
+        weights.append(np.full(ind.size, wcurrent[0], dtype=float))
+
+    # Linear segments with a change of current
+    slope = np.diff(wcurrent)/np.diff(wtime)
+    for i in np.where(slope != 0)[0]:
+
+        # Only times after the start of the segment are affected; segments
+        # which are not finished at a wanted time are cut.
+        ind = np.where(time > wtime[i])[0]
+        ta = time[ind] - wtime[i]
+        tb = np.clip(time[ind] - wtime[i+1], 0, None)
+
+        # Gauss-Legendre with change of interval from [-1, 1] to [tb, ta]
+        half = (ta - tb)[:, None]/2
+        rows.append(np.repeat(ind, nquad))
+        qtime.append(((ta + tb)[:, None]/2 + half*g_x).ravel())
+        weights.append((slope[i]*half*g_w).ravel())
+
+    # Unique quadrature times and operator
+    rows = np.concatenate(rows).astype(int)
+    qtime, inv = np.unique(np.concatenate(qtime), return_inverse=True)
+    operator = np.zeros((time.size, qtime.size))
+    np.add.at(operator, (rows, inv.ravel()), np.concatenate(weights))
+
+    return qtime, operator
+
+
+def get_gate_operator(gates, nquad=5):
+    r"""Return times and operator to compute gate averages.
+
+    The average of a response :math:`e(t)` over the gate
+    :math:`[t_a, t_b]`,
+
+    .. math::
+
+        \bar{e} = \frac{1}{t_b - t_a} \int_{t_a}^{t_b} e(t)\ \mathrm{d}t
+                = \frac{1}{t_b - t_a} \int_{\ln t_a}^{\ln t_b} e(t)\ t\
+                  \mathrm{d}\ln t \ ,
+
+    is computed with Gauss-Legendre quadrature of order `nquad` in
+    logarithmic time, which is well suited for the decaying responses of
+    time-domain systems.
+
+    Parameters
+    ----------
+    gates : ndarray, (ngates, 2)
+        Opening and closing times (s) of the gates.
+
+    nquad : int, default: 5
+        Order of the Gauss-Legendre quadrature per gate.
+
+
+    Returns
+    -------
+    gtime : ndarray
+        Times at which the response has to be computed.
+
+    operator : ndarray, (ngates, gtime.size)
+        Operator; ``operator @ e(gtime)`` yields the gate averages.
+
+    """
+    g_x, g_w = sp.special.roots_legendre(nquad)
+
+    # Gauss-Legendre with change of interval to [ln(t_a), ln(t_b)]
+    loga, logb = np.log(gates[:, :1]), np.log(gates[:, 1:])
+    gtime = np.exp((logb + loga)/2 + (logb - loga)/2*g_x)
+    weights = (logb - loga)/2*g_w*gtime/(gates[:, 1:] - gates[:, :1])
+
+    # Unique times and operator
+    gtime, inv = np.unique(gtime, return_inverse=True)
+    rows = np.repeat(np.arange(gates.shape[0]), nquad)
+    operator = np.zeros((gates.shape[0], gtime.size))
+    np.add.at(operator, (rows, inv.ravel()), weights.ravel())
+
+    return gtime, operator
+
+
+def get_loop_operator(xrec, yrec, radius=None, vertices=None, nquad=16):
+    r"""Return offsets and operator to integrate along a horizontal loop.
+
+    The vertical magnetic field of a finite, horizontal loop can be written as
+    a line integral along the loop (see :func:`empymod.kernel.loop_wavenumber`)
+
+    .. math::
+
+        H_z = \oint \rho\ G(\rho)\ \mathrm{d}\theta \ ,
+
+    where :math:`G(\rho)` is a :math:`J_1` Hankel transform, :math:`\rho` the
+    distance from the receiver to the loop, and :math:`\theta` the angle under
+    which the receiver sees the loop. For circular loops the integral is
+    carried out with the trapezoidal rule in the loop angle (`4*nquad`
+    points), which is exact for periodic functions up to high order; for
+    polygonal loops with Gauss-Legendre quadrature of order `nquad` per edge in
+    :math:`\theta`. For a receiver in the centre of a circular loop all
+    distances are identical, and a single offset remains.
+
+    Parameters
+    ----------
+    xrec, yrec : ndarray
+        Receiver coordinates (m), relative to the loop centre or the origin of
+        the vertices, respectively.
+
+    radius : float, optional
+        Radius (m) of a circular loop.
+
+    vertices : ndarray, (nvertices, 2), optional
+        Vertices (x, y) (m) of a polygonal loop, in either order.
+
+    nquad : int, default: 16
+        Number of quadrature points, see above.
+
+
+    Returns
+    -------
+    off : ndarray
+        Offsets at which :math:`G(\rho)` has to be computed.
+
+    operator : ndarray, (xrec.size, off.size)
+        Operator; ``operator @ G(off)`` yields :math:`H_z` at the receivers.
+
+    """
+    xrec = np.atleast_1d(xrec).astype(float)[:, None]
+    yrec = np.atleast_1d(yrec).astype(float)[:, None]
+
+    if radius is not None:
+        # Trapezoidal rule in the loop angle psi; outward normal is radial.
+        psi = 2*np.pi*np.arange(4*nquad)/(4*nquad)
+        cos, sin = np.cos(psi), np.sin(psi)
+        dx, dy = radius*cos - xrec, radius*sin - yrec
+        rho = np.sqrt(dx**2 + dy**2)
+        weights = radius*2*np.pi/psi.size*(cos*dx + sin*dy)/rho
+
+    else:
+        # Ensure anti-clockwise order, so the normals point outwards.
+        vx, vy = vertices[:, 0], vertices[:, 1]
+        if np.sum(vx*np.roll(vy, -1) - np.roll(vx, -1)*vy) < 0:
+            vx, vy = vx[::-1], vy[::-1]
+
+        # Unit tangents and outward normals of the edges
+        ex, ey = np.roll(vx, -1) - vx, np.roll(vy, -1) - vy
+        length = np.sqrt(ex**2 + ey**2)
+        tx, ty = ex/length, ey/length
+
+        # Signed distance of the receivers to the edges, and position of the
+        # start and end points along the edges, relative to the foot point.
+        dist = ty*(vx - xrec) - tx*(vy - yrec)
+        start = tx*(vx - xrec) + ty*(vy - yrec)
+        adist = np.abs(dist)
+        theta0 = np.arctan2(start, adist)
+        theta1 = np.arctan2(start + length, adist)
+
+        # Gauss-Legendre in theta
+        g_x, g_w = sp.special.roots_legendre(nquad)
+        half = ((theta1 - theta0)/2)[..., None]
+        theta = ((theta1 + theta0)/2)[..., None] + half*g_x
+        rho = adist[..., None]/np.cos(theta)
+        weights = np.sign(dist)[..., None]*half*g_w*rho
+
+        rho = rho.reshape(xrec.size, -1)
+        weights = weights.reshape(xrec.size, -1)
+
+    # Receivers on the line of an edge see it under a zero angle.
+    rows = np.repeat(np.arange(xrec.size), rho.shape[1]).reshape(rho.shape)
+    use = weights != 0
+    rho, rows, weights = rho[use], rows[use], weights[use]
+
+    # Unique offsets (to micrometres) and operator
+    off, inv = np.unique(np.round(rho, 6), return_inverse=True)
+    operator = np.zeros((xrec.size, off.size))
+    np.add.at(operator, (rows, inv.ravel()), weights)
+
+    return off, operator
+
+
+def get_lowpass_response(freq, lowpass):
+    r"""Return the frequency response of a cascade of lowpass filters.
+
+    Parameters
+    ----------
+    freq : ndarray
+        Frequencies (Hz).
+
+    lowpass : list
+        Filters, as checked by :func:`empymod.utils.check_lowpass`; each entry
+        is either a tuple ``(cutoff, order)`` of an analog Butterworth lowpass
+        filter with cut-off frequency `cutoff` (Hz), or a callable returning
+        the complex frequency response for given frequencies.
+
+
+    Returns
+    -------
+    response : ndarray
+        Complex frequency response, of size freq.size.
+
+    """
+    freq = np.ravel(freq)
+    response = np.ones(freq.size, dtype=np.complex128)
+    for filt in lowpass:
+        if callable(filt):
+            response *= np.ravel(filt(freq))
+        else:
+            b, a = sp.signal.butter(filt[1], 2*np.pi*filt[0], analog=True)
+            response *= sp.signal.freqs(b, a, worN=2*np.pi*freq)[1]
+
+    return response
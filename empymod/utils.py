@@ -34,6 +34,7 @@ from datetime import timedelta, datetime
 
 # Relative imports
 from empymod import filters, transform
+from empymod.profiling import traced
 from scooby import Report as ScoobyReport
 
 # Version: We take care of it here instead of in __init__, so we can use it
@@ -51,11 +52,13 @@ except ImportError:
 
 
 __all__ = ['EMArray', 'check_time_only', 'check_time', 'check_model',
-           'check_frequency', 'check_hankel', 'check_loop', 'check_dipole',
-           'check_bipole', 'check_ab', 'check_solution', 'get_abs',
-           'get_geo_fact', 'get_azm_dip', 'get_off_ang', 'get_layer_nr',
-           'printstartfinish', 'conv_warning', 'set_minimum', 'get_minimum',
-           'Report']
+           'check_batch_model', 'check_frequency', 'check_hankel',
+           'check_loop', 'check_dipole', 'check_bipole', 'check_ab',
+           'check_solution', 'check_waveform', 'check_gates', 'check_lowpass',
+           'check_finite_loop', 'check_mt', 'check_dc', 'get_abs',
+           'get_geo_fact', 'get_dc_layout', 'get_azm_dip', 'get_off_ang',
+           'get_batch_off_ang', 'get_layer_nr', 'printstartfinish',
+           'conv_warning', 'set_minimum', 'get_minimum', 'Report']
 
 # 0. General settings
 
@@ -147,6 +150,7 @@ class EMArray(np.ndarray):
 
 # 2.a <Check>s (alphabetically)
 
+@traced('utils.check_ab')
 def check_ab(ab, verb):
     r"""Check source-receiver configuration.
 
@@ -216,6 +220,7 @@ def check_ab(ab, verb):
     return ab_calc, msrc, mrec
 
 
+@traced('utils.check_bipole')
 def check_bipole(inp, name):
     r"""Check di-/bipole parameters.
 
@@ -326,6 +331,7 @@ def check_bipole(inp, name):
     return out, out[0].size, nz, isdipole
 
 
+@traced('utils.check_dipole')
 def check_dipole(inp, name, verb):
     r"""Check dipole parameters.
 
@@ -391,6 +397,7 @@ def check_dipole(inp, name, verb):
     return out, out[0].size
 
 
+@traced('utils.check_frequency')
 def check_frequency(freq, res, aniso, epermH, epermV, mpermH, mpermV, verb):
     r"""Calculate frequency-dependent parameters.
 
@@ -480,6 +487,155 @@ def check_frequency(freq, res, aniso, epermH, epermV, mpermH, mpermV, verb):
     return freq, etaH, etaV, zetaH, zetaV
 
 
+def check_mt(depth, res, freq, epermH, mpermH, verb):
+    r"""Check the model(s) and frequencies for magnetotellurics.
+
+    This check-function is called from :func:`empymod.model.mt`. Consult it
+    for a detailed description of the input parameters.
+
+    Parameters
+    ----------
+    depth : array_like, (nlayer-1) or (nmodel, nlayer-1)
+        Absolute layer interfaces z (m); the first interface is the surface.
+
+    res : array_like, (nlayer) or (nmodel, nlayer)
+        Horizontal resistivities rho_h (Ohm.m).
+
+    freq : array_like
+        Frequencies f (Hz).
+
+    epermH, mpermH : array_like or None
+        Relative horizontal electric permittivities and magnetic
+        permeabilities (-); same shape as `res`, or broadcastable to it.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    thick : array, (nmodel or 1, nlayer-2)
+        Thicknesses of the subsurface layers above the bottom half-space.
+
+    res, epermH, mpermH : array, (nmodel, nlayer-1)
+        Parameters of the subsurface layers (below the first interface). If
+        no interface is provided, the single layer is the full-space.
+
+    freq : array
+        Frequencies, checked for size and assured min_freq.
+
+    """
+    # Check resistivities; (nmodel, nlayer)
+    res = _check_var(res, float, 2, 'res')
+    res = _check_min(res, _min_res, 'Resistivities', 'Ohm.m', verb)
+    nmodel, nlayer = res.shape
+
+    # Check depths; (1 or nmodel, nlayer-1)
+    if depth is None:
+        depth = []
+    depth = _check_var(depth, float, 2, 'depth')
+    if depth.shape[1] != nlayer - 1 or depth.shape[0] not in [1, nmodel]:
+        raise ValueError(f"Parameter depth has wrong shape! : {depth.shape} "
+                         f"instead of (1 or {nmodel}, {nlayer - 1}).")
+
+    # Depth must be continuously increasing or decreasing
+    thick = np.diff(depth, axis=1)
+    if not (np.all(thick > 0) or np.all(thick < 0)):
+        raise ValueError("Depth must be continuously increasing or "
+                         "decreasing.")
+    thick = np.abs(thick)
+
+    # Check optional parameters, default to ones
+    def check_inp(var, name):
+        r"""Param-check function. Default to ones if not provided"""
+        if var is None:
+            return np.ones(res.shape)
+        var = _check_var(var, float, 2, name)
+        try:
+            var = np.broadcast_to(var, res.shape)
+        except ValueError:
+            raise ValueError(f"Parameter {name} has wrong shape! : "
+                             f"{var.shape} instead of {res.shape}.")
+        return _check_min(var.copy(), 0.0, 'Parameter ' + name, '', verb)
+
+    epermH = check_inp(epermH, 'epermH')
+    mpermH = check_inp(mpermH, 'mpermH')
+
+    # Only the layers below the surface (first interface) are relevant.
+    if nlayer > 1:
+        res, epermH, mpermH = res[:, 1:], epermH[:, 1:], mpermH[:, 1:]
+
+    # Check frequency
+    freq = _check_var(freq, float, 1, 'freq')
+    freq = _check_min(freq, _min_freq, 'Frequencies', 'Hz', verb)
+
+    # Print model and frequency information
+    if verb > 2:
+        print(f"   Models          :  {nmodel}")
+        print(f"   Layers          :  {res.shape[1]} (below surface)")
+        _prnt_min_max_val(freq, "   frequency  [Hz] : ", verb)
+
+    return thick, res, epermH, mpermH, freq
+
+
+def check_dc(src, rec, verb):
+    r"""Check the electrodes of DC resistivity measurements.
+
+    This check-function is called from :func:`empymod.model.dc`. Consult it
+    for a detailed description of the input parameters.
+
+    Parameters
+    ----------
+    src, rec : list of floats or arrays
+        Current electrodes A, B and potential electrodes M, N, as
+        ``[x0, x1, y0, y1, z0, z1]`` (m); each coordinate is a float or an
+        array of size nmeas.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    elec : ndarray, (4, 3, nmeas)
+        Coordinates (x, y, z) of the electrodes A, B, M, and N.
+
+    """
+    # Check shape
+    coords = []
+    for name, inp in zip(['src', 'rec'], [src, rec]):
+        if len(inp) != 6:
+            raise ValueError(f"Parameter {name} has wrong length! : "
+                             f"{len(inp)} instead of 6 "
+                             "([x0, x1, y0, y1, z0, z1]).")
+        coords += [_check_var(c, float, 1, name) for c in inp]
+
+    # Broadcast all coordinates to the number of measurements
+    try:
+        coords = np.broadcast_arrays(*coords)
+    except ValueError:
+        raise ValueError("All electrode coordinates must be floats or arrays "
+                         "of the same size.")
+    elec = np.array(coords).reshape(2, 3, 2, -1).transpose(0, 2, 1, 3)
+    elec = elec.reshape(4, 3, -1)
+
+    # Current and potential electrodes cannot coincide
+    dist = [np.linalg.norm(elec[i] - elec[j], axis=0)
+            for i, j in [(0, 1), (2, 3)]]
+    if np.any(dist[0] == 0) or np.any(dist[1] == 0):
+        raise ValueError("Electrodes A and B (and M and N) cannot be at the "
+                         "same position.")
+
+    # Print electrode information
+    if verb > 2:
+        print(f"   Measurements    :  {elec.shape[2]} (electrodes A, B, M, "
+              "N)")
+        _prnt_min_max_val(np.unique(elec[:, 2]), "   z electr.  [m] : ", verb)
+
+    return elec
+
+
+@traced('utils.check_hankel')
 def check_hankel(ht, htarg, verb):
     r"""Check Hankel transform parameters.
 
@@ -511,9 +667,37 @@ def check_hankel(ht, htarg, verb):
 
     # Initiate output dict
     targ = {}
-    args = copy.deepcopy(htarg)
+    args = copy.deepcopy({k: v for k, v in htarg.items() if k != 'workers'})
+    if 'workers' in htarg:  # Might not be copyable (e.g., Pool.map)
+        args['workers'] = htarg['workers']
+
+    if ht == 'dlf' and args.get('dlf', None) == 'auto':  # DLF, automatic
+
+        # Filter and type are selected in `fem`, see `transform.get_dlf_auto`
+        targ['dlf'] = args.pop('dlf')
+
+        # rtol : 1e-6
+        targ['rtol'] = _check_var(
+                args.pop('rtol', 1e-6), float, 0, 'dlf: rtol', ())
+
+        # atol : 1e-30
+        targ['atol'] = _check_var(
+                args.pop('atol', 1e-30), float, 0, 'dlf: atol', ())
+
+        # pts_per_dec : None  # Selected automatically
+        targ['pts_per_dec'] = args.pop('pts_per_dec', None)
+        if targ['pts_per_dec'] is not None:
+            targ['pts_per_dec'] = _check_var(
+                    targ['pts_per_dec'], float, 0, 'dlf: pts_per_dec', ())
+
+        # If verbose, print Hankel transform information
+        if verb > 2:
+            print("   Hankel          :  DLF (Fast Hankel Transform)")
+            print("     > Filter      :  auto")
+            print(f"     > rtol        :  {targ['rtol']}")
+            print(f"     > atol        :  {targ['atol']}")
 
-    if ht == 'dlf':     # DLF
+    elif ht == 'dlf':     # DLF
 
         # If filter is a name (str), get it
         targ['dlf'] = args.pop('dlf', filters.Hankel().key_201_2009)
@@ -591,6 +775,9 @@ def check_hankel(ht, htarg, verb):
             targ['limit'] = _check_var(
                     targ['limit'], int, 0, 'qwe: limit (quad)', ())
 
+        # workers : 1  # Serial QUAD
+        targ['workers'] = _check_workers(args.pop('workers', 1), 'qwe')
+
         # If verbose, print Hankel transform information
         if verb > 2:
             print("   Hankel          :  Quadrature-with-Extrapolation")
@@ -606,6 +793,8 @@ def check_hankel(ht, htarg, verb):
                 print(f"     > b     (quad):  {targ['b']}")
             if targ['limit']:
                 print(f"     > limit (quad):  {targ['limit']}")
+            if targ['workers'] != 1:
+                print(f"     > workers     :  {targ['workers']}")
 
     elif ht in 'quad':  # QUAD
 
@@ -633,6 +822,9 @@ def check_hankel(ht, htarg, verb):
         targ['pts_per_dec'] = _check_min(
                 pts_per_dec, 1, 'pts_per_dec', '', verb)
 
+        # workers : 1  # Serial QUAD
+        targ['workers'] = _check_workers(args.pop('workers', 1), 'quad')
+
         # If verbose, print Hankel transform information
         if verb > 2:
             print("   Hankel          :  Quadrature")
@@ -642,6 +834,8 @@ def check_hankel(ht, htarg, verb):
             print(f"     > a           :  {targ['a']}")
             print(f"     > b           :  {targ['b']}")
             print(f"     > pts_per_dec :  {targ['pts_per_dec']}")
+            if targ['workers'] != 1:
+                print(f"     > workers     :  {targ['workers']}")
 
     else:
         raise ValueError("<ht> must be one of: ['dlf', 'qwe', 'quad'];"
@@ -654,6 +848,7 @@ def check_hankel(ht, htarg, verb):
     return ht, targ
 
 
+@traced('utils.check_model')
 def check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV, xdirect,
                 verb):
     r"""Check the model: depth and corresponding layer parameters.
@@ -849,6 +1044,110 @@ def check_model(depth, res, aniso, epermH, epermV, mpermH, mpermV, xdirect,
     return depth, res, aniso, epermH, epermV, mpermH, mpermV, isfullspace
 
 
+@traced('utils.check_batch_model')
+def check_batch_model(depth, res, aniso, epermH, epermV, mpermH, mpermV,
+                      nsound, verb):
+    r"""Check the models of a batch of soundings.
+
+    This check-function is called from :func:`empymod.model.ip_and_q` with
+    `batch=True`. It does the same as :func:`check_model`, but for all
+    soundings at once; each parameter can be given for all soundings,
+    (nlayer) or (nlayer-1), or per sounding, (nsound, nlayer) or (nsound,
+    nlayer-1). User-provided eta/zeta functions are not supported.
+
+    Parameters
+    ----------
+    depth, res, aniso, epermH, epermV, mpermH, mpermV : array_like
+        Model parameters, see :func:`check_model`.
+
+    nsound : int
+        Number of soundings.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    depth : array, (nsound, nlayer)
+        Depths of layer interfaces, adds -inf at beginning if not present.
+
+    res, aniso, epermH, epermV, mpermH, mpermV : array, (nsound, nlayer)
+        As input, checked for size; defaults to ones if None.
+
+    isfullspace : array of bool, (nsound)
+        True for soundings whose model is a fullspace.
+
+    """
+    global _min_res
+
+    # Check depth; (nsound, nlayer-1)
+    if depth is None:
+        depth = []
+    depth = _check_var(depth, float, 2, 'depth')
+    if depth.size == 0:
+        depth = np.zeros((nsound, 0))
+    depth = np.broadcast_to(depth, (nsound, depth.shape[1])).copy()
+
+    # Swap soundings where all depths are decreasing.
+    swap = (depth.shape[1] > 1) & np.all(np.diff(depth, axis=1) < 0, axis=1)
+    depth[swap] = depth[swap, ::-1]
+
+    # Ensure depth is increasing
+    if np.any(np.diff(depth, axis=1) < 0):
+        raise ValueError("Depth must be continuously increasing or "
+                         "decreasing.")
+
+    # Add -infinity at the beginning, remove +infinity at the end.
+    if depth.shape[1] == 0 or not np.all(depth[:, 0] == -np.inf):
+        depth = np.c_[np.full(nsound, -np.inf), depth]
+    if depth.shape[1] > 1 and np.all(depth[:, -1] == np.inf):
+        depth = depth[:, :-1]
+
+    def check_inp(var, name, min_val):
+        r"""Param-check function. Default to ones if not provided"""
+        if var is None:
+            return np.ones(depth.shape)
+        var = _check_var(var, float, 2, name)
+        try:
+            var = np.broadcast_to(var, depth.shape).copy()
+        except ValueError:
+            raise ValueError(f"Parameter {name} has wrong shape! : "
+                             f"{var.shape} instead of {depth.shape}.")
+        var[swap] = var[swap, ::-1]
+        if name == 'aniso':  # Convert aniso into vertical resistivity
+            var = var**2*res
+        var = _check_min(var, min_val, 'Parameter ' + name, '', verb)
+        if name == 'aniso':  # Convert vert. resistivity back to aniso
+            var = np.sqrt(var/res)
+        return var
+
+    # => min_res can be set with utils.set_min
+    res = check_inp(res, 'res', None)
+    res = _check_min(res, _min_res, 'Resistivities', 'Ohm.m', verb)
+    aniso = check_inp(aniso, 'aniso', _min_res)
+    epermH = check_inp(epermH, 'epermH', 0.0)
+    # We assume isotropic behaviour if epermH was provided but not epermV
+    if epermV is None:
+        epermV = epermH
+    else:
+        epermV = check_inp(epermV, 'epermV', 0.0)
+    mpermH = check_inp(mpermH, 'mpermH', 0.0)
+    # We assume isotropic behaviour if mpermH was provided but not mpermV
+    if mpermV is None:
+        mpermV = mpermH
+    else:
+        mpermV = check_inp(mpermV, 'mpermV', 0.0)
+
+    # Soundings with the same material parameters in all layers.
+    isfullspace = np.ones(nsound, dtype=bool)
+    for par in [res, aniso, epermH, epermV, mpermH, mpermV]:
+        isfullspace &= np.all(par == par[:, :1], axis=1)
+
+    return depth, res, aniso, epermH, epermV, mpermH, mpermV, isfullspace
+
+
+@traced('utils.check_loop')
 def check_loop(loop, ht, htarg, verb):
     r"""Check loop parameter.
 
@@ -884,7 +1183,8 @@ def check_loop(loop, ht, htarg, verb):
     # Define if to loop over frequencies or over offsets
     lagged_splined_dlf = False
     if ht == 'dlf':
-        if htarg['pts_per_dec'] != 0:
+        # (pts_per_dec is None if selected automatically)
+        if htarg['pts_per_dec'] is None or htarg['pts_per_dec'] != 0:
             lagged_splined_dlf = True
 
     if ht in ['qwe', 'quad'] or lagged_splined_dlf:
@@ -907,6 +1207,7 @@ def check_loop(loop, ht, htarg, verb):
     return loop_freq, loop_off
 
 
+@traced('utils.check_time')
 def check_time(time, signal, ft, ftarg, verb):
     r"""Check time domain specific input parameters.
 
@@ -1011,9 +1312,8 @@ def check_time(time, signal, ft, ftarg, verb):
                 print(f"{pstr}Standard")
 
         # Get required frequencies
-        omega, _ = transform.get_dlf_points(
-                targ['dlf'], time, targ['pts_per_dec'])
-        freq = np.squeeze(omega/2/np.pi)
+        plan = transform.get_dlf_plan(targ['dlf'], time, targ['pts_per_dec'])
+        freq = np.squeeze(plan.points/2/np.pi)
 
     elif ft == 'qwe':     # QWE (using sine and imag-part)
         # If switch-off is required, use cosine, else sine
@@ -1191,6 +1491,14 @@ def check_time(time, signal, ft, ftarg, verb):
         raise ValueError("<ft> must be one of: ['dlf', 'qwe', "
                          f"'fftlog', 'fft']; <ft> provided: {ft}")
 
+    # adaptive : None (all methods)
+    targ['adaptive'] = args.pop('adaptive', None)
+    if targ['adaptive'] is not None:
+        targ['adaptive'] = _check_var(
+                targ['adaptive'], float, 0, f'{ft}: adaptive', ())
+        if verb > 2:
+            print(f"     > adaptive    :  rtol = {targ['adaptive']}")
+
     # Check remaining arguments.
     if args and verb > 0:
         print(f"* WARNING :: Unknown ftarg {args} for method '{ft}'")
@@ -1247,6 +1555,274 @@ def check_time_only(time, signal, verb):
     return time
 
 
+@traced('utils.check_waveform')
+def check_waveform(waveform, time, verb):
+    r"""Check source waveform and get required times and operator.
+
+    This check-function is called from one of the modelling routines in
+    :mod:`empymod.model`. Consult these modelling routines for a detailed
+    description of the input parameters.
+
+    Parameters
+    ----------
+    waveform : dict
+        Piecewise-linear source waveform, with the keys `time` (s), `current`
+        (A), and optionally `nquad` (default: 3).
+
+    time : array_like
+        Wanted times t (s).
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    waveform : dict
+        Checked waveform; contains additionally the times `qtime` at which the
+        switch-on response has to be computed, and the `operator` to obtain
+        the waveform response at `time` from them.
+
+    """
+    if not isinstance(waveform, dict):
+        raise TypeError("<waveform> must be a dict with the keys 'time' and "
+                        f"'current'; provided: {waveform}.")
+
+    # Check time and waveform
+    time = _check_var(time, float, 1, 'time')
+    out = {}
+    for name in ['time', 'current']:
+        if name not in waveform:
+            raise ValueError(f"<waveform> is missing the key '{name}'.")
+    out['time'] = _check_var(waveform['time'], float, 1, 'waveform: time')
+    out['current'] = _check_var(
+            waveform['current'], float, 1, 'waveform: current',
+            out['time'].shape)
+    if np.any(np.diff(out['time']) <= 0):
+        raise ValueError("<waveform: time> must be strictly increasing.")
+    if np.all(out['current'] == 0):
+        raise ValueError("<waveform: current> must not be all zero.")
+    out['nquad'] = _check_var(
+            waveform.get('nquad', 3), int, 0, 'waveform: nquad', ())
+    out['nquad'] = int(_check_min(out['nquad'], 1, 'nquad', '', verb))
+
+    # Get required times and convolution operator
+    qtime, out['operator'] = transform.get_waveform_operator(
+            time, out['time'], out['current'], out['nquad'])
+    if qtime.size == 0:
+        raise ValueError("All times are before the start of the waveform.")
+    out['qtime'] = np.clip(qtime, _min_time, None)
+
+    # Print waveform information
+    if verb > 2:
+        print(f"   Waveform        :  {out['time'].size} points; "
+              f"nquad = {out['nquad']}")
+        _prnt_min_max_val(out['time'], "     > time    [s] : ", verb)
+        _prnt_min_max_val(out['current'], "     > current [A] : ", verb)
+
+    return out
+
+
+@traced('utils.check_gates')
+def check_gates(gates, time, signal, verb):
+    r"""Check receiver gates and get required times and operator.
+
+    This check-function is called from one of the modelling routines in
+    :mod:`empymod.model`. Consult these modelling routines for a detailed
+    description of the input parameters.
+
+    Parameters
+    ----------
+    gates : array_like, (ntime, 2)
+        Opening and closing times (s) of the gates.
+
+    time : array_like
+        Times t (s); one per gate, used as its label (usually the centre).
+
+    signal : {None, 0, 1, -1}
+        Source signal; gates require a time-domain response.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    gates : dict
+        Checked gates (`gates`), the times `gtime` at which the response has to
+        be computed, and the `operator` to obtain the gate averages from them.
+
+    """
+    if signal is None:
+        raise ValueError("<gates> are only implemented for time-domain "
+                         "responses; provide <signal> or <waveform>.")
+
+    # Check gates
+    time = _check_var(time, float, 1, 'time')
+    gates = _check_var(gates, float, 2, 'gates', (time.size, 2))
+    if np.any(gates[:, 0] <= 0) or np.any(gates[:, 1] <= gates[:, 0]):
+        raise ValueError("<gates> must open after t=0 s and close after "
+                         "they open.")
+
+    # Get required times and gate operator
+    gtime, operator = transform.get_gate_operator(gates)
+
+    # Print gate information
+    if verb > 2:
+        _prnt_min_max_val(gates[:, 0], "   Gates open  [s] : ", verb)
+        _prnt_min_max_val(gates[:, 1], "   Gates close [s] : ", verb)
+
+    return {'gates': gates, 'gtime': gtime, 'operator': operator}
+
+
+@traced('utils.check_finite_loop')
+def check_finite_loop(radius, vertices, src, srcdipole, rec, recdipole, mrec,
+                      ht, htarg, verb):
+    r"""Check finite, horizontal loop source.
+
+    This check-function is called from one of the modelling routines in
+    :mod:`empymod.model`. Consult these modelling routines for a detailed
+    description of the input parameters.
+
+    Parameters
+    ----------
+    radius : float or None
+        Radius (m) of a circular loop.
+
+    vertices : array_like or None, (nvertices, 2)
+        Vertices (x, y) (m) of a polygonal loop, relative to the source.
+
+    src, rec : list of arrays
+        Source and receiver, as returned from :func:`check_bipole`.
+
+    srcdipole, recdipole : bool
+        If source and receiver are dipoles, from :func:`check_bipole`.
+
+    mrec : bool or str
+        Receiver type, see :func:`empymod.model.loop`.
+
+    ht, htarg : str, dict
+        Checked Hankel transform and its arguments.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    floop : dict
+        Checked loop with keys `radius`, `vertices` (one of them is None), the
+        loop centre `src` ([x, y, z]), and the signs `srcsign` and `recsign` of
+        the vertical source and receiver orientations.
+
+    """
+    if radius is not None and vertices is not None:
+        raise ValueError("Provide either <loop_radius> or <loop_vertices>, "
+                         "not both.")
+
+    # Only implemented for the Hankel DLF with a given filter
+    if ht != 'dlf' or isinstance(htarg['dlf'], str):
+        raise ValueError("Finite loops are only implemented for `ht='dlf'` "
+                         "with a given filter.")
+
+    # Source: one horizontal loop, hence a single vertical dipole
+    if not srcdipole or src[0].size != 1:
+        raise ValueError("Finite loops require <src> to be one dipole, "
+                         "[x, y, z, azimuth, dip].")
+    srcsign = np.sin(np.deg2rad(src[4][0]))
+    if not np.isclose(abs(srcsign), 1):
+        raise ValueError("Finite loops must be horizontal; <src> must have "
+                         "dip=+/-90.")
+
+    # Receivers: vertical magnetic dipoles or loops
+    recsign = np.sin(np.deg2rad(rec[4])) if recdipole else np.zeros(1)
+    if mrec is False or not np.allclose(abs(recsign), 1):
+        raise ValueError("Finite loops are only implemented for vertical "
+                         "magnetic receivers; <rec> must be dipoles with "
+                         "dip=+/-90, and <mrec> True or 'loop'.")
+
+    # Check shape
+    if radius is not None:
+        radius = float(_check_var(radius, float, 0, 'loop_radius'))
+        if radius <= 0:
+            raise ValueError("<loop_radius> must be bigger than zero.")
+        area = np.pi*radius**2
+    else:
+        vertices = _check_var(vertices, float, 2, 'loop_vertices')
+        if vertices.shape[0] < 3 or vertices.shape[1] != 2:
+            raise ValueError("<loop_vertices> must be of shape "
+                             "(nvertices, 2), with nvertices >= 3.")
+        vx, vy = vertices[:, 0], vertices[:, 1]
+        area = abs(np.sum(vx*np.roll(vy, -1) - np.roll(vx, -1)*vy))/2
+
+    # Print loop information
+    if verb > 2:
+        if radius is not None:
+            print(f"   Finite loop     :  circular; radius = {radius} m")
+        else:
+            print(f"   Finite loop     :  polygon; {vertices.shape[0]} "
+                  "vertices")
+        print(f"     > area   [m2] :  {area:g}")
+
+    return {'radius': radius, 'vertices': vertices,
+            'src': [src[0], src[1], src[2]], 'srcsign': srcsign,
+            'recsign': recsign}
+
+
+@traced('utils.check_lowpass')
+def check_lowpass(lowpass, verb):
+    r"""Check lowpass filters.
+
+    This check-function is called from one of the modelling routines in
+    :mod:`empymod.model`. Consult these modelling routines for a detailed
+    description of the input parameters.
+
+    Parameters
+    ----------
+    lowpass : float, tuple, callable, or list of those
+        Lowpass filter(s): cut-off frequency (Hz) of a first-order Butterworth
+        filter, tuple ``(cutoff, order)`` of a Butterworth filter, or a
+        callable returning the complex frequency response for given
+        frequencies.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    lowpass : list
+        Filters, as tuples ``(cutoff, order)`` or callables.
+
+    """
+    # Ensure list of filters
+    if not isinstance(lowpass, (list, np.ndarray)):
+        lowpass = [lowpass, ]
+
+    out = []
+    for filt in lowpass:
+        if callable(filt):
+            out.append(filt)
+            continue
+        filt = np.atleast_1d(np.array(filt, dtype=float))
+        if filt.size == 1:
+            filt = np.r_[filt, 1]
+        if filt.size != 2 or filt[0] <= 0 or filt[1] < 1:
+            raise ValueError(
+                    "<lowpass> filters must be a positive cut-off frequency, "
+                    "a tuple (cutoff, order), or a callable; provided: "
+                    f"{filt}.")
+        out.append((float(filt[0]), int(filt[1])))
+
+    # Print filter information
+    if verb > 2:
+        pstr = [f"{_strvar(f[0])} Hz (order {f[1]})" if isinstance(f, tuple)
+                else "callable" for f in out]
+        print(f"   Lowpass filters :  {'; '.join(pstr)}")
+
+    return out
+
+
 def check_solution(solution, signal, ab, msrc, mrec):
     r"""Check required solution with parameters.
 
@@ -1293,6 +1869,7 @@ def check_solution(solution, signal, ab, msrc, mrec):
 
 # 2.b <Get>s (alphabetically)
 
+@traced('utils.get_abs')
 def get_abs(msrc, mrec, srcazm, srcdip, recazm, recdip, verb):
     r"""Get required ab's for given angles.
 
@@ -1390,6 +1967,7 @@ def get_abs(msrc, mrec, srcazm, srcdip, recazm, recdip, verb):
     return ab_calc
 
 
+@traced('utils.get_geo_fact')
 def get_geo_fact(ab, srcazm, srcdip, recazm, recdip, msrc, mrec):
     r"""Get required geometrical scaling factor for given angles.
 
@@ -1493,6 +2071,90 @@ def get_layer_nr(inp, depth):
     return np.squeeze(linp), np.squeeze(zinp)
 
 
+def get_dc_layout(kind, nelec, spacing=1.0, nmax=None, z=0.0):
+    r"""Return the electrodes of a DC resistivity pseudosection.
+
+    Electrodes are on a line along x at ``x = spacing*[0, 1, ..., nelec-1]``.
+    For each level n = 1, 2, ..., nmax, all possible configurations along the
+    line are returned, where `a` denotes the spacing:
+
+    - ``'wenner'``: A, M, N, B with AM = MN = NB = n a;
+    - ``'schlumberger'``: A, M, N, B with AM = NB = n a, MN = a
+      (Wenner-Schlumberger);
+    - ``'dipole-dipole'``: B, A, M, N with AB = MN = a, AM = n a.
+
+    The output can directly be used as `src` and `rec` in
+    :func:`empymod.model.dc`. The usual position to plot the data in a
+    pseudosection is the mean x-coordinate of the four electrodes, at level n.
+
+    Parameters
+    ----------
+    kind : {'wenner', 'schlumberger', 'dipole-dipole'}
+        Electrode array.
+
+    nelec : int
+        Number of electrodes on the line.
+
+    spacing : float, default: 1.0
+        Electrode spacing a (m).
+
+    nmax : int or None, default: None
+        Maximum level n; by default, all levels which fit on the line.
+
+    z : float, default: 0.0
+        Depth of the electrodes (m).
+
+
+    Returns
+    -------
+    src, rec : list
+        Current electrodes [xA, xB, yA, yB, zA, zB] and potential electrodes
+        [xM, xN, yM, yN, zM, zN] (m); the x-coordinates are arrays of size
+        nmeas, the others are floats.
+
+    level : ndarray
+        Level n of each measurement.
+
+    """
+    # Electrode indices (A, B, M, N) relative to the first electrode, per n
+    kind = kind.lower()
+    layouts = {
+        'wenner': lambda n: (0, 3*n, n, 2*n),
+        'schlumberger': lambda n: (0, 2*n+1, n, n+1),
+        'dipole-dipole': lambda n: (1, 0, n+1, n+2),
+    }
+    if kind not in layouts:
+        raise ValueError(f"Unknown electrode array <kind>: {kind}; must be "
+                         f"one of {list(layouts.keys())}.")
+
+    nelec = int(_check_var(nelec, int, 0, 'nelec', ()))
+    if nmax is None:
+        nmax = nelec
+    else:
+        nmax = int(_check_var(nmax, int, 0, 'nmax', ()))
+
+    # Collect all configurations which fit on the line
+    ind, level = [], []
+    for n in range(1, nmax+1):
+        abmn = np.array(layouts[kind](n))
+        nshift = nelec - abmn.max()
+        if nshift < 1:
+            break
+        ind.append(abmn[:, None] + np.arange(nshift))
+        level.append(np.full(nshift, n))
+
+    if len(ind) == 0:
+        raise ValueError(f"Not enough electrodes ({nelec}) for <kind> "
+                         f"{kind}.")
+
+    xelec = spacing*np.hstack(ind).astype(float)
+    src = [xelec[0], xelec[1], 0.0, 0.0, z, z]
+    rec = [xelec[2], xelec[3], 0.0, 0.0, z, z]
+
+    return src, rec, np.hstack(level)
+
+
+@traced('utils.get_off_ang')
 def get_off_ang(src, rec, nsrc, nrec, verb):
     r"""Get depths, offsets, angles, hence spatial input parameters.
 
@@ -1546,6 +2208,47 @@ def get_off_ang(src, rec, nsrc, nrec, verb):
     return off, angle
 
 
+@traced('utils.get_batch_off_ang')
+def get_batch_off_ang(src, rec, verb):
+    r"""Get offsets and angles of a batch of soundings.
+
+    Each sounding consists of one source and one receiver; contrary to
+    :func:`get_off_ang`, the offsets and angles are hence not computed for all
+    source-receiver combinations, but for each sounding.
+
+    Parameters
+    ----------
+    src, rec : array, (nsound, 3)
+        Source/receiver dipole coordinates x, y, and z (m) of each sounding.
+
+    verb : {0, 1, 2, 3, 4}
+        Level of verbosity.
+
+
+    Returns
+    -------
+    off : array of floats, (nsound)
+        Offsets
+
+    angle : array of floats, (nsound)
+        Angles
+
+    """
+    global _min_off
+
+    xco = rec[:, 0] - src[:, 0]  # X-coordinates  [m]
+    yco = rec[:, 1] - src[:, 1]  # Y-coordinates  [m]
+    off = np.sqrt(xco*xco + yco*yco)  # Offset   [m]
+    angle = np.arctan2(yco, xco)      # Angle  [rad]
+
+    # Minimum offset to avoid singularities at off = 0 m.
+    # => min_off can be set with utils.set_min
+    off = _check_min(off, _min_off, 'Offsets', 'm', verb)
+
+    return off, angle
+
+
+@traced('utils.get_azm_dip')
 def get_azm_dip(inp, iz, ninpz, intpts, isdipole, strength, name, verb):
     r"""Get angles, interpolation weights and normalization weights.
 
@@ -1766,10 +2469,10 @@ def get_kwargs(names, defaults, kwargs):
 
     - ALL functions: src, rec, res, aniso, epermH, epermV, mpermH, mpermV, verb
     - ONLY gpr: cf, gain
-    - ONLY bipole: msrc, srcpts
+    - ONLY bipole: msrc, srcpts, outfile
     - ONLY dipole_k: freq, wavenumber
     - ONLY analytical: solution
-    - ONLY bipole, loop: mrec, recpts, strength
+    - ONLY bipole, loop: mrec, recpts, strength, waveform, lowpass, gates
     - ONLY bipole, dipole, loop, gpr: ht, htarg, ft, ftarg, xdirect, loop
     - ONLY bipole, dipole, loop, analytical: signal, squeeze
     - ONLY dipole, analytical, gpr, dipole_k: ab
@@ -1797,7 +2500,9 @@ def get_kwargs(names, defaults, kwargs):
     known_keys = set([
             'depth', 'ht', 'htarg', 'ft', 'ftarg', 'xdirect', 'loop', 'signal',
             'ab', 'freqtime', 'freq', 'wavenumber', 'solution', 'cf', 'gain',
-            'msrc', 'srcpts', 'mrec', 'recpts', 'strength', 'squeeze'
+            'msrc', 'srcpts', 'mrec', 'recpts', 'strength', 'squeeze',
+            'waveform', 'lowpass', 'gates', 'loop_radius', 'loop_vertices',
+            'outfile'
     ])
 
     # Loop over wanted parameters.
@@ -1846,6 +2551,29 @@ def conv_warning(conv, targ, name, verb):
               "=> desired `atol` and `rtol` might not be achieved.")
 
 
+def dlf_auto_info(targ, verb):
+    r"""Print the automatically selected Hankel DLF filter and type."""
+    auto = 'rtol' in targ and 'dlf' in targ  # Only DLF-auto has both
+    if verb > 2 and auto and not isinstance(targ['dlf'], str):
+        pstr = "     > DLF type    :  "
+        if targ['pts_per_dec'] < 0:
+            pstr += "Lagged Convolution"
+        elif targ['pts_per_dec'] > 0:
+            pstr += f"Splined, {targ['pts_per_dec']} pts/dec"
+        else:
+            pstr += "Standard"
+        print(f"   Hankel (auto)   :  DLF\n"
+              f"     > Filter      :  {targ['dlf'].name}\n{pstr}")
+
+
+def adaptive_info(adaptive, verb):
+    r"""Print the number of adaptively computed frequencies."""
+    if verb > 2 and adaptive is not None and 'used' in adaptive:
+        used = adaptive['used']
+        print(f"   Adaptive freq.  :  {used.sum()} of {used.size} "
+              "frequencies computed")
+
+
 # 3. Set/get min values
 
 def set_minimum(min_freq=None, min_time=None, min_off=None, min_res=None,
@@ -1944,6 +2672,17 @@ def _check_var(var, dtype, ndmin, name, shape=None, shape2=None):
     return var
 
 
+def _check_workers(workers, name):
+    r"""Return workers as int (-1 for all CPUs) or map-like callable."""
+    if callable(workers):
+        return workers
+    workers = int(_check_var(workers, int, 0, f'{name}: workers', ()))
+    if workers == 0 or workers < -1:
+        raise ValueError(f"<{name}: workers> must be -1, a positive integer, "
+                         f"or a map-like callable; provided: {workers}.")
+    return workers
+
+
 def _strvar(a, prec='{:G}'):
     r"""Return variable as a string to print, with given precision."""
     return ' '.join([prec.format(i) for i in np.atleast_1d(a)])
@@ -148,6 +148,18 @@ for j in range(depths.size-1, 0, -1):
 apres_mt1d = abs(Z_j)**2/(omega * mu_0)
 phase_mt1d = np.arctan2(Z_j.imag, Z_j.real)
 
+###############################################################################
+# 1D-MT with empymod.mt
+# ~~~~~~~~~~~~~~~~~~~~~
+#
+# The same recursion is implemented in ``empymod.mt``, which returns the
+# impedance, apparent resistivity, and apparent phase (°). It can also take
+# many stacked models at once, ``res`` of shape ``(nmodels, nlayers)``. The
+# above recursion neglects displacement currents, hence we set ``epermH=0``.
+
+Z_mt, apres_mt, phase_mt = empymod.mt(
+    depths, resistivities, frequencies, epermH=0, verb=1)
+
 ###############################################################################
 # 1D MT using empymod
 # -------------------
@@ -189,6 +201,7 @@ fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(9, 4), constrained_layout=True)
 
 ax1.set_title('Apparent resistivity')
 ax1.loglog(frequencies, apres_mt1d, label='MT-1D')
+ax1.loglog(frequencies, apres_mt, ':', label='empymod.mt')
 ax1.loglog(frequencies, apres_empy, '--', label='empymod')
 ax1.set_xlabel('Frequency (Hz)')
 ax1.set_ylabel('Apparent resistivity (Ω m)')
@@ -196,6 +209,7 @@ ax1.legend()
 
 ax2.set_title('Phase')
 ax2.semilogx(frequencies, phase_mt1d*180/np.pi)
+ax2.semilogx(frequencies, phase_mt, ':')
 ax2.semilogx(frequencies, phase_empy*180/np.pi, '--')
 ax2.yaxis.tick_right()
 ax2.set_xlabel('Frequency (Hz)')
@@ -40,7 +40,7 @@ plt.style.use('ggplot')
 # and given source and receivers.
 
 
-def comp_appres(depth, res, a, n, srcpts=1, recpts=1, verb=1):
+def comp_appres(depth, res, a, n, verb=1):
     """Return apparent resistivity for dipole-dipole DC measurement
 
         rho_a = V/I pi a n (n+1) (n+2).
@@ -51,11 +51,12 @@ def comp_appres(depth, res, a, n, srcpts=1, recpts=1, verb=1):
     - Source and receiver are located at the air-interface.
     - Source is centered at x = 0 m.
 
-    Note: DC response can be obtained by either t->infinity s or f->0 Hz. f = 0
-          Hz is much faster, as there is no Fourier transform involved and only
-          a single frequency has to be computed. By default, the minimum
-          frequency in empymod is 1e-20 Hz. The difference between the signals
-          for 1e-20 Hz and 0 Hz is very small.
+    Note: DC responses could also be obtained from `empymod.bipole` by either
+          t->infinity s or f->0 Hz. However, `empymod.dc` uses a dedicated,
+          real-valued static kernel, and computes all separations n in one
+          call. It returns the apparent resistivity directly, using the
+          geometric factor of the electrodes, which is the above factor for
+          the dipole-dipole array.
 
     For more explanation regarding input parameters see `empymod.model`.
 
@@ -65,7 +66,6 @@ def comp_appres(depth, res, a, n, srcpts=1, recpts=1, verb=1):
     res : Resistivities of the layers, one more than depths (lower HS).
     a : Dipole length.
     n : Separation factors.
-    srcpts, recpts : If < 3, bipoles are approximated as dipoles.
     verb : Verbosity.
 
     Returns
@@ -78,20 +78,17 @@ def comp_appres(depth, res, a, n, srcpts=1, recpts=1, verb=1):
     # Get offsets between src-midpoint and rec-midpoint, AB
     AB = (n+1)*a
 
-    # Collect model, putting source and receiver slightly (1e-3 m) into the
-    # ground.
+    # Collect model; electrodes A, B (src) and M, N (rec) at the surface.
     model = {
-        'src': [-a/2, a/2, 0, 0, 1e-3, 1e-3],
-        'rec': [AB-a/2, AB+a/2, AB*0, AB*0, 1e-3, 1e-3],
+        'src': [-a/2, a/2, 0, 0, 0, 0],
+        'rec': [AB-a/2, AB+a/2, AB*0, AB*0, 0, 0],
         'depth': np.r_[0, np.array(depth, ndmin=1)],
-        'freqtime': 1e-20,  # Smaller f would be set to 1e-20 be empymod.
-        'verb': verb,       # Setting it to 1e-20 avoids warning-message.
         'res': np.r_[2e14, np.array(res, ndmin=1)],
-        'strength': 1,      # So it is NOT normalized to 1 m src/rec.
+        'verb': verb,
         'htarg': {'pts_per_dec': -1},
     }
 
-    return np.real(empymod.bipole(**model))*np.pi*a*n*(n+1)*(n+2), AB/2
+    return empymod.dc(**model)[1], AB/2
 
 
 ###############################################################################
@@ -14,10 +14,11 @@ the system** WalkTEM, and compare it with data obtained from `AarhusInv
 example to model other TEM systems, such as skyTEM, SIROTEM, TEM-FAST, or any
 other system.
 
-What is not included in ``empymod`` at this moment (but hopefully in the
-future), but is required to model TEM data, is to **account for arbitrary
-source waveform**, and to apply a **lowpass filter**. So we generate these two
-things here, and create our own wrapper to model TEM data.
+Modelling TEM data requires to **account for the arbitrary source
+waveform**, and to apply the **lowpass filters** of the system. Both are
+available in the modelling routines ``bipole`` and ``loop`` through the
+parameters ``waveform`` and ``lowpass``, which we use here in a small wrapper
+to model TEM data.
 
 The incentive for this example came from Leon Foks (`@leonfoks
 <https://github.com/leonfoks>`_) for `GeoBIPy
@@ -29,9 +30,7 @@ based on work from Kerry Key (`@kerrykey <https://github.com/kerrykey>`_).
 import empymod
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.special import roots_legendre
 from matplotlib.ticker import LogLocator, NullFormatter
-from scipy.interpolate import InterpolatedUnivariateSpline as iuSpline
 plt.style.use('ggplot')
 # sphinx_gallery_thumbnail_number = 2
 
@@ -128,125 +127,6 @@ plt.legend()
 ###############################################################################
 # 2. ``empymod`` implementation
 # -----------------------------
-def waveform(times, resp, times_wanted, wave_time, wave_amp, nquad=3):
-    """Apply a source waveform to the signal.
-
-    Parameters
-    ----------
-    times : ndarray
-        Times of computed input response; should start before and end after
-        `times_wanted`.
-
-    resp : ndarray
-        EM-response corresponding to `times`.
-
-    times_wanted : ndarray
-        Wanted times.
-
-    wave_time : ndarray
-        Time steps of the wave.
-
-    wave_amp : ndarray
-        Amplitudes of the wave corresponding to `wave_time`, usually
-        in the range of [0, 1].
-
-    nquad : int
-        Number of Gauss-Legendre points for the integration. Default is 3.
-
-    Returns
-    -------
-    resp_wanted : ndarray
-        EM field for `times_wanted`.
-
-    """
-
-    # Interpolate on log.
-    PP = iuSpline(np.log10(times), resp)
-
-    # Wave time steps.
-    dt = np.diff(wave_time)
-    dI = np.diff(wave_amp)
-    dIdt = dI/dt
-
-    # Gauss-Legendre Quadrature; 3 is generally good enough.
-    # (Roots/weights could be cached.)
-    g_x, g_w = roots_legendre(nquad)
-
-    # Pre-allocate output.
-    resp_wanted = np.zeros_like(times_wanted)
-
-    # Loop over wave segments.
-    for i, cdIdt in enumerate(dIdt):
-
-        # We only have to consider segments with a change of current.
-        if cdIdt == 0.0:
-            continue
-
-        # If wanted time is before a wave element, ignore it.
-        ind_a = wave_time[i] < times_wanted
-        if ind_a.sum() == 0:
-            continue
-
-        # If wanted time is within a wave element, we cut the element.
-        ind_b = wave_time[i+1] > times_wanted[ind_a]
-
-        # Start and end for this wave-segment for all times.
-        ta = times_wanted[ind_a]-wave_time[i]
-        tb = times_wanted[ind_a]-wave_time[i+1]
-        tb[ind_b] = 0.0  # Cut elements
-
-        # Gauss-Legendre for this wave segment. See
-        # https://en.wikipedia.org/wiki/Gaussian_quadrature#Change_of_interval
-        # for the change of interval, which makes this a bit more complex.
-        logt = np.log10(np.outer((tb-ta)/2, g_x)+(ta+tb)[:, None]/2)
-        fact = (tb-ta)/2*cdIdt
-        resp_wanted[ind_a] += fact*np.sum(np.array(PP(logt)*g_w), axis=1)
-
-    return resp_wanted
-
-
-###############################################################################
-def get_time(time, r_time):
-    """Additional time for ramp.
-
-    Because of the arbitrary waveform, we need to compute some times before and
-    after the actually wanted times for interpolation of the waveform.
-
-    Some implementation details: The actual times here don't really matter. We
-    create a vector of time.size+2, so it is similar to the input times and
-    accounts that it will require a bit earlier and a bit later times. Really
-    important are only the minimum and maximum times. The Fourier DLF, with
-    `pts_per_dec=-1`, computes times from minimum to at least the maximum,
-    where the actual spacing is defined by the filter spacing. It subsequently
-    interpolates to the wanted times. Afterwards, we interpolate those again to
-    compute the actual waveform response.
-
-    Note: We could first call `waveform`, and get the actually required times
-          from there. This would make this function obsolete. It would also
-          avoid the double interpolation, first in `empymod.model.time` for the
-          Fourier DLF with `pts_per_dec=-1`, and second in `waveform`. Doable.
-          Probably not or marginally faster. And the code would become much
-          less readable.
-
-    Parameters
-    ----------
-    time : ndarray
-        Desired times
-
-    r_time : ndarray
-        Waveform times
-
-    Returns
-    -------
-    time_req : ndarray
-        Required times
-    """
-    tmin = np.log10(max(time.min()-r_time.max(), 1e-10))
-    tmax = np.log10(time.max()-r_time.min())
-    return np.logspace(tmin, tmax, time.size+2)
-
-
-###############################################################################
 def walktem(moment, depth, res):
     """Custom wrapper of empymod.model.bipole.
 
@@ -304,21 +184,24 @@ def walktem(moment, depth, res):
     else:
         raise ValueError("Moment must be either 'lm' or 'hm'!")
 
-    # === GET REQUIRED TIMES ===
-    time = get_time(off_time, waveform_times)
-
-    # === GET REQUIRED FREQUENCIES ===
-    time, freq, ft, ftarg = empymod.utils.check_time(
-        time=time,          # Required times
-        signal=1,           # Switch-on response
-        ft='dlf',           # Use DLF
-        ftarg={'dlf': 'key_81_2009'},  # Short, fast filter; if you
-        verb=2,                 # need higher accuracy choose a longer filter.
-    )
-
-    # === COMPUTE FREQUENCY-DOMAIN RESPONSE ===
+    # === SYSTEM RESPONSE ===
+    # The receiver measures dB/dt: multiply the frequency-domain H-field with
+    # \mu for H->B, and i\omega for B->dB/dt; this can be provided as a
+    # callable to `lowpass`, together with the actual filters.
+    def dbdt(freq):
+        return 2j*np.pi*freq*4e-7*np.pi
+
+    # Butterworth-type filters (implemented from simpegEM1D.Waveforms.py).
+    # Note: Here we just apply two first-order filters. But it seems that
+    #       WalkTEM can apply two filters, one before and one after the
+    #       so-called front gate (which might be related to ``delay_rst``, I am
+    #       not sure about that part.)
+    lowpass = [4.5e5, 3e5, dbdt]     # 4.5e5 as stated in the WalkTEM manual
+
+    # === COMPUTE WAVEFORM RESPONSE ===
     # We only define a few parameters here. You could extend this for any
     # parameter possible to provide to empymod.model.bipole.
+    delay_rst = 1.8e-7               # As stated in the WalkTEM manual
     EM = empymod.model.bipole(
         src=[20, 20,   0, 20, 0, 0],  # El. bipole source; half of one side.
         rec=[0, 0, 0, 0, 90],         # Receiver at the origin, vertical.
@@ -326,11 +209,16 @@ def walktem(moment, depth, res):
         res=np.r_[2e14, res],         # Provided resistivity model, adding air.
         # aniso=aniso,                # Here you could implement anisotropy...
         #                             # ...or any parameter accepted by bipole.
-        freqtime=freq,                # Required frequencies.
+        freqtime=off_time+delay_rst,  # Required times.
         mrec=True,                    # It is an el. source, but a magn. rec.
         strength=8,                   # To account for 4 sides of square loop.
         srcpts=3,                     # Approx. the finite dip. with 3 points.
         htarg={'dlf': 'key_101_2009'},  # Short filter, so fast.
+        ftarg={'dlf': 'key_81_2009'},   # Short, fast filter; if you need
+        #                               # higher accuracy choose a longer one.
+        waveform={'time': waveform_times, 'current': waveform_current},
+        lowpass=lowpass,
+        verb=1,
     )
     # Note: If the receiver wouldn't be in the center, we would have to model
     # the actual complete loop (no symmetry to take advantage of).
@@ -346,28 +234,9 @@ def walktem(moment, depth, res):
     #     )
     #     EM = EM.sum(axis=1)  # Sum all source bipoles
 
-    # Multiply the frequecny-domain result with
-    # \mu for H->B, and i\omega for B->dB/dt.
-    EM *= 2j*np.pi*freq*4e-7*np.pi
-
-    # === Butterworth-type filter (implemented from simpegEM1D.Waveforms.py)===
-    # Note: Here we just apply one filter. But it seems that WalkTEM can apply
-    #       two filters, one before and one after the so-called front gate
-    #       (which might be related to ``delay_rst``, I am not sure about that
-    #       part.)
-    cutofffreq = 4.5e5               # As stated in the WalkTEM manual
-    h = (1+1j*freq/cutofffreq)**-1   # First order type
-    h *= (1+1j*freq/3e5)**-1
-    EM *= h
-
-    # === CONVERT TO TIME DOMAIN ===
-    delay_rst = 1.8e-7               # As stated in the WalkTEM manual
-    EM, _ = empymod.model.tem(EM[:, None], np.array([1]),
-                              freq, time+delay_rst, 1, ft, ftarg)
-    EM = np.squeeze(EM)
-
-    # === APPLY WAVEFORM ===
-    return waveform(time, EM, off_time, waveform_times, waveform_current)
+    # The data are reported as the negative of the response to the waveform
+    # (the current is switched off).
+    return -EM
 
 
 ###############################################################################
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+import numpy as np
+from numpy.testing import assert_allclose
+from concurrent.futures import ThreadPoolExecutor
+
+import empymod
+from empymod import aio
+
+INP = {'src': [0, 0, 250], 'depth': [0, 300, 1000],
+       'res': [2e14, 0.3, 1, 50], 'freqtime': [0.1, 1.0], 'verb': 0}
+
+
+def gather(*coros):
+    """Run coroutines concurrently, return results (and exceptions)."""
+    async def main():
+        return await asyncio.gather(*coros, return_exceptions=True)
+    return asyncio.run(main())
+
+
+class TestCoalesce:
+
+    def test_dipole(self, monkeypatch):
+        # Count calls to the modelling routine
+        calls = []
+        compute = aio._compute
+        monkeypatch.setattr(
+                aio, '_compute', lambda *args: calls.append(1) or
+                compute(*args))
+
+        recs = [[1000+i*100, i*10, 300] for i in range(5)]
+        recs += [[np.array([2000, 3000]), np.array([0, 500]), 300]]
+        out = gather(*[aio.adipole(rec=rec, **INP) for rec in recs])
+        assert len(calls) == 1
+        for rec, res in zip(recs, out):
+            assert isinstance(res, empymod.EMArray)
+            assert_allclose(res, empymod.dipole(rec=rec, **INP), 1e-14, 0)
+
+        # squeeze=False, positional arguments, and different depths
+        rec = [[1000, 2000], [0, 0], 310]
+        out = gather(aio.adipole(INP['src'], rec, INP['depth'], INP['res'],
+                                 INP['freqtime'], squeeze=False, verb=0),
+                     aio.adipole(rec=[1500, 0, 320], **INP))
+        assert out[0].shape == (2, 2, 1)
+        assert_allclose(out[0], empymod.dipole(rec=rec, squeeze=False,
+                                               **INP), 1e-14, 0)
+        assert_allclose(out[1], empymod.dipole(rec=[1500, 0, 320], **INP),
+                        1e-14, 0)
+
+    def test_bipole_loop(self):
+        inp = {**INP, 'src': [0, 0, 250, 10, 20], 'signal': 0,
+               'freqtime': [1, 2]}
+        recs = [[1000+i*100, i*10, 300, 5*i, 0] for i in range(4)]
+        for fct, afct in [(empymod.bipole, aio.abipole),
+                          (empymod.loop, aio.aloop)]:
+            out = gather(*[afct(rec=rec, **inp) for rec in recs])
+            for rec, res in zip(recs, out):
+                assert_allclose(res, fct(rec=rec, **inp), 1e-14, 0)
+
+    def test_not_merged(self):
+        # Lagged DLF: result depends on all offsets; must not be merged
+        inp = {**INP, 'htarg': {'pts_per_dec': -1}}
+        recs = [[1000+i*500, 0, 300] for i in range(3)]
+        out = gather(*[aio.adipole(rec=rec, **inp) for rec in recs])
+        for rec, res in zip(recs, out):
+            assert_allclose(res, empymod.dipole(rec=rec, **inp), 0, 0)
+
+        assert aio._coalesce_key('dipole', inp) is None
+        assert aio._coalesce_key('dipole', {**INP, 'rec': 1}) is None
+        large = {**INP, 'rec': [np.arange(1, 101)*100, 0, 300]}
+        assert aio._coalesce_key('dipole', large) is None
+        key = aio._coalesce_key('dipole', {**INP, 'rec': [1, 2, 3]})
+        assert key == aio._coalesce_key('dipole', {**INP, 'rec': [4, 5, 6]})
+
+    def test_merge(self):
+        requests = [({'rec': [[1, 2], 0, 3], 'a': 1}, None),
+                    ({'rec': [4, 1, 3], 'a': 1}, None)]
+        inp, nrec = aio._merge(requests)
+        assert inp['squeeze'] is False
+        assert_allclose(inp['rec'][0], [1, 2, 4])
+        assert_allclose(inp['rec'][1], [0, 0, 1])
+        assert inp['rec'][2] == 3
+        assert_allclose(nrec, [2, 3])
+
+
+def test_errors_cancel():
+    # Errors are raised for the failing request only
+    out = gather(aio.adipole(rec=[1000, 0, 300], **INP),
+                 aio.adipole(rec=[2000, 0, 300], **{**INP, 'res': [1, 2]}))
+    assert_allclose(out[0], empymod.dipole(rec=[1000, 0, 300], **INP))
+    assert isinstance(out[1], ValueError)
+    assert "Parameter res has wrong shape" in str(out[1])
+
+    # A cancelled request does not affect the others
+    async def main():
+        task1 = asyncio.ensure_future(aio.adipole(rec=[1000, 0, 300], **INP))
+        task2 = asyncio.ensure_future(aio.adipole(rec=[2000, 0, 300], **INP))
+        await asyncio.sleep(0)
+        task1.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task1
+        return await task2
+    out = asyncio.run(main())
+    assert_allclose(out, empymod.dipole(rec=[2000, 0, 300], **INP))
+
+
+def test_configure():
+    recs = [[1000+i*100, 0, 300] for i in range(6)]
+    orig = [empymod.dipole(rec=rec, **INP) for rec in recs]
+    try:
+        # Backpressure of one, no coalescing
+        aio.configure(max_workers=2, max_pending=1, coalesce=False)
+        assert aio._POOL['max_pending'] == 1
+        out = gather(*[aio.adipole(rec=rec, **INP) for rec in recs])
+        assert_allclose(out, orig, 1e-14, 0)
+
+        # User-provided executor
+        with ThreadPoolExecutor(2) as executor:
+            aio.configure(executor=executor)
+            assert aio._POOL['max_pending'] == 4
+            out = gather(*[aio.adipole(rec=rec, **INP) for rec in recs])
+            assert_allclose(out, orig, 1e-14, 0)
+    finally:
+        aio.configure()
+
+
+def test_all_dir():
+    assert set(aio.__all__) == set(dir(aio))
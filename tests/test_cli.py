@@ -1,12 +1,16 @@
 import os
+import json
 import pytest
+import threading
+import urllib.error
+import urllib.request
 import numpy as np
 from os.path import join
 from numpy.testing import assert_allclose
 from contextlib import ContextDecorator
 
 import empymod
-from empymod.__main__ import run
+from empymod.__main__ import run, batch, _get_server
 
 
 class disable_numba(ContextDecorator):
@@ -165,6 +169,209 @@ class TestRun:
             run(args_dict)
 
 
+def _kill_worker():
+    os._exit(1)
+
+
+class TestBatch:
+
+    inp = {
+        'src': [0, 0, 100],
+        'rec': [[1000, 2000], [0, 0], 200],
+        'depth': [0, 150],
+        'res': [2e14, 1, 10],
+        'freqtime': [1, 10],
+    }
+
+    def args(self, tmpdir, inp, **kwargs):
+        return {'input': inp, 'output': join(tmpdir, 'out'), 'workers': 1,
+                'batch_routine': 'dipole', 'format': 'npy', **kwargs}
+
+    def status(self, tmpdir):
+        with open(join(tmpdir, 'out', 'status.jsonl'), 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_directory(self, tmpdir, capsys):
+        os.mkdir(join(tmpdir, 'in'))
+        for i in range(3):
+            empymod.io.save_input(join(tmpdir, 'in', f'm{i}.json'),
+                                  {**self.inp, 'res': [2e14, 1, 10+i]})
+
+        _, _ = capsys.readouterr()
+        assert batch(self.args(tmpdir, join(tmpdir, 'in'), workers=2)) is None
+        out, _ = capsys.readouterr()
+        assert "3 job(s) on 2 worker(s); 0 failed" in out
+
+        status = self.status(tmpdir)
+        assert [s['id'] for s in status] == ['m0', 'm1', 'm2']
+        for i, s in enumerate(status):
+            assert s['status'] == 'ok'
+            assert s['time'] > 0
+            out = empymod.io.load_data(s['output'])
+            orig = empymod.dipole(**{**self.inp, 'res': [2e14, 1, 10+i]},
+                                  verb=0)
+            assert_allclose(np.squeeze(out), orig)
+
+    def test_rerun(self, tmpdir):
+        # Output directory = input directory; the `.npy.json` sidecars of the
+        # outputs are no jobs, also not in a second run.
+        empymod.io.save_input(join(tmpdir, 'm0.json'), self.inp)
+        args = self.args(tmpdir, str(tmpdir), output=str(tmpdir))
+        for _ in range(2):
+            assert batch(args) is None
+            with open(join(tmpdir, 'status.jsonl'), 'r') as f:
+                status = [json.loads(line) for line in f]
+            assert [s['id'] for s in status] == ['m0']
+        assert os.path.isfile(join(tmpdir, 'm0.npy.json'))
+
+    def test_manifest(self, tmpdir):
+        empymod.io.save_input(join(tmpdir, 'm0.json'), self.inp)
+        jobs = [
+            {'input': 'm0.json'},
+            {'id': 'inline', 'routine': 'bipole', 'output': 'bip.json',
+             'input': {**self.inp, 'src': [0, 0, 100, 0, 0],
+                       'rec': [1000, 0, 200, 0, 0], 'verb': 3}},
+            {'id': 'wrong', 'input': {**self.inp, 'res': [1, 2]}},
+            {'id': 'unknown', 'routine': 'tem', 'input': self.inp},
+        ]
+        with open(join(tmpdir, 'jobs.jsonl'), 'w') as f:
+            for job in jobs:
+                f.write(json.dumps(job) + '\n\n')
+
+        msg = batch(self.args(tmpdir, join(tmpdir, 'jobs.jsonl')))
+        assert "2 of 4 job(s) failed" in msg
+
+        status = self.status(tmpdir)
+        assert [s['id'] for s in status] == ['m0', 'inline', 'wrong',
+                                             'unknown']
+        assert [s['status'] for s in status] == ['ok', 'ok', 'error',
+                                                 'error']
+        assert status[1]['output'].endswith('bip.json')
+        assert "empymod END" in status[1]['log']
+        assert "Parameter res has wrong shape" in status[2]['error']
+        assert "Unknown routine 'tem'" in status[3]['error']
+        assert_allclose(np.squeeze(empymod.io.load_data(status[0]['output'])),
+                        empymod.dipole(**self.inp, verb=0))
+
+    def test_broken_pool(self, tmpdir, monkeypatch):
+        # Workers die at start-up: all jobs are recorded as failed.
+        monkeypatch.setattr(empymod.__main__, '_init_worker', _kill_worker)
+        os.mkdir(join(tmpdir, 'in'))
+        for i in range(2):
+            empymod.io.save_input(join(tmpdir, 'in', f'm{i}.json'), self.inp)
+
+        msg = batch(self.args(tmpdir, join(tmpdir, 'in'), workers=2))
+        assert "2 of 2 job(s) failed" in msg
+
+        status = self.status(tmpdir)
+        assert [s['id'] for s in status] == ['m0', 'm1']
+        for s in status:
+            assert s['status'] == 'error'
+            assert "BrokenProcessPool" in s['error']
+
+    def test_errors(self, tmpdir):
+        with pytest.raises(ValueError, match="requires an output directory"):
+            batch(self.args(tmpdir, str(tmpdir), output=None))
+
+        with pytest.raises(ValueError, match="No jobs found"):
+            batch(self.args(tmpdir, str(tmpdir)))
+
+        with pytest.raises(FileNotFoundError, match="No such file"):
+            batch(self.args(tmpdir, join(tmpdir, 'jobs.jsonl')))
+
+        empymod.io.save_input(join(tmpdir, 't.json'), self.inp)
+        with pytest.raises(ValueError, match="must be a directory or a JSON"):
+            batch(self.args(tmpdir, join(tmpdir, 't.json')))
+
+        fname = join(tmpdir, 'jobs.jsonl')
+        with open(fname, 'w') as f:
+            f.write('{"input": "t.json"}\n{"input": "t.json"}\n')
+        with pytest.raises(ValueError, match="duplicate: \\['t'\\]"):
+            batch(self.args(tmpdir, fname))
+
+        with open(fname, 'w') as f:
+            f.write('{"id": "t"}\n')
+        with pytest.raises(ValueError, match="must be a JSON object with key"):
+            batch(self.args(tmpdir, fname))
+
+        with open(fname, 'w') as f:
+            f.write('{"input": \n')
+        with pytest.raises(ValueError, match="Invalid JSON in line 1"):
+            batch(self.args(tmpdir, fname))
+
+
+def test_serve(tmpdir, capsys):
+    server = _get_server('127.0.0.1', 0, 2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://{}:{}/'.format(*server.server_address[:2])
+
+    def request(path, data=None):
+        req = urllib.request.Request(url+path, data=data)
+        try:
+            with urllib.request.urlopen(req) as f:
+                return f.status, json.loads(f.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    try:
+        # Health
+        code, out = request('health')
+        assert code == 200
+        assert out['status'] == 'ok'
+        assert 'empymod v' in out['version']
+
+        # Compute, also concurrently
+        inp = {'src': [0, 0, 100], 'rec': [[1000, 2000], [0, 0], 200],
+               'depth': [0, 150], 'res': [2e14, 1, 10], 'freqtime': [1, 10]}
+        orig = empymod.dipole(**inp, verb=0)
+        out = []
+        body = json.dumps(inp).encode()
+        threads = [threading.Thread(
+            target=lambda: out.append(request('dipole', body)))
+            for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(out) == 4
+        for code, res in out:
+            assert code == 200
+            assert res['shape'] == '(2, 2, 1)'
+            data = np.array(res['data'])
+            assert_allclose(np.squeeze(data[0]+1j*data[1]), orig)
+
+        # Verbosity is enforced to 0
+        _, _ = capsys.readouterr()
+        code, _ = request('dipole', json.dumps({**inp, 'verb': 4}).encode())
+        assert code == 200
+        assert capsys.readouterr()[0] == ''
+
+        # Errors
+        code, out = request('dipole', b'{"res": 1}')
+        assert code == 400
+        assert "missing 4 required positional" in out['error']
+        code, out = request('dipole', b'[1]')
+        assert code == 400
+        assert "must be a JSON object" in out['error']
+        fname = join(str(tmpdir), 'out.npy')
+        body = json.dumps({**inp, 'outfile': fname}).encode()
+        code, out = request('bipole', body)
+        assert code == 400
+        assert "Unsupported parameter(s) for 'bipole': ['outfile']" in (
+                out['error'])
+        assert os.listdir(str(tmpdir)) == []
+        code, out = request('tem', b'{}')
+        assert code == 404
+        assert "Unknown routine 'tem'" in out['error']
+        code, out = request('wrong')
+        assert code == 404
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
 # @pytest.mark.xfail(reason="just to keep an eye on it", strict=False)
 @disable_numba()
 @pytest.mark.script_launch_mode('subprocess')
@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+
+from empymod.scripts import filterbench
+
+
+def test_hankel(capsys):
+    res = filterbench.hankel(filters=['key_101_2009'], models=['halfspace'],
+                             repeat=1, verb=2)
+    out, _ = capsys.readouterr()
+    assert 'key_101_2009' in out
+    assert [r['variant'] for r in res] == ['standard', 'lagged', 'splined']
+
+    nfreq = len(filterbench.HANKEL_MODELS['halfspace']['freq'])
+    noff = filterbench.HANKEL_MODELS['halfspace']['off'].size
+    for r in res:
+        assert r['transform'] == 'hankel'
+        assert r['nfreq'] == nfreq
+        assert r['runtime'] > 0
+        assert list(r['errors']) == ['p50', 'p90', 'p99', 'max']
+
+    assert res[0]['errors']['p50'] < 1e-2
+    # Standard DLF: 101 wavenumbers per offset and frequency.
+    assert res[0]['kernel_evals'] == nfreq*noff*101
+    assert res[1]['kernel_evals'] < res[0]['kernel_evals']
+
+
+def test_fourier():
+    res = filterbench.fourier(filters=['key_81_2009'], models=['fullspace'],
+                              variants=('standard', 'lagged'),
+                              percentiles=(50, ), repeat=1, verb=0)
+    assert len(res) == 2
+    noff = filterbench.FOURIER_MODELS['fullspace']['off'].size
+    for r in res:
+        assert r['transform'] == 'fourier'
+        assert r['kernel_evals'] == r['nfreq']*noff
+        assert list(r['errors']) == ['p50', 'max']
+        assert r['errors']['p50'] < 1e-3
+
+    # The lagged DLF requires fewer frequencies.
+    assert res[1]['nfreq'] < res[0]['nfreq']
+
+
+def test_table():
+    res = filterbench.fourier(filters=['key_81_2009'],
+                              models=['fullspace', 'halfspace'],
+                              variants=('lagged', ), repeat=1, verb=0)
+    out = filterbench.table(res)
+    assert out.count('\n') == 4
+    assert 'halfspace' in out
+
+    out = filterbench.table(res, by_model=False)
+    assert out.count('\n') == 3
+    assert 'all' in out
+    assert str(res[0]['nfreq'] + res[1]['nfreq']) in out
+
+    assert filterbench.table([]) == ''
+
+
+def test_errors():
+    out = filterbench._errors([1, 2, 3.3], np.array([1, 2, 3]), (50, ))
+    assert out['p50'] == 0
+    assert np.isclose(out['max'], 0.1)
+
+    with pytest.raises(ValueError, match='Variant must be one of'):
+        filterbench.hankel(variants=('cubic', ), verb=0)
+
+
+def test_all_dir():
+    assert set(filterbench.__all__) == set(dir(filterbench))
@@ -1,3 +1,6 @@
+import os
+import json
+
 import pytest
 import numpy as np
 from numpy.testing import assert_allclose
@@ -88,6 +91,12 @@ class TestSaveLoadData:
             assert str(orig.dtype) in text
             assert 'Additional info' in text
 
+            # Meta information as returned by load_data
+            _, meta = io.load_data(tmpdir+'test.'+ending, meta=True)
+            assert list(meta) == ['date', 'version', 'shape', 'dtype', 'info']
+            assert meta['shape'] == '(4, 7, 3)'
+            assert meta['info'] == 'Additional info'
+
     def test_text(self, tmpdir):
 
         # Compute
@@ -97,6 +106,51 @@ class TestSaveLoadData:
         io.save_data(tmpdir+'test.txt', orig)
         io.save_data(tmpdir+'test.json', orig)
 
+    def test_binary(self, tmpdir):
+
+        # Compute
+        orig = empymod.dipole(**self.inp, freqtime=[0.1, 1, 10, 100])
+
+        # Save
+        io.save_data(tmpdir+'test.npy', orig, info='Additional info')
+        io.save_data(tmpdir+'test.npz', orig, info='Additional info')
+
+        # Load
+        orig_npy = io.load_data(tmpdir+'test.npy')
+        orig_npz = io.load_data(tmpdir+'test.npz')
+        orig_mmap = io.load_data(tmpdir+'test.npy', mmap_mode='r')
+
+        # Compare numbers; binary formats are exact
+        assert_allclose(orig, orig_npy, 0, 0)
+        assert_allclose(orig, orig_npz, 0, 0)
+        assert_allclose(orig, orig_mmap, 0, 0)
+        assert isinstance(orig_mmap, empymod.utils.EMArray)
+        assert_allclose(orig_mmap.amp(), orig.amp(), 0, 0)
+
+        # Memory-mapped data is read-only and not owned
+        assert not orig_mmap.flags.owndata
+        assert not orig_mmap.flags.writeable
+
+        # Ensure the meta information
+        with open(tmpdir+'test.npy.json', 'r') as f:
+            meta = json.load(f)
+        with np.load(str(tmpdir)+'test.npz') as f:
+            meta_npz = {k: str(f[k]) for k in f.files if k != 'data'}
+
+        assert meta.keys() == meta_npz.keys()
+        assert 'empymod v' in meta['version']
+        assert meta['shape'] == meta_npz['shape'] == '(4, 7, 3)'
+        assert meta['dtype'] == meta_npz['dtype'] == str(orig.dtype)
+        assert meta['info'] == meta_npz['info'] == 'Additional info'
+
+        # Meta information as returned by load_data
+        for ending, ref in zip(['npy', 'npz'], [meta, meta_npz]):
+            data, out = io.load_data(tmpdir+'test.'+ending, meta=True)
+            assert_allclose(orig, data, 0, 0)
+            assert out == ref
+        os.remove(tmpdir+'test.npy.json')
+        assert io.load_data(tmpdir+'test.npy', meta=True)[1] == {}
+
     def test_errors(self, tmpdir):
 
         with pytest.raises(ValueError, match="must be 3D"):
@@ -108,6 +162,39 @@ class TestSaveLoadData:
         with pytest.raises(ValueError, match="Unknown extension '.abc'"):
             io.load_data(tmpdir+'/test.abc')
 
+        with pytest.raises(ValueError, match="only implemented for '.npy'"):
+            io.load_data(tmpdir+'/test.npz', mmap_mode='r')
+
+        with pytest.raises(TypeError, match="Unexpected \\*\\*kwargs for"):
+            io.save_data(tmpdir+'/test.npz', np.ones((1, 1, 1)), fmt='%f')
+
+
+def test_create_data(tmpdir):
+    fname = str(tmpdir)+'/test.npy'
+
+    # Fill the pre-allocated file block by block; unfilled blocks are zero
+    data = io.create_data(fname, (2, 3, 4), info='Additional info')
+    view = data.reshape((2, -1), order='F')
+    view[:, :3] = 1+1j
+    data.flush()
+    out = io.load_data(fname, mmap_mode='r')
+    assert out.dtype == np.complex128
+    assert_allclose(out[:, :, 0], 1+1j)
+    assert_allclose(out[:, :, 1:], 0)
+
+    # Meta information
+    with open(fname+'.json', 'r') as f:
+        meta = json.load(f)
+    assert meta['shape'] == '(2, 3, 4)'
+    assert meta['dtype'] == 'complex128'
+    assert meta['info'] == 'Additional info'
+
+    # Errors
+    with pytest.raises(ValueError, match="must be 3D"):
+        io.create_data(fname, (2, 3))
+    with pytest.raises(ValueError, match="only implemented for '.npy'"):
+        io.create_data(str(tmpdir)+'/test.npz', (2, 3, 4))
+
 
 def test_ComplexNumPyEncoder():
 
@@ -66,6 +66,74 @@ def test_greenfct(njit):                                          # 2. greenfct
             assert_allclose(out[1], val[i+1][1])
 
 
+def test_greenfct_isotropic():
+    # Isotropic models share Gamma between TM and TE; compare to a minimally
+    # anisotropic model, which goes through the general path.
+    lambd = np.logspace(-3, 1, 21)[None, :]
+    inp = (np.array(-30.), np.array(60.), np.array(1), np.array(2),
+           np.array([-np.inf, 0, 50]))
+    freq = np.array([1., 100.])
+    etaH = np.array([[1e-14, 1/20, 1/200]]) + 2j*np.pi*freq[:, None]*8.85e-12
+    zetaH = 2j*np.pi*freq[:, None]*4e-7*np.pi*np.ones((1, 3))
+    for ab in [11, 16, 33]:
+        iso = kernel.greenfct(*inp, etaH, etaH, zetaH, zetaH, lambd, ab,
+                              False, False, False)
+        aniso = kernel.greenfct(*inp, etaH, etaH*(1+1e-14), zetaH, zetaH,
+                                lambd, ab, False, False, False)
+        assert_allclose(iso[0], aniso[0], rtol=1e-8, atol=1e-300)
+        assert_allclose(iso[1], aniso[1], rtol=1e-8, atol=1e-300)
+
+    # Gamma with and without the isotropic shortcut
+    assert_allclose(kernel._gamma(etaH, etaH, zetaH, lambd, True),
+                    kernel._gamma(etaH, etaH, zetaH, lambd, False))
+
+
+def test_greenfct_top_layer():
+    # Receiver in the first layer, source below: the exponential factor of
+    # the receiver layer must not be computed with its infinite thickness,
+    # which yields NaN in compiled code.
+    lambd = np.logspace(-3, 1, 21)[None, :]
+    freq = np.array([1., 100.])
+    etaH = np.array([[1e-14, 1/20, 1/200]]) + 2j*np.pi*freq[:, None]*8.85e-12
+    zetaH = 2j*np.pi*freq[:, None]*4e-7*np.pi*np.ones((1, 3))
+    inp = (np.array(30.), np.array(-5.), np.array(1), np.array(0),
+           np.array([-np.inf, 0, 50]), etaH, etaH, zetaH, zetaH, lambd)
+    for ab in [11, 13, 33]:
+        out = kernel.greenfct(*inp, ab, False, False, False)
+        pyout = kernel.greenfct.py_func(*inp, ab, False, False, False)
+        assert np.all(np.isfinite(out[0]))
+        assert_allclose(out[0], pyout[0])
+        assert_allclose(out[1], pyout[1])
+
+
+def test_greenfct_stream():
+    # Layer-streaming version yields the same as the array version
+    dat = DATAKERNEL['green'][()]
+    for _, val in dat.items():
+        for i in [3, 5, 7]:
+            inp = {'ab': val[0], 'msrc': val[1], 'mrec': val[2], **val[i]}
+            out = kernel._greenfct_stream(**inp)
+            assert_allclose(out[0], val[i+1][0], rtol=1e-10, atol=1e-300)
+            assert_allclose(out[1], val[i+1][1], rtol=1e-10, atol=1e-300)
+
+    # Many layers (streaming) vs few layers (arrays): splitting the layers
+    # into several layers of the same properties does not change the result
+    lambd = np.logspace(-3, 1, 21)[None, :]
+    freq = np.array([1., 100.])
+    depth = np.r_[-np.inf, 0, 50, 100]
+    res = np.array([2e14, 10, 100, 1])
+    fdepth = np.r_[-np.inf, np.linspace(0, 100, 51)]
+    fres = np.r_[2e14, np.full(25, 10), np.full(25, 100), 1]
+    out = []
+    for d, r in [(depth, res), (fdepth, fres)]:
+        etaH = 1/r + 2j*np.pi*freq[:, None]*8.85e-12
+        zetaH = 2j*np.pi*freq[:, None]*4e-7*np.pi*np.ones((1, r.size))
+        lsrc, lrec = np.where(d < 20)[0][-1], np.where(d < 80)[0][-1]
+        out.append(kernel.wavenumber(20, 80, lsrc, lrec, d, etaH, etaH, zetaH,
+                                     zetaH, lambd, 13, False, False, False))
+    assert_allclose(out[1][1], out[0][1], rtol=1e-10)
+
+
 @pytest.mark.parametrize("njit", [True, False])
 def test_reflections(njit):                                    # 3. reflections
     if njit:
@@ -97,6 +165,22 @@ def test_fields(njit):                                              # 4. fields
             assert_allclose(Pd, val[i+1][1])
 
 
+def test_loop_wavenumber():
+    # Vertical magnetic dipole kernel, divided by the wavenumber.
+    lambd = np.logspace(-3, 1, 21)[None, :]
+    inp = (np.array(-30.), np.array(-20.), np.array(0), np.array(0),
+           np.array([-np.inf, 0, 50]))
+    freq = np.array([1., 100.])
+    etaH = np.array([[1e-14, 1/20, 1/200]]) + 2j*np.pi*freq[:, None]*8.85e-12
+    zetaH = 2j*np.pi*freq[:, None]*4e-7*np.pi*np.ones((1, 3))
+    PJ0, _, _ = kernel.wavenumber(*inp, etaH, etaH, zetaH, zetaH, lambd, 33,
+                                  False, True, True)
+    out = kernel.loop_wavenumber(*inp, etaH, etaH, zetaH, zetaH, lambd, False)
+    assert out[0] is None
+    assert out[2] is None
+    assert_allclose(out[1], PJ0/lambd)
+
+
 def test_angle_factor():                                      # 5. angle_factor
     dat = DATAKERNEL['angres'][()]
     for ddat in dat:
@@ -172,5 +256,65 @@ def test_halfspace():                                            # 7. halfspace
     assert_allclose(direct, hs_res, atol=1e-2)
 
 
+def test_mt_impedance():
+    # Half-space: Z = sqrt(i omega mu rho); stacked models with thicknesses.
+    freq = np.array([0.1, 10.])
+    zeta = 2j*np.pi*freq*4e-7*np.pi
+    res = np.array([[10., 10.], [100., 100.]])
+    Z = kernel.mt_impedance(np.array([[50.]]), res, np.zeros((2, 2)),
+                            np.ones((2, 2)), freq)
+    assert_allclose(Z, np.sqrt(zeta*res[:, :1]))
+
+    # Two layers: thin resistive layer above conductor, per-model thickness
+    res = np.array([[100., 1.], [100., 1.]])
+    Z = kernel.mt_impedance(np.array([[1e-3], [1e5]]), res, np.zeros((2, 2)),
+                            np.ones((2, 2)), freq)
+    assert_allclose(Z[0], np.sqrt(zeta*1.), rtol=1e-4)
+    assert_allclose(Z[1], np.sqrt(zeta*100.), rtol=1e-4)
+
+
+def test_dc_wavenumber():
+    # Buried source and receiver in a half-space: direct and image potential
+    depth = np.array([-np.inf, 0.])
+    res = np.array([2e14, 100.])
+    aniso = np.ones(2)
+    lambd = np.logspace(-3, 0, 4)[None, :]
+    for zsrc, zrec in [(5., 12.), (12., 5.)]:
+        PJ0 = kernel.dc_wavenumber(zsrc, zrec, 1, 1, depth, res, aniso,
+                                   lambd, False)
+        assert_allclose(PJ0[0], 100/(4*np.pi)*(
+            np.exp(-lambd*7) + np.exp(-lambd*17)))
+
+        # Without direct potential
+        PJ0 = kernel.dc_wavenumber(zsrc, zrec, 1, 1, depth, res, aniso,
+                                   lambd, True)
+        assert_allclose(PJ0[0], 100/(4*np.pi)*np.exp(-lambd*17))
+
+    # Same, through additional interfaces with the same resistivity
+    depth = np.array([-np.inf, 0., 10., 20.])
+    res = np.array([2e14, 100., 100., 100.])
+    aniso = np.ones(4)
+    for zsrc, zrec, lsrc, lrec in [(1., 40., 1, 3), (40., 1., 3, 1)]:
+        PJ0 = kernel.dc_wavenumber(zsrc, zrec, lsrc, lrec, depth, res, aniso,
+                                   lambd, True)
+        assert_allclose(PJ0[0], 100/(4*np.pi)*(
+            np.exp(-lambd*39) + np.exp(-lambd*41)))
+
+
+def test_dc_direct():
+    # VTI full-space
+    off = np.array([1., 10.])
+    depth = np.array([-np.inf])
+    phi = kernel.dc_direct(off, 0., 3., 0, depth, np.array([10.]),
+                           np.array([1.5]))
+    assert_allclose(phi, 15/(4*np.pi*np.sqrt(off**2 + 1.5**2*9)))
+
+    # Source at the surface of a half-space
+    depth = np.array([-np.inf, 0.])
+    phi = kernel.dc_direct(off, 0., 0., 0, depth, np.array([2e14, 10.]),
+                           np.array([1., 1.]))
+    assert_allclose(phi, 10/(2*np.pi*off))
+
+
 def test_all_dir():
     assert set(kernel.__all__) == set(dir(kernel))
@@ -1,12 +1,13 @@
 import pytest
 import numpy as np
+import scipy as sp
 from scipy.special import erf
 from os.path import join, dirname
 from numpy.testing import assert_allclose
 
 # Import main modelling routines from empymod directly to ensure they are in
 # the __init__.py-file.
-from empymod import model
+from empymod import io, model, utils, transform
 from empymod import bipole, dipole, analytical, loop
 # Import rest from model
 from empymod.model import gpr, dipole_k, fem, tem
@@ -298,6 +299,14 @@ class TestBipole:
         assert "Loop over       :  Frequencies" in out
         assert_allclose(dlf, dlf3, rtol=1e-3)
 
+        dlf4 = bipole(ht='dlf', htarg={'dlf': 'auto', 'rtol': 1e-4}, verb=3,
+                      **inp)
+        out, _ = capsys.readouterr()
+        assert "     > Filter      :  auto" in out
+        assert "Hankel (auto)   :  DLF" in out
+        assert "Loop over       :  Frequencies" in out
+        assert_allclose(dlf, dlf4, rtol=1e-3)
+
         qwe = bipole(ht='qwe', htarg={'pts_per_dec': 0}, verb=3, **inp)
         out, _ = capsys.readouterr()
         assert "Hankel          :  Quadrature-with-Extrapolation" in out
@@ -339,6 +348,91 @@ class TestBipole:
         assert "Fourier         :  Fast Fourier Transform FFT" in out
         assert_allclose(fft, ftl, 1e-1, 1e-13, equal_nan=True)
 
+    def test_adaptive(self, capsys):
+        # Adaptive frequency sampling versus computing all frequencies
+        inp = {'depth': [0, 300], 'res': [1e12, 1/3, 5],
+               'freqtime': np.logspace(-1.5, 1, 20),
+               'rec': [2000, 300, 280, 0, 0], 'src': [0, 0, 250, 0, 0]}
+
+        for signal in [0, 1, -1]:
+            for ft in ['dlf', 'fftlog']:
+                full = bipole(signal=signal, ft=ft, **inp)
+                adpt = bipole(signal=signal, ft=ft, ftarg={'adaptive': 1e-4},
+                              **inp)
+                assert_allclose(adpt, full, 1e-3, 1e-3*abs(full).max())
+
+        _, _ = capsys.readouterr()
+        _ = bipole(signal=0, ftarg={'adaptive': 1e-3}, verb=3, **inp)
+        out, _ = capsys.readouterr()
+        assert "     > adaptive    :  rtol = 0.001" in out
+        assert " frequencies computed" in out
+
+        # Loop over frequencies, and frequency domain (no effect)
+        full = loop(signal=0, **inp)
+        adpt = loop(signal=0, ftarg={'adaptive': 1e-4}, **inp)
+        assert_allclose(adpt, full, 1e-3, 1e-3*abs(full).max())
+        full = bipole(**inp)
+        adpt = bipole(ftarg={'adaptive': 1e-4}, **inp)
+        assert_allclose(adpt, full)
+
+    def test_waveform(self):
+        inp = {'depth': [0, 500], 'res': [1e12, 1, 10],
+               'freqtime': np.logspace(-2, 1, 10),
+               'rec': [1000, 0, 300, 0, 0], 'src': [0, 0, 250, 0, 0]}
+
+        # Switch-off after long switch-on, short ramps; corresponds to the
+        # switch-on response at t+100 s minus the one at t.
+        wave = {'time': [-100, -100+1e-9, 0, 1e-9], 'current': [0, 1, 1, 0]}
+        wf = bipole(waveform=wave, **inp)
+        on = bipole(signal=1, **inp)
+        on100 = bipole(signal=1, **{**inp, 'freqtime': inp['freqtime']+100})
+        assert_allclose(wf, on100 - on, 5e-3)
+
+        # Short ramp-on through loop corresponds to switch-on response
+        wf2 = loop(waveform={'time': [0, 1e-9], 'current': [0, 1]}, **inp)
+        assert_allclose(wf2, loop(signal=1, **inp), 1e-4)
+
+        # Through model.tem
+
+        wave = utils.check_waveform(wave, inp['freqtime'], 0)
+        _, freq, ft, ftarg = utils.check_time(wave['qtime'], 1, 'dlf', {}, 0)
+        fEM = bipole(**{**inp, 'freqtime': freq})
+        tEM, _ = tem(fEM[:, None], np.array([1]), freq, wave['qtime'], 1, ft,
+                     ftarg, waveform=wave)
+        assert_allclose(tEM[:, 0], wf)
+
+    def test_instrument(self):
+        inp = {'depth': [0, 500], 'res': [1e12, 1, 10],
+               'rec': [1000, 0, 300, 0, 0], 'src': [0, 0, 250, 0, 0]}
+
+        # Lowpass filters are applied in the frequency domain
+        freq = np.logspace(-1, 3, 5)
+        lowpass = [(10, 2), 50]
+        resp = transform.get_lowpass_response(freq, [(10, 2), (50, 1)])
+        assert_allclose(bipole(freqtime=freq, lowpass=lowpass, **inp),
+                        bipole(freqtime=freq, **inp)*resp)
+        assert_allclose(loop(freqtime=freq, lowpass=lowpass, **inp),
+                        loop(freqtime=freq, **inp)*resp)
+
+        # Gate averages, compared to trapezoidal integration
+        time = np.array([0.15, 0.3, 1.5])
+        gates = np.array([[0.1, 0.2], [0.2, 0.4], [1, 2]])
+        gavg = bipole(freqtime=time, signal=0, gates=gates, **inp)
+        for i, gate in enumerate(gates):
+            dense = np.linspace(*gate, 301)
+            resp = bipole(freqtime=dense, signal=0, **inp)
+            mean = sp.integrate.trapezoid(resp, dense)/np.diff(gate)
+            assert_allclose(gavg[i], mean, rtol=1e-4)
+
+        # Gates with waveform, through loop
+        wave = {'time': [-1, -0.9, 0, 0.01], 'current': [0, 1, 1, 0]}
+        gavg = loop(freqtime=time, waveform=wave, gates=gates, **inp)
+        for i, gate in enumerate(gates):
+            dense = np.linspace(*gate, 301)
+            resp = loop(freqtime=dense, waveform=wave, **inp)
+            mean = sp.integrate.trapezoid(resp, dense)/np.diff(gate)
+            assert_allclose(gavg[i], mean, rtol=5e-3)
+
     def test_example_wrong(self):
         # One example of wrong input. But inputs are checked in test_utils.py.
         with pytest.raises(ValueError, match="Parameter src has wrong length"):
@@ -610,6 +704,41 @@ class TestBipole:
         assert_allclose(efield/5, ecurr)
         assert "* WARNING :: `etaH != etaV` at receiver level, " in out
 
+    def test_outfile(self, tmpdir):
+        # Streaming to disk must give the same result for all four src-rec
+        # block layouts, in the frequency and time domain.
+        inp = {'depth': [0, 300, 1000], 'res': [2e14, 0.3, 1, 50],
+               'verb': 1}
+        srcs = [[[0, 0], [0, 100], [200, 210], 0, 0],
+                [[0, 0, 100], [0, 100, 0], 200, 0, 0]]
+        recs = [[[1000, 2000], [0, 0], [300, 310], 0, 0],
+                [np.arange(1, 6)*1000, np.zeros(5), 300, 0, 0]]
+        times = {'freqtime': [0.5, 1, 2], 'signal': -1}
+        gates = {'gates': [[0.4, 0.6], [0.9, 1.1], [1.8, 2.2]], **times}
+        fname = str(tmpdir)+'/test.npy'
+        for src in srcs:
+            for rec in recs:
+                for kw in [{'freqtime': [0.1, 1, 10]}, times, gates]:
+                    orig = bipole(src, rec, **inp, **kw)
+                    strm = bipole(src, rec, **inp, **kw, outfile=fname)
+                    assert isinstance(strm, utils.EMArray)
+                    assert_allclose(strm, orig, 1e-12, 0)
+                    data = io.load_data(fname, mmap_mode='r')
+                    assert data.shape == (3, len(rec[0]), len(src[0]))
+                    assert_allclose(np.squeeze(data), orig, 1e-12, 0)
+
+        # Bipoles with several integration points
+        inp.update({'src': [[-50, 0], [50, 10], [0, 0], [0, 5], 200, 210],
+                    'rec': [np.arange(1, 6)*1000, np.zeros(5), 300, 20, 5],
+                    'srcpts': 3, 'recpts': 2, 'freqtime': [0.1, 1]})
+        orig = bipole(**inp, squeeze=False)
+        strm = bipole(**inp, squeeze=False, outfile=fname)
+        assert_allclose(strm, orig, 1e-12, 0)
+
+        # Only .npy
+        with pytest.raises(ValueError, match="only implemented for '.npy'"):
+            bipole(**inp, outfile=str(tmpdir)+'/test.npz')
+
 
 def test_dipole():
     # As this is a subset of bipole, just run two tests to ensure
@@ -936,6 +1065,75 @@ class TestLoop:
         zetaloo = loop(res=zeta, mpermH=fact, mpermV=fact, **model)
         assert_allclose(zetabip, zetaloo)
 
+    def test_finite(self, capsys):
+        # Finite, horizontal loops, compared to dipoles distributed over the
+        # loop area.
+        depth = [0, 50]
+        res = [2e14, 20, 200]
+        freq = [1e-3, 10, 1e3, 1e5]
+        src = [0, 0, -30, 0, 90]
+        rec = [[0, 3, 15], [0, 2, 0], -20, 0, 90]
+
+        # Central loop in the quasi-static limit: H = I/(2a)
+        _, _ = capsys.readouterr()
+        circ = loop(src, [0, 0, -30, 0, 90], depth, res, freq, verb=3,
+                    loop_radius=10)
+        out, _ = capsys.readouterr()
+        assert_allclose(circ[0], 0.05, rtol=1e-6)
+        assert "Finite loop     :  circular; radius = 10.0 m" in out
+        assert "> area   [m2] :  314.159" in out
+        assert "1 kernel call(s)" in out
+
+        # Square loop; midpoint rule for the dipoles
+        x = np.linspace(-5, 5, 41)
+        x, y = np.meshgrid((x[1:] + x[:-1])/2, (x[1:] + x[:-1])/2)
+        vertices = [[-5, -5], [-5, 5], [5, 5], [5, -5]]
+        squa = loop(src, rec, depth, res, freq, loop_vertices=vertices)
+        for i in range(3):
+            dip = loop([x.ravel(), y.ravel(), -30, 0, 90],
+                       [rec[0][i], rec[1][i], -20, 0, 90], depth, res, freq)
+            assert_allclose(squa[:, i], dip.sum(1)*0.0625, rtol=5e-3)
+
+        # Circle with polygon of many vertices (same area); several
+        # frequencies, strength, opposite receiver, and receiver loop; lagged
+        # DLF.
+        ang = np.linspace(0, 2*np.pi, 361)[:-1]
+        rad = 10*np.sqrt(2*np.pi/360/np.sin(2*np.pi/360))
+        vertices = np.c_[rad*np.cos(ang), rad*np.sin(ang)]
+        rec = [[0, 3, 15], [0, 2, 0], [-20, -20, 10], 0, -90]
+        inp = {'src': src, 'rec': rec, 'depth': depth, 'res': res,
+               'freqtime': freq, 'mrec': 'loop', 'strength': 2.0,
+               'htarg': {'pts_per_dec': -1}}
+        circ = loop(**inp, loop_radius=10)
+        poly = loop(**inp, loop_vertices=vertices)
+        assert_allclose(circ, poly, rtol=1e-4)
+        circ = loop(**{**inp, 'rec': [15, 0, 10, 0, 90], 'strength': 0},
+                    loop_radius=10)
+        assert_allclose(-circ, poly[:, 2]/2, rtol=1e-4)
+
+        # Lagged and splined DLF (one frequency after the other) versus the
+        # standard DLF, for several frequencies and times.
+        model = {'src': src, 'rec': rec, 'depth': depth, 'res': res,
+                 'mrec': True}
+        for freqtime in [{'freqtime': freq},
+                         {'freqtime': [1e-4, 1e-3, 1e-2], 'signal': -1}]:
+            std = loop(**model, **freqtime, loop_radius=10)
+            for pts_per_dec in [-1, 20]:
+                out = loop(**model, **freqtime, loop_radius=10,
+                           htarg={'pts_per_dec': pts_per_dec})
+                assert_allclose(out, std, rtol=2e-3, atol=1e-14)
+
+        # Errors
+        with pytest.raises(ValueError, match="either <loop_radius> or"):
+            loop(**inp, loop_radius=10, loop_vertices=vertices)
+        with pytest.raises(ValueError, match="must be horizontal"):
+            loop(**{**inp, 'src': [0, 0, -30, 0, 0]}, loop_radius=10)
+        with pytest.raises(ValueError, match="vertical magnetic receivers"):
+            loop(**{**inp, 'mrec': False}, loop_radius=10)
+        with pytest.raises(ValueError, match="adaptive frequency sampling"):
+            loop(**{**inp, 'signal': -1}, loop_radius=10,
+                 ftarg={'adaptive': 1e-4})
+
 
 def test_analytical():
     # 1. fullspace
@@ -1133,6 +1331,180 @@ def test_ip_and_q(capsys):
     out, _ = capsys.readouterr()
     assert "This function is experimental" in out
 
+    # Batch: different layer parameters and heights per sounding
+    res = np.array([[2e14, 50, 0.1, 50], [2e14, 10, 1, 50],
+                    [2e14, 50, 0.1, 5], [2e14, 10, 1, 50]])
+    src = np.array([[0, 0, -1], [0, 0, -1], [0, 0, -1], [10, 0, -3]])
+    rec = src + [2, 0, 0]
+    batch = {**model1, **system, 'res': res, 'src': src, 'rec': rec}
+    IPb, Qb = model.ip_and_q(**batch, batch=True)
+    assert IPb.shape == (4, 3)
+    assert_allclose(IPb[0], IP1)
+    assert_allclose(Qb[0], Q1)
+    for i in range(1, 4):
+        IPi, Qi = model.ip_and_q(**{**batch, 'res': res[i],
+                                    'src': list(src[i]), 'rec': list(rec[i])})
+        assert_allclose(IPb[i], IPi)
+        assert_allclose(Qb[i], Qi)
+
+    # Batch: per-sounding depths
+    IPd, _ = model.ip_and_q(**{**batch, 'depth': [[0, 2, 5], [0, 3, 5]],
+                               'res': res[:2], 'src': src[:2],
+                               'rec': rec[:2]}, batch=True)
+    IPi, _ = model.ip_and_q(**{**batch, 'depth': [0, 3, 5], 'res': res[1],
+                               'src': list(src[1]), 'rec': list(rec[1])})
+    assert_allclose(IPd[1], IPi)
+
+    # Batch: z positive upwards (swapped layers), anisotropy per sounding
+    zup = {**batch, 'depth': [0, 2, 5], 'src': src*[1, 1, -1],
+           'rec': rec*[1, 1, -1], 'aniso': [[1, 1, 2, 1], [1, 3, 1, 1],
+                                            [1, 1, 1, 2], [1, 1, 1, 1]]}
+    IPu, Qu = model.ip_and_q(**zup, batch=True)
+    for i in range(4):
+        IPi, Qi = model.ip_and_q(**{**zup, 'res': res[i],
+                                    'aniso': zup['aniso'][i],
+                                    'src': list(zup['src'][i]),
+                                    'rec': list(zup['rec'][i])})
+        assert_allclose(IPu[i], IPi)
+        assert_allclose(Qu[i], Qi)
+
+    with pytest.raises(ValueError, match="has wrong number of soundings"):
+        model.ip_and_q(**{**batch, 'res': res[:2]}, batch=True)
+
+
+def test_mt(capsys):
+    # Compare to the recursion of the magnetotelluric example (z up).
+    res = np.array([2e14, 300, 2500, 0.8, 3000, 2500])
+    depth = np.array([0, -200, -600, -640, -1140])
+    freq = np.logspace(-4, 5, 31)
+    zeta = 2j*np.pi*freq*4e-7*np.pi
+    Zj = np.sqrt(zeta*res[-1])
+    for j in range(depth.size-1, 0, -1):
+        z_oj = np.sqrt(zeta*res[j])
+        Rexp = (z_oj - Zj)/(z_oj + Zj)*np.exp(
+                -2*np.sqrt(zeta/res[j])*(depth[j-1] - depth[j]))
+        Zj = z_oj*(1 - Rexp)/(1 + Rexp)
+
+    _, _ = capsys.readouterr()
+    Z, rho_a, phi_a = model.mt(depth, res, freq, epermH=0, verb=3)
+    out, _ = capsys.readouterr()
+    assert "Layers          :  5 (below surface)" in out
+    assert_allclose(Z, Zj)
+    assert_allclose(rho_a, abs(Zj)**2/(zeta.imag))
+    assert_allclose(phi_a, np.angle(Zj, deg=True))
+
+    # Same with positive z downwards
+    Z2, _, _ = model.mt(-depth, res, freq, epermH=np.zeros(6), verb=1)
+    assert_allclose(Z2, Zj)
+
+    # Half-space and full-space: rho_a = res, phi_a = 45°
+    for inp in [([0], [2e14, 10]), ([], 10)]:
+        _, rho_a, phi_a = model.mt(*inp, freq, epermH=0, verb=1)
+        assert_allclose(rho_a, 10)
+        assert_allclose(phi_a, 45)
+
+    # Stacked models, with one depth and per-model depths.
+    rng = np.random.default_rng(1)
+    stack = np.c_[np.full(4, 2e14), rng.uniform(1, 1000, (4, 5))]
+    depths = depth - rng.uniform(0, 50, (4, 1))
+    Zs, rho_as, _ = model.mt(depth, stack, freq, squeeze=False, verb=1)
+    Zd, _, _ = model.mt(depths, stack, freq, verb=1)
+    assert Zs.shape == (freq.size, 4)
+    for i in range(4):
+        assert_allclose(Zs[:, i], model.mt(depth, stack[i], freq, verb=1)[0])
+        assert_allclose(Zd[:, i], model.mt(depths[i], stack[i], freq,
+                                           verb=1)[0])
+    assert_allclose(rho_as[:, 0], model.mt(depth, stack[0], freq, verb=1)[1])
+
+    # Errors
+    with pytest.raises(ValueError, match="Parameter depth has wrong shape"):
+        model.mt(depth[:-1], res, freq)
+    with pytest.raises(ValueError, match="continuously increasing or"):
+        model.mt([0, 10, 5, 20, 30], res, freq)
+    with pytest.raises(ValueError, match="Parameter mpermH has wrong shape"):
+        model.mt(depth, res, freq, mpermH=[1, 2])
+
+
+def test_dc(capsys):
+    # Half-space: rho_a = sqrt(rho_h*rho_v) for all arrays
+    for kind in ['wenner', 'schlumberger', 'dipole-dipole']:
+        src, rec, _ = utils.get_dc_layout(kind, 12, 2.5)
+        _, rho_a = model.dc(src, rec, 0, [2e14, 10], [1, 2], verb=1)
+        assert_allclose(rho_a, 20)
+
+    # Two layers, Wenner; image series of a surface point source
+    h, rho1, rho2 = 5, 10, 100
+    k = (rho2 - rho1)/(rho2 + rho1)
+
+    def phi(r):
+        n = np.arange(1, 501)[:, None]
+        return rho1/(2*np.pi)*(1/r + 2*np.sum(
+            k**n/np.sqrt(r**2 + (2*n*h)**2), axis=0))
+
+    src, rec, level = utils.get_dc_layout('wenner', 20, 2, nmax=5)
+    _, _ = capsys.readouterr()
+    dV, rho_a = model.dc(src, rec, [0, h], [2e14, rho1, rho2], verb=3,
+                         htarg={'pts_per_dec': -1})
+    out, _ = capsys.readouterr()
+    assert "Measurements    :  " in out
+    assert "kernel call(s)" in out
+    a = 2.0*level
+    dV_ana = 2*(phi(a) - phi(2*a))
+    assert_allclose(dV, dV_ana, rtol=1e-4)
+    assert_allclose(rho_a, 2*np.pi*a*dV_ana, rtol=1e-4)
+
+    # Buried electrodes, compared to bipole at a very low frequency;
+    # B-A and M-N swapped changes the sign of dV, but not rho_a.
+    src = [0, 5, 0, 0, 2, 2]
+    rec = [20, 25, 0, 0, 1, 1]
+    inp = {'depth': [0, 10], 'res': [2e14, 10, 100], 'verb': 1}
+    dV, rho_a = model.dc(src, rec, **inp)
+    dV2, rho_a2 = model.dc(src, [25, 20, 0, 0, 1, 1], **inp)
+    assert_allclose(dV, -dV2)
+    assert_allclose(rho_a, rho_a2)
+    bip = model.bipole(src, rec, freqtime=1e-20, strength=1, srcpts=11,
+                       recpts=11, htarg={'dlf': 'key_401_2009'}, **inp)
+    assert_allclose(dV, -bip.real, rtol=1e-3)
+
+    # Symmetric layouts: geometric factor undefined -> rho_a is NaN, dV valid
+    _, _ = capsys.readouterr()
+    dV, rho_a = model.dc([-5, 5, 0, 0, 2, 2], [[0, 20], [0, 20], [-3, -1],
+                         [3, 1], 2, 2], **inp)
+    out, _ = capsys.readouterr()
+    assert "* WARNING :: Geometric factor is undefined for 2" in out
+    assert np.all(np.isnan(rho_a))
+    assert_allclose(dV, 0, atol=1e-20)
+
+    # Errors
+    with pytest.raises(ValueError, match="require a given DLF filter"):
+        model.dc(src, rec, htarg={'dlf': 'auto'}, **inp)
+    with pytest.raises(TypeError, match="Unexpected"):
+        model.dc(src, rec, foo=1, **inp)
+
+
+def test_laplace():
+    # Laplace domain (negative freqtime): real-valued for all Hankel
+    # transforms; QWE and QUAD integrate only the real part.
+    inp = {'src': [0, 0, 100], 'rec': [[1000, 50], [0, 30], 200],
+           'depth': [0, 300], 'res': [2e14, 1, 10], 'freqtime': [-1, -10],
+           'verb': 1}
+    for ab in [11, 13, 33]:
+        dlf = dipole(**inp, ab=ab, htarg={'dlf': 'key_401_2009'})
+        qwe = dipole(**inp, ab=ab, ht='qwe')
+        # QUAD on a finite wavenumber interval; the kernel decays
+        # exponentially in the Laplace domain.
+        quad = dipole(**inp, ab=ab, ht='quad',
+                      htarg={'a': 1e-8, 'b': 1, 'limit': 1000,
+                             'pts_per_dec': 100})
+        assert dlf.dtype == qwe.dtype == quad.dtype == np.float64
+        assert_allclose(qwe, dlf, rtol=1e-6)
+        assert_allclose(quad, dlf, rtol=1e-6)
+
+        # Splined QWE
+        qwe = dipole(**inp, ab=ab, ht='qwe', htarg={'pts_per_dec': 80})
+        assert qwe.dtype == np.float64
+        assert_allclose(qwe, dlf, rtol=1e-3)
+
 
 def test_fem():
     # Just ensure functionality stays the same, with one example.
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+
+import empymod
+from empymod import planning, profiling
+
+INP = {'src': [0, 0, 100, 0, 0],
+       'rec': [np.arange(1, 11)*200, np.zeros(10), 200, 0, 0],
+       'depth': [0, 150], 'res': [2e14, 1, 10], 'freqtime': [0.1, 1, 10],
+       'verb': 0}
+
+CAL = {'call': 1e-4, 'eval': 1e-7, 'eval_layer': 1e-8}
+
+
+@pytest.mark.parametrize("inp", [
+    {},
+    {'htarg': {'pts_per_dec': -1}},
+    {'htarg': {'pts_per_dec': 10}},
+    {'loop': 'off'},
+    {'ht': 'qwe', 'htarg': {'pts_per_dec': 20}},
+    {'src': [-50, 50, 0, 0, 100, 100], 'srcpts': 3},
+    {'rec': [1000, 0, 200, 30, 20], 'msrc': True},
+    {'freqtime': [0.1, 1], 'signal': -1},
+    {'src': [[0, 0], [0, 10], [100, 120], 0, 0]},
+])
+def test_plan(inp):
+    inp = {**INP, **inp}
+    out = empymod.plan(**inp, calibration=CAL)
+
+    # Compare with the actual run
+    with profiling.Profiler() as prof:
+        em = empymod.bipole(**inp, squeeze=False)
+    kspans = [s for s in prof.spans if s.name == 'kernel.wavenumber']
+    assert out['exact']
+    assert out['shape'] == em.shape
+    assert out['nlayer'] == 3
+    assert out['kernel_calls'] == len(kspans)
+    assert out['kernel_evals'] == sum(
+            s.attrs['nfreq']*s.attrs['nlambda'] for s in kspans)
+    assert out['memory'] > em.nbytes
+
+    nevals = out['kernel_evals']
+    runtime = out['kernel_calls']*1e-4 + nevals*(1e-7 + 3e-8)
+    assert np.isclose(out['runtime'], runtime)
+
+
+def test_plan_bounds():
+    # Standard DLF: all offsets and frequencies in one kernel call
+    out = empymod.plan(**INP, calibration=CAL)
+    assert out['nfreq'] == 3
+    assert out['fem_calls'] == 1
+    assert out['kernel_shape'] == (3, 10, 201)
+
+    # Non-splined QWE: upper bound
+    out = empymod.plan(**INP, ht='qwe', htarg={'maxint': 20, 'nquad': 11},
+                       calibration=CAL)
+    assert not out['exact']
+    assert out['kernel_calls'] == 3*21
+    assert out['kernel_evals'] == 3*3 + 3*20*10*11
+
+    # Automatic DLF: not exact
+    out = empymod.plan(**INP, htarg={'dlf': 'auto'}, calibration=CAL)
+    assert not out['exact']
+
+    # Fullspace with xdirect: no kernel call
+    out = empymod.plan(**{**INP, 'depth': [], 'res': 1}, xdirect=True,
+                       calibration=CAL)
+    assert out['kernel_calls'] == 0
+    assert out['runtime'] == 0
+
+    # Streaming: file is not created, response not counted
+    full = empymod.plan(**INP, calibration=CAL)
+    out = empymod.plan(**INP, outfile='test.npy', calibration=CAL)
+    assert out['memory'] < full['memory']
+
+
+def test_plan_checks(capsys):
+    # Same checks as bipole
+    with pytest.raises(ValueError, match='Parameter res has wrong shape'):
+        empymod.plan(**{**INP, 'res': [2e14, 1]})
+    with pytest.raises(TypeError, match='Unexpected'):
+        empymod.plan(**INP, unknown=True)
+
+    _ = empymod.plan(**{**INP, 'verb': 3}, calibration=CAL)
+    out, _ = capsys.readouterr()
+    assert "Plan            :" in out
+    assert "kernel calls:  1" in out
+
+
+def test_calibrate(monkeypatch):
+    monkeypatch.setattr(planning, '_CALIBRATION', {})
+    cal = planning.calibrate()
+    assert set(cal) == {'call', 'eval', 'eval_layer'}
+    assert cal['call'] > 0
+    assert all(v >= 0 for v in cal.values())
+
+    # Cached, and used by default
+    monkeypatch.setattr(planning, '_CALIBRATION', CAL.copy())
+    assert planning.calibrate() == CAL
+    out = empymod.plan(**INP)
+    assert out['runtime'] == empymod.plan(**INP, calibration=CAL)['runtime']
+
+
+def test_all_dir():
+    assert set(planning.__all__) == set(dir(planning))
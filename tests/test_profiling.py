@@ -0,0 +1,112 @@
+import threading
+import tracemalloc
+import numpy as np
+from numpy.testing import assert_allclose
+
+import empymod
+from empymod import profiling
+
+INP = {'src': [0, 0, 100], 'rec': [np.arange(1, 11)*200, 0, 200],
+       'depth': [0, 150], 'res': [2e14, 1, 10], 'freqtime': [0.1, 1, 10],
+       'verb': 0}
+
+
+class TestProfiler:
+
+    def test_report(self):
+        orig = empymod.dipole(**INP)
+        with profiling.Profiler() as prof:
+            out = empymod.dipole(**INP)
+        assert_allclose(out, orig, 0, 0)
+        assert profiling._HOOKS == []
+
+        report = prof.report
+        for name in ['model.dipole', 'model.fem', 'transform.hankel_dlf',
+                     'transform.dlf', 'kernel.wavenumber',
+                     'utils.check_model', 'utils.check_dipole']:
+            assert name in report
+        dip = report['model.dipole']
+        assert dip['calls'] == 1
+        assert dip['sizes'] == {'nfreq': 3, 'nrec': 10, 'nsrc': 1,
+                                'kcount': 1}
+        assert 0 < dip['self_time'] < dip['time']
+        assert dip['memory'] is None
+        assert report['utils.check_dipole']['calls'] == 2
+        kern = report['kernel.wavenumber']['sizes']
+        assert kern['nfreq'] == 3
+        assert kern['nlayer'] == 3
+
+        # Nested: all spans are children of model.dipole
+        top = [s for s in prof.spans if s.parent is None]
+        assert [s.name for s in top] == ['model.dipole']
+
+        # Table
+        assert 'model.dipole' in repr(prof)
+
+    def test_memory_time(self):
+        with profiling.Profiler(memory=True) as prof:
+            empymod.bipole(**{**INP, 'src': [0, 0, 100, 0, 0],
+                              'rec': [[1000, 2000], [0, 0], 200, 0, 0],
+                              'signal': 0, 'freqtime': [1, 2]})
+        assert not tracemalloc.is_tracing()
+        report = prof.report
+        assert report['model.bipole']['memory'] > 0
+        assert report['model.bipole']['sizes']['nrec'] == 2
+        assert report['model.tem']['sizes']['ntime'] == 2
+        assert report['transform.fourier_dlf']['calls'] == 2
+        assert (report['model.bipole']['memory'] >=
+                report['model.fem']['memory'])
+
+    def test_threads(self):
+        # Spans of other threads are recorded, with their own parents
+        with profiling.Profiler() as prof:
+            threads = [threading.Thread(target=empymod.dipole, kwargs=INP)
+                       for _ in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert prof.report['model.dipole']['calls'] == 3
+        top = [s for s in prof.spans if s.parent is None]
+        assert len(top) == 3
+
+
+def test_hooks_span():
+    spans = []
+    hook = spans.append
+
+    # Without hooks nothing is recorded
+    with profiling.span('test', a=1) as s:
+        s.set(b=2)
+    profiling.annotate(c=3)
+    assert isinstance(s, profiling._NullSpan)
+
+    profiling.add_hook(hook)
+    profiling.add_hook(hook)  # Only registered once
+    try:
+        with profiling.span('outer', a=1) as outer:
+            with profiling.span('inner'):
+                profiling.annotate(b=2)
+            outer.set(c=3)
+
+        @profiling.traced('decorated')
+        def fct(x):
+            """Docstring."""
+            return 2*x
+
+        assert fct(2) == 4
+        assert fct.__doc__ == "Docstring."
+    finally:
+        profiling.remove_hook(hook)
+        profiling.remove_hook(hook)  # Not registered anymore; no error
+
+    assert [s.name for s in spans] == ['inner', 'outer', 'decorated']
+    assert spans[0].parent is spans[1]
+    assert spans[0].attrs == {'b': 2}
+    assert spans[1].attrs == {'a': 1, 'c': 3}
+    assert spans[1].duration >= spans[0].duration > 0
+    assert 'outer' in repr(spans[1])
+
+
+def test_all_dir():
+    assert set(profiling.__all__) == set(dir(profiling))
@@ -0,0 +1,101 @@
+import io
+import json
+import pytest
+import numpy as np
+
+import empymod
+from empymod import tracing, profiling
+
+INP = {'src': [0, 0, 100], 'rec': [np.arange(1, 11)*200, 0, 200],
+       'depth': [0, 150], 'res': [2e14, 1, 10], 'freqtime': [0.1, 1, 10],
+       'verb': 0}
+
+
+def test_enable_disable():
+    collector = tracing.MemoryExporter()
+    stream = io.StringIO()
+    try:
+        tracer = tracing.enable(collector, tracing.JSONExporter(stream))
+        assert tracing.get_tracer() is tracer
+        empymod.dipole(**INP)
+        empymod.dipole(**{**INP, 'signal': 0})
+        with pytest.raises(ValueError, match='Parameter res has wrong'):
+            empymod.dipole(**{**INP, 'res': [1, 2]})
+    finally:
+        tracing.disable()
+    assert tracing.get_tracer() is None
+    assert profiling._HOOKS == []
+
+    # Records; only the traced prefixes
+    records = collector.records
+    names = [r['name'] for r in records]
+    assert 'utils.check_model' not in names
+    assert names.count('model.dipole') == 3
+    assert 'transform.hankel_dlf' in names
+    assert 'transform.fourier_dlf' in names
+    first = [r for r in records if r['name'] == 'model.dipole'][0]
+    assert first['parent_id'] is None
+    assert first['trace_id'] == first['span_id']
+    assert first['attrs']['nrec'] == 10
+    assert first['error'] is None
+    kern = [r for r in records if r['name'] == 'kernel.wavenumber'][0]
+    assert kern['trace_id'] == first['trace_id']
+    assert kern['parent_id'] is not None
+    assert records[-1]['error'] == 'ValueError'
+
+    # Metrics
+    counters = collector.metrics['counters']
+    assert counters['model.dipole'] == 3
+    assert counters['model.dipole.errors'] == 1
+    assert counters['model.tem'] == 1
+    assert counters['kernel.wavenumber'] == 2
+    assert counters['kernel.evaluations'] > counters['kernel.wavenumber']
+    hist = collector.metrics['histograms']['model.dipole']
+    assert hist['count'] == 3
+    assert sum(hist['counts']) == 3
+
+    # JSON lines: same spans, plus metrics
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r['name'] for r in lines[:-1]] == names
+    assert lines[-1]['type'] == 'metrics'
+    assert lines[-1]['counters'] == counters
+
+    # Disabled: nothing recorded
+    collector.clear()
+    empymod.dipole(**INP)
+    assert collector.records == []
+    assert collector.metrics is None
+
+
+def test_tracer():
+    collector = tracing.MemoryExporter()
+    tracer = tracing.Tracer([collector], prefixes=('test', ))
+    profiling.add_hook(tracer)
+    try:
+        with profiling.span('test.outer', a=np.int64(3)):
+            with profiling.span('other'):
+                pass
+    finally:
+        profiling.remove_hook(tracer)
+    assert [r['name'] for r in collector.records] == ['test.outer']
+    assert tracer.metrics['counters'] == {'test.outer': 1}
+    json.dumps(collector.records[0], default=tracing._to_json)
+    tracer.reset()
+    assert tracer.metrics == {'counters': {}, 'histograms': {}}
+
+
+def test_histogram():
+    hist = tracing.Histogram(buckets=(1, 2, 3))
+    assert hist.quantile(0.5) is None
+    for value in [0.5, 1.5, 1.5, 2.5, 10]:
+        hist.observe(value)
+    assert hist.counts == [1, 2, 1, 1]
+    assert hist.count == 5
+    assert hist.sum == 16
+    assert hist.quantile(0.5) == 2
+    assert hist.quantile(0.99) == 10
+    assert hist.to_dict()['max'] == 10
+
+
+def test_all_dir():
+    assert set(tracing.__all__) == set(dir(tracing))
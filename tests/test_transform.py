@@ -353,6 +353,42 @@ def test_quad():                                                      # 9. quad
     assert_allclose(np.squeeze(fEM), dat['res'], rtol=1e-4)
 
 
+@pytest.mark.parametrize("htype", ['qwe', 'quad'])
+def test_quad_workers(htype):
+    # Result must be the same if QUAD is carried out serially, with a thread
+    # pool, or with a provided map-like callable.
+    model = utils.check_model([0, 500], [2e14, 1, 10], None, None, None, None,
+                              None, False, 0)
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = model
+    frequency = utils.check_frequency(1, res, aniso, epermH, epermV, mpermH,
+                                      mpermV, 0)
+    _, etaH, etaV, zetaH, zetaV = frequency
+    src, nsrc = utils.check_dipole([0, 0, 100], 'src', 0)
+    rec, nrec = utils.check_dipole(
+            [np.arange(1, 6)*200, np.zeros(5), 200], 'rec', 0)
+    off, angle = utils.get_off_ang(src, rec, nsrc, nrec, 0)
+    ab, msrc, mrec = utils.check_ab(11, 0)
+    ang_fact = kernel.angle_factor(angle, ab, msrc, mrec)
+    lsrc, zsrc = utils.get_layer_nr(src, depth)
+    lrec, zrec = utils.get_layer_nr(rec, depth)
+
+    if htype == 'qwe':  # Very low diff_quad, to force QUAD
+        htarg = {'pts_per_dec': 40, 'diff_quad': 1e-8, 'rtol': 1e-8}
+    else:
+        htarg = {'rtol': 1e-8}
+
+    out = []
+    for workers in [1, 3, map]:
+        _, targ = utils.check_hankel(htype, {**htarg, 'workers': workers}, 0)
+        out.append(getattr(transform, 'hankel_'+htype)(
+            zsrc, zrec, lsrc, lrec, off, ang_fact, depth, ab, etaH, etaV,
+            zetaH, zetaV, False, targ, msrc, mrec))
+
+    for res in out[1:]:
+        assert_allclose(res[0], out[0][0], rtol=1e-14, atol=1e-30)
+        assert res[2] == out[0][2]
+
+
 def test_dlf():                                                       # 10. dlf
     # DLF is integral of hankel_dlf and fourier_dlf, and therefore tested a lot
     # through those. Here we just ensure status quo. And if a problem arises in
@@ -491,5 +527,162 @@ def test_dlf():                                                       # 10. dlf
         assert_allclose(np.squeeze(fEM3), np.squeeze(freq2), rtol=1e-3)
 
 
+@pytest.mark.parametrize("pts_per_dec", [0, -1, 10])
+def test_get_dlf_plan(pts_per_dec):
+    # Plans are cached
+    filt = filters.Hankel().key_201_2009
+    off = np.array([500., 1000., 2000., 5000.])
+    plan = transform.get_dlf_plan(filt, off, pts_per_dec)
+    assert plan is transform.get_dlf_plan(filt, off.copy(), pts_per_dec)
+    assert plan is not transform.get_dlf_plan(filt, off[1:], pts_per_dec)
+    assert 'key_201_2009; 4 input points' in plan.__repr__()
+
+    # Same points as get_dlf_points
+    points, int_pts = transform.get_dlf_points(filt, off, pts_per_dec)
+    assert_allclose(plan.points, points)
+    assert_allclose(plan.int_pts, int_pts)
+
+    # Hankel DLF with and without plan
+    model = utils.check_model([0, 300], [2e14, 1, 10], None, None, None,
+                              None, None, False, 0)
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = model
+    frequency = utils.check_frequency(1, res, aniso, epermH, epermV, mpermH,
+                                      mpermV, 0)
+    _, etaH, etaV, zetaH, zetaV = frequency
+    ab, msrc, mrec = utils.check_ab(11, 0)
+    ang_fact = kernel.angle_factor(np.array([0., 0.1, 0.2, 0.3]), ab, msrc,
+                                   mrec)
+    PJ = kernel.wavenumber(50, 200, 1, 1, depth, etaH, etaV, zetaH, zetaV,
+                           points, ab, False, msrc, mrec)
+    inp = (PJ, points, off, filt, pts_per_dec)
+    inp2 = {'ang_fact': ang_fact, 'ab': ab}
+    assert_allclose(transform.dlf(*inp, **inp2, plan=plan),
+                    transform.dlf(*inp, **inp2, int_pts=int_pts),
+                    rtol=1e-12, atol=1e-30)
+
+    # Fourier DLF with and without plan
+    filt = filters.Fourier().key_201_2012
+    time = np.logspace(-2, 1, 11)
+    plan = transform.get_dlf_plan(filt, time, pts_per_dec)
+    freq = np.squeeze(plan.points)/2/np.pi
+    fEM = 1/(1 + 2j*np.pi*freq)
+    if pts_per_dec == 0:
+        fEM = fEM.reshape(time.size, -1)
+    inp = (fEM, 2*np.pi*freq, time, filt, pts_per_dec)
+    assert_allclose(transform.dlf(*inp, kind='sin', plan=plan),
+                    transform.dlf(*inp, kind='sin'), rtol=1e-12)
+
+
+def test_get_dlf_auto():
+    model = utils.check_model([0, 300], [2e14, 1, 10], None, None, None,
+                              None, None, False, 0)
+    depth, res, aniso, epermH, epermV, mpermH, mpermV, _ = model
+    frequency = utils.check_frequency([0.1, 1], res, aniso, epermH, epermV,
+                                      mpermH, mpermV, 0)
+    _, etaH, etaV, zetaH, zetaV = frequency
+    ab, msrc, mrec = utils.check_ab(11, 0)
+    off = np.linspace(500, 5000, 10)
+    ang_fact = kernel.angle_factor(np.zeros(off.size), ab, msrc, mrec)
+    inp = (50, 200, 1, 1, off, ang_fact, depth, ab, etaH, etaV, zetaH, zetaV,
+           False)
+
+    # Loose tolerance: short filter and cheapest type
+    _, htarg = utils.check_hankel('dlf', {'dlf': 'auto', 'rtol': 1e-2}, 0)
+    filt, pts_per_dec = transform.get_dlf_auto(*inp, htarg, msrc, mrec)
+    assert filt.base.size < 201
+    assert pts_per_dec != 0
+
+    # Strict tolerance, fixed type: best filter, standard DLF
+    _, htarg = utils.check_hankel(
+            'dlf', {'dlf': 'auto', 'rtol': 1e-14, 'pts_per_dec': 0}, 0)
+    filt, pts_per_dec = transform.get_dlf_auto(*inp, htarg, msrc, mrec)
+    assert filt.name == 'key_401_2009'
+    assert pts_per_dec == 0
+
+
+@pytest.mark.parametrize("nfilt", [11, 2001])
+def test_lagged_convolve(nfilt):
+    # Compare the direct and FFT-based lagged convolution with the explicit
+    # lagged (Toeplitz-like) matrix.
+    rng = np.random.default_rng(1)
+    nout = 600
+    values = rng.standard_normal(nout+nfilt+1)
+    values = values + 1j*rng.standard_normal(values.size)
+    coeff = rng.standard_normal(nfilt)
+
+    index = np.arange(nout)[:, None] + np.arange(nfilt)
+    out = transform._lagged_convolve(values, coeff, nout)
+    assert out.shape == (nout, )
+    assert_allclose(out, np.dot(values[index], coeff), rtol=1e-10)
+
+
+def test_get_waveform_operator():
+    # For a constant step response the convolution yields the waveform itself.
+    wtime = np.array([-1e-3, -9e-4, 0, 4e-6])
+    wcurrent = np.array([0.5, 1.0, 1.0, 0.0])
+    time = np.r_[-2e-3, -9.5e-4, -1e-4, np.logspace(-6, -2, 11)]
+    for nquad in [1, 3]:
+        qtime, op = transform.get_waveform_operator(
+                time, wtime, wcurrent, nquad)
+        assert op.shape == (time.size, qtime.size)
+        assert np.all(qtime > 0)
+        assert_allclose(op.sum(1), np.interp(time, wtime, wcurrent, left=0),
+                        atol=1e-12)
+
+    # Linear step response is integrated exactly.
+    qtime, op = transform.get_waveform_operator(time, wtime, wcurrent)
+    exact = np.zeros(time.size)
+    exact[time > wtime[0]] = 0.5*(time - wtime[0])[time > wtime[0]]
+    for i in range(wtime.size-1):
+        slope = (wcurrent[i+1]-wcurrent[i])/(wtime[i+1]-wtime[i])
+        ta = np.clip(time - wtime[i], 0, None)
+        tb = np.clip(time - wtime[i+1], 0, None)
+        exact += slope*(ta**2 - tb**2)/2
+    assert_allclose(op @ qtime, exact, atol=1e-18)
+
+
+def test_get_gate_operator():
+    # Power laws are integrated (almost) exactly
+    gates = np.array([[1e-5, 2e-5], [2e-5, 5e-5], [5e-5, 1e-3]])
+    gtime, op = transform.get_gate_operator(gates)
+    assert op.shape == (3, gtime.size)
+    assert_allclose(op.sum(1), 1)
+    assert_allclose(op @ gtime**-2, (1/gates[:, 0] - 1/gates[:, 1]) /
+                    (gates[:, 1] - gates[:, 0]))
+    assert_allclose(op @ gtime**-2.5, (gates[:, 0]**-1.5-gates[:, 1]**-1.5) /
+                    1.5/(gates[:, 1] - gates[:, 0]), rtol=1e-6)
+
+
+def test_get_loop_operator():
+    # With G(rho) = 1/rho the integral is the angle under which the receiver
+    # sees the loop (2 pi inside, 0 outside), with G(rho) = rho/2 the area.
+    xrec, yrec = np.array([0, 3, 20.]), np.array([0, 1, 0.])
+    square = np.array([[-5, -5], [5, -5], [5, 5], [-5, 5]])
+    for inp, area in [({'radius': 10}, 100*np.pi), ({'vertices': square}, 100),
+                      ({'vertices': square[::-1]}, 100)]:
+        off, op = transform.get_loop_operator(xrec, yrec, **inp)
+        assert op.shape == (3, off.size)
+        assert_allclose(op @ (1/off), [2*np.pi, 2*np.pi, 0], atol=1e-7)
+        assert_allclose(op @ (off/2), area, rtol=1e-7)
+
+    # Centre of a circular loop: one offset
+    off, op = transform.get_loop_operator(0, 0, radius=10)
+    assert_allclose(off, 10)
+    assert_allclose(op, [[20*np.pi]])
+
+
+def test_get_lowpass_response():
+    freq = np.logspace(0, 7, 15)
+
+    # First order Butterworth
+    resp = transform.get_lowpass_response(freq, [(4.5e5, 1), ])
+    assert_allclose(resp, 1/(1 + 1j*freq/4.5e5))
+
+    # Cascade, and magnitude of higher order Butterworth
+    resp = transform.get_lowpass_response(
+            freq, [(1e3, 4), lambda f: np.full(f.size, 2.0)])
+    assert_allclose(abs(resp), 2/np.sqrt(1 + (freq/1e3)**8))
+
+
 def test_all_dir():
     assert set(transform.__all__) == set(dir(transform))
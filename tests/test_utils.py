@@ -253,6 +253,54 @@ def test_check_frequency(capsys):
     assert_allclose(freq, rfreq)
 
 
+def test_check_mt(capsys):
+    # One model, z upwards
+    _, _ = capsys.readouterr()
+    thick, res, epermH, mpermH, freq = utils.check_mt(
+            [0, -10, -30], [2e14, 1, 2, 3], [1, 10], None, 2, 3)
+    out, _ = capsys.readouterr()
+    assert_allclose(thick, [[10, 20]])
+    assert_allclose(res, [[1, 2, 3]])
+    assert_allclose(epermH, 1)
+    assert_allclose(mpermH, 2)
+    assert_allclose(freq, [1, 10])
+    assert "Models          :  1" in out
+    assert "Layers          :  3 (below surface)" in out
+
+    # Stacked models, full-space; minimum values
+    thick, res, _, _, freq = utils.check_mt(
+            None, [[1], [0]], 0, [[1], [2]], None, 1)
+    out, _ = capsys.readouterr()
+    assert thick.shape == (1, 0)
+    assert_allclose(res, [[1], [1e-20]])
+    assert_allclose(freq, 1e-20)
+    assert "* WARNING :: Resistivities < 1e-20 Ohm.m" in out
+
+    # Errors
+    with pytest.raises(ValueError, match="Parameter depth has wrong shape"):
+        utils.check_mt([[0, 1], [0, 2]], np.ones((3, 3)), 1, None, None, 0)
+    with pytest.raises(ValueError, match="Parameter epermH has wrong shape"):
+        utils.check_mt([0, 1], np.ones((3, 3)), 1, [1, 2], None, 0)
+
+
+def test_check_dc(capsys):
+    _, _ = capsys.readouterr()
+    elec = utils.check_dc([0, 1, 0, 0, 0, 0], [[2, 3], [3, 4], 0, 0, 0, 1], 3)
+    out, _ = capsys.readouterr()
+    assert "Measurements    :  2 (electrodes A, B, M, N)" in out
+    assert elec.shape == (4, 3, 2)
+    assert_allclose(elec[:, 0, 1], [0, 1, 3, 4])
+    assert_allclose(elec[3, 2], [1, 1])
+
+    # Errors
+    with pytest.raises(ValueError, match="Parameter rec has wrong length"):
+        utils.check_dc([0, 1, 0, 0, 0, 0], [2, 3, 0, 0, 0], 0)
+    with pytest.raises(ValueError, match="of the same size"):
+        utils.check_dc([[0, 1], 1, 0, 0, 0, 0], [[2, 3, 4], 3, 0, 0, 0, 0], 0)
+    with pytest.raises(ValueError, match="cannot be at the same position"):
+        utils.check_dc([0, 0, 0, 0, 0, 0], [2, 3, 0, 0, 0, 0], 0)
+
+
 def test_check_hankel(capsys):
     # # DLF # #
     # verbose
@@ -292,6 +340,31 @@ def test_check_hankel(capsys):
     assert htarg['dlf'].name == filters.Hankel().key_201_2009.name
     assert htarg['pts_per_dec'] == 20
 
+    # auto
+    _, htarg = utils.check_hankel('dlf', {'dlf': 'auto'}, 3)
+    out, _ = capsys.readouterr()
+    assert "     > Filter      :  auto" in out
+    assert htarg['dlf'] == 'auto'
+    assert htarg['rtol'] == 1e-6
+    assert htarg['atol'] == 1e-30
+    assert htarg['pts_per_dec'] is None
+    assert utils.check_loop(None, 'dlf', htarg, 0) == (True, False)
+    _, htarg = utils.check_hankel(
+            'dlf', {'dlf': 'auto', 'rtol': 1e-3, 'pts_per_dec': 0}, 0)
+    assert htarg['rtol'] == 1e-3
+    assert htarg['pts_per_dec'] == 0
+    assert utils.check_loop(None, 'dlf', htarg, 0) == (False, False)
+
+    # auto: print selection
+    htarg['dlf'] = filters.Hankel().key_101_2009
+    utils.dlf_auto_info(htarg, 3)
+    out, _ = capsys.readouterr()
+    assert "   Hankel (auto)   :  DLF\n     > Filter      :  key_101" in out
+    assert "     > DLF type    :  Standard" in out
+    utils.dlf_auto_info(htarg, 2)
+    out, _ = capsys.readouterr()
+    assert out == ""
+
     # Assert it can be called repetitively
     _, _ = capsys.readouterr()
     ht, htarg = utils.check_hankel('dlf', {}, 1)
@@ -388,6 +461,17 @@ def test_check_hankel(capsys):
     assert htarg['a'] == 1e-10
     assert htarg['b'] == 200
     assert htarg['pts_per_dec'] == 50
+    assert htarg['workers'] == 1
+
+    # workers
+    _, htarg = utils.check_hankel('quad', {'workers': 4}, 3)
+    out, _ = capsys.readouterr()
+    assert "     > workers     :  4" in out
+    assert htarg['workers'] == 4
+    _, htarg = utils.check_hankel('qwe', {'workers': map}, 0)
+    assert htarg['workers'] is map
+    with pytest.raises(ValueError, match='<quad: workers> must be -1'):
+        utils.check_hankel('quad', {'workers': 0}, 0)
 
     # Assert it can be called repetitively
     _, _ = capsys.readouterr()
@@ -516,6 +600,43 @@ def test_check_all_depths():
         assert_allclose(lhs_l2h[6], var[6][::swap])
 
 
+def test_check_batch_model(capsys):
+    depth = np.array([[0, 100, 2000], [2000, 100, 0]])
+    res = np.array([[6, 1, 2, 3], [3, 2, 1, 6]])
+    aniso = [1, 2, 1e-40, 1]
+    epermH = [[1.0, 1.1, 1.2, 1.3], [1.0, 1.0, 1.0, 1.0]]
+
+    # Compare each sounding to check_model.
+    out = utils.check_batch_model(depth, res, aniso, epermH, None, None, None,
+                                  2, 1)
+    txt, _ = capsys.readouterr()
+    assert "* WARNING :: Parameter aniso < 1e-20" in txt
+    for i in range(2):
+        outi = utils.check_model(depth[i], res[i], aniso, epermH[i], None,
+                                 None, None, True, 0)
+        for j in range(8):
+            assert_allclose(out[j][i], outi[j])
+
+    # Fullspace per sounding; depth and parameters for all soundings.
+    out = utils.check_batch_model(
+            [], [[1], [1]], [[1], [2]], None, None, None, None, 2, 0)
+    assert_allclose(out[0], -np.inf)
+    assert out[0].shape == (2, 1)
+    assert np.all(out[7])
+    out = utils.check_batch_model(
+            [-np.inf, 0, np.inf], [1, 1], None, None, None, None, None, 3, 0)
+    assert out[0].shape == (3, 2)
+    assert np.all(out[7])
+
+    # Errors
+    with pytest.raises(ValueError, match="Depth must be continuously"):
+        utils.check_batch_model([[0, 2, 1]], [1, 2, 3, 4], None, None, None,
+                                None, None, 1, 0)
+    with pytest.raises(ValueError, match="Parameter res has wrong shape"):
+        utils.check_batch_model([0, 1], [1, 2, 3, 4], None, None, None,
+                                None, None, 1, 0)
+
+
 def test_check_time(capsys):
     time = np.array([3])
 
@@ -617,6 +738,13 @@ def test_check_time(capsys):
     out, _ = capsys.readouterr()
     assert out == ""
 
+    # Adaptive frequency sampling
+    assert ftarg['adaptive'] is None
+    _, _, _, ftarg = utils.check_time(time, 0, 'qwe', {'adaptive': 1e-3}, 4)
+    out, _ = capsys.readouterr()
+    assert "     > adaptive    :  rtol = 0.001" in out
+    assert ftarg['adaptive'] == 1e-3
+
     # # QWE # #
     # verbose
     _, f, ft, ftarg = utils.check_time(time, 0, 'qwe', {}, 4)
@@ -812,6 +940,114 @@ def test_check_time(capsys):
         utils.check_time(time, 0, 'dlf', {'kind': 'wrongkind'}, 1)
 
 
+def test_check_waveform(capsys):
+    time = np.logspace(-5, -2, 10)
+    wave = {'time': [-1e-3, -9e-4, 0, 4e-6], 'current': [0, 1, 1, 0]}
+
+    # verbose
+    out = utils.check_waveform(wave, time, 4)
+    stdout, _ = capsys.readouterr()
+    assert "   Waveform        :  4 points; nquad = 3" in stdout
+    assert out['nquad'] == 3
+    assert_allclose(out['time'], wave['time'])
+    assert out['operator'].shape == (time.size, out['qtime'].size)
+
+    # nquad; checking a checked waveform again
+    out = utils.check_waveform({**wave, 'nquad': 5}, time, 0)
+    out2 = utils.check_waveform(out, time, 0)
+    assert out2['nquad'] == 5
+    assert_allclose(out2['operator'], out['operator'])
+
+    # Errors
+    with pytest.raises(TypeError, match="<waveform> must be a dict"):
+        utils.check_waveform([[0, 1], [0, 1]], time, 0)
+    with pytest.raises(ValueError, match="<waveform> is missing the key"):
+        utils.check_waveform({'time': [0, 1]}, time, 0)
+    with pytest.raises(ValueError, match="must be strictly increasing"):
+        utils.check_waveform({'time': [1, 0], 'current': [0, 1]}, time, 0)
+    with pytest.raises(ValueError, match="must not be all zero"):
+        utils.check_waveform({'time': [0, 1], 'current': [0, 0]}, time, 0)
+    with pytest.raises(ValueError, match="All times are before the start"):
+        utils.check_waveform({'time': [1, 2], 'current': [0, 1]}, time, 0)
+
+
+def test_check_gates(capsys):
+    time = np.array([1.5e-5, 3e-5])
+    gates = [[1e-5, 2e-5], [2e-5, 4e-5]]
+
+    # verbose
+    out = utils.check_gates(gates, time, 1, 4)
+    stdout, _ = capsys.readouterr()
+    assert "   Gates open  [s] :  1E-05 2E-05" in stdout
+    assert "   Gates close [s] :  2E-05 4E-05" in stdout
+    assert_allclose(out['gates'], gates)
+    assert out['operator'].shape == (2, out['gtime'].size)
+
+    # Errors
+    with pytest.raises(ValueError, match="only implemented for time-domain"):
+        utils.check_gates(gates, time, None, 0)
+    with pytest.raises(ValueError, match="must open after t=0 s and close"):
+        utils.check_gates([[0, 1e-5], [2e-5, 4e-5]], time, 1, 0)
+    with pytest.raises(ValueError, match="must open after t=0 s and close"):
+        utils.check_gates([[2e-5, 1e-5], [2e-5, 4e-5]], time, 1, 0)
+    with pytest.raises(ValueError, match="Parameter gates has wrong shape"):
+        utils.check_gates(gates, [1e-5], 1, 0)
+
+
+def test_check_finite_loop(capsys):
+    src, _, _, srcdip = utils.check_bipole([0, 0, 0, 0, 90], 'src')
+    rec, _, _, recdip = utils.check_bipole([[0, 10], [0, 0], 0, 0, -90],
+                                           'rec')
+    inp = (src, srcdip, rec, recdip, True,
+           *utils.check_hankel('dlf', {}, 0), 3)
+
+    _, _ = capsys.readouterr()
+    floop = utils.check_finite_loop(10, None, *inp)
+    out, _ = capsys.readouterr()
+    assert floop['radius'] == 10.0
+    assert floop['vertices'] is None
+    assert floop['srcsign'] == 1
+    assert_allclose(floop['recsign'], -1)
+    assert "Finite loop     :  circular; radius = 10.0 m" in out
+
+    floop = utils.check_finite_loop(None, [[0, 0], [2, 0], [0, 2]], *inp)
+    out, _ = capsys.readouterr()
+    assert floop['vertices'].shape == (3, 2)
+    assert "Finite loop     :  polygon; 3 vertices" in out
+    assert "> area   [m2] :  2" in out
+
+    # Errors
+    with pytest.raises(ValueError, match="either <loop_radius> or"):
+        utils.check_finite_loop(10, [[0, 0], [2, 0], [0, 2]], *inp)
+    with pytest.raises(ValueError, match="with a given filter"):
+        utils.check_finite_loop(10, None, *inp[:6], {'dlf': 'auto'}, 0)
+    with pytest.raises(ValueError, match="with a given filter"):
+        utils.check_finite_loop(10, None, *inp[:5], 'qwe', {}, 0)
+    with pytest.raises(ValueError, match="require <src> to be one dipole"):
+        utils.check_finite_loop(10, None, rec, *inp[1:])
+    with pytest.raises(ValueError, match="must be bigger than zero"):
+        utils.check_finite_loop(0, None, *inp)
+    with pytest.raises(ValueError, match="must be of shape"):
+        utils.check_finite_loop(None, [[0, 0], [2, 0]], *inp)
+
+
+def test_check_lowpass(capsys):
+    # Float, tuple, list, callable
+    assert utils.check_lowpass(4.5e5, 0) == [(4.5e5, 1)]
+    assert utils.check_lowpass((3e5, 2), 0) == [(3e5, 2)]
+    assert utils.check_lowpass([4.5e5, 3e5], 0) == [(4.5e5, 1), (3e5, 1)]
+    out = utils.check_lowpass([(3e5, 2), np.abs], 4)
+    stdout, _ = capsys.readouterr()
+    assert out == [(3e5, 2), np.abs]
+    assert "   Lowpass filters :  300000 Hz (order 2); callable" in stdout
+
+    # Errors
+    with pytest.raises(ValueError, match="<lowpass> filters must be a"):
+        utils.check_lowpass(-1, 0)
+    with pytest.raises(ValueError, match="<lowpass> filters must be a"):
+        utils.check_lowpass((1e3, 0), 0)
+
+
 def test_check_solution(capsys):
     # wrong solution
     with pytest.raises(ValueError, match='Solution must be one of'):
@@ -944,6 +1180,31 @@ def test_get_layer_nr():
     assert_allclose(lbip, [0, 1, 1, 2])
 
 
+def test_get_dc_layout():
+    # Wenner, 7 electrodes: n=1 (4 positions), n=2 (1 position)
+    src, rec, level = utils.get_dc_layout('wenner', 7, 2.0)
+    assert_allclose(src[0], [0, 2, 4, 6, 0])
+    assert_allclose(src[1], [6, 8, 10, 12, 12])
+    assert_allclose(rec[0], [2, 4, 6, 8, 4])
+    assert_allclose(rec[1], [4, 6, 8, 10, 8])
+    assert_allclose(level, [1, 1, 1, 1, 2])
+
+    # Schlumberger and dipole-dipole, limited levels
+    src, rec, level = utils.get_dc_layout('Schlumberger', 10, nmax=2, z=1)
+    assert_allclose(np.c_[src[0], src[1], rec[0], rec[1]][-1], [4, 9, 6, 7])
+    assert level.size == 7 + 5
+    assert src[4] == rec[5] == 1
+    src, rec, level = utils.get_dc_layout('dipole-dipole', 10, nmax=3)
+    assert_allclose(np.c_[src[0], src[1], rec[0], rec[1]][0], [1, 0, 2, 3])
+    assert level.size == 7 + 6 + 5
+
+    # Errors
+    with pytest.raises(ValueError, match="Unknown electrode array"):
+        utils.get_dc_layout('pole-pole', 10)
+    with pytest.raises(ValueError, match="Not enough electrodes"):
+        utils.get_dc_layout('wenner', 3)
+
+
 def test_get_off_ang(capsys):
     src = [np.array([0, 100]), np.array([0, 100]), np.array([0, 100])]
     rec = [np.array([0, 5000]), np.array([0, 100]), np.array([0, 200])]
@@ -956,6 +1217,16 @@ def test_get_off_ang(capsys):
     assert_allclose(ang, resang, equal_nan=True)
 
 
+def test_get_batch_off_ang(capsys):
+    src = np.array([[0, 0, 0], [100, 100, 100]])
+    rec = np.array([[0, 0, 0], [0, 100, 200]])
+    off, ang = utils.get_batch_off_ang(src, rec, 3)
+    out, _ = capsys.readouterr()
+    assert out[:23] == "* WARNING :: Offsets < "
+    assert_allclose(off, [0.001, 100])
+    assert_allclose(ang, [0.0, np.pi])
+
+
 def test_get_azm_dip(capsys):
     # Dipole, src, ninpz = 1
     inp = [np.array([0]), np.array([0]), np.array([0]), np.array([0]),